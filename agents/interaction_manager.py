@@ -1,26 +1,36 @@
 
 
+import logging
+from langchain_core.runnables import RunnableConfig
 from graph_state import AgentState
 # ✅ Correctly separated imports - The manager only uses its own tools now
-from tools.interaction_tools import generate_questions_from_skeleton, get_poster_prompt_skeleton
-from tools.interaction_tools import generate_clarifying_sales_questions
+from tools.interaction_tools import generate_questions_from_skeleton_async, get_poster_prompt_skeleton
+from tools.interaction_tools import generate_clarifying_sales_questions_async
+from tools.intent_prefetch import get_intent_prefetcher
+from tools.sales_tools import split_conversation_by_day, analysed_days
+from tools.question_prefetch import get_question_prefetcher
+from tools.image_speculation import get_image_speculator
 
-def interaction_manager_node(state: AgentState) -> dict:
+logger = logging.getLogger(__name__)
+
+async def interaction_manager_node(state: AgentState, config: RunnableConfig) -> dict:
     """
     Manages a one-by-one interactive conversation for multiple agents.
     For the Poster Agent, it now uses a two-step, context-aware process.
     """
-    print("\n---NODE: 🤖 INTERACTION MANAGER (Smart Q&A) 🤖---\n")
+    logger.debug("---NODE: 🤖 INTERACTION MANAGER (Smart Q&A) 🤖---")
 
     if user_answers := state.get("user_answers"):
-        print(f"🧠 Resuming interaction. Processing user answers: {user_answers}")
+        # Answers can hold a whole sales transcript: only their ids at info level.
+        logger.info(f"🧠 Resuming interaction. Processing answers for: {', '.join(user_answers)}")
+        logger.debug("User answers", extra={"user_answers": user_answers})
         interaction_data = state.get("interaction", {"collected_content": {}})
         collected_content = interaction_data.get("collected_content", {})
         collected_content.update(user_answers)
         interaction_data["collected_content"] = collected_content
         state["user_answers"] = None
     else:
-        print("✨ First run of interaction. Initializing a blank state.")
+        logger.info("✨ First run of interaction. Initializing a blank state.")
         interaction_data = {"collected_content": {}}
         
     recommended_app = state.get("intent_data", {}).get("recommended_app")
@@ -29,15 +39,24 @@ def interaction_manager_node(state: AgentState) -> dict:
     # so it's ALWAYS available for every agent flow.
     collected_content = interaction_data.get("collected_content", {})
     
-    print(f"🎬 Recommended App: '{recommended_app}'")
+    logger.info(f"🎬 Recommended App: '{recommended_app}'")
 
     # --- SALES AGENT FLOW (Unchanged) ---
     if recommended_app == "Lead/Sales Intent Generator":
+        # Classify the days in the background while questions are generated and answered.
+        prefetcher = get_intent_prefetcher()
+        if prefetcher is not None and collected_content.get('conversation'):
+            report = state.get("sales_analysis_report")
+            # An incremental update only classifies the days its previous report does not have (or has with other text).
+            known_days = analysed_days(split_conversation_by_day(collected_content['conversation']),
+                                       report.get("daily_breakdown", [])) \
+                if collected_content.get("analysis_mode") == "incremental" and report else []
+            prefetcher.start(config["configurable"]["thread_id"], collected_content['conversation'], known_days)
         if 'conversation' not in collected_content or 'operation' not in collected_content:
             question_to_ask = { "id": "sales_initial_input", "text": "Please provide the sales conversation and select the primary analysis goal.", "ui_element": "form", "fields": [{"id": "conversation", "label": "Sales Conversation Text", "type": "textarea"}, {"id": "operation", "label": "Analysis Goal", "type": "radio", "options": ["Intent Analysis", "Next Best Action"]}]}
             return {"interaction_is_required": True, "questions_for_user": [question_to_ask], "interaction": interaction_data}
         if 'question_queue' not in interaction_data:
-            all_questions = generate_clarifying_sales_questions(state).get("questions", [])
+            all_questions = (await generate_clarifying_sales_questions_async(state)).get("questions", [])
             interaction_data['question_queue'] = all_questions if all_questions else []
         if interaction_data.get('question_queue'):
             next_question = interaction_data['question_queue'].pop(0)
@@ -47,7 +66,7 @@ def interaction_manager_node(state: AgentState) -> dict:
     elif recommended_app == "Poster Generator":
         # Step 1: Get the user's core idea if we don't have it yet.
         if 'main_idea' not in collected_content:
-            print("🎨 Poster flow initiated. Asking for the core concept.")
+            logger.info("🎨 Poster flow initiated. Asking for the core concept.")
             question_to_ask = {
                 "id": "main_idea",
                 "text": "What is the poster about? Be descriptive (e.g., 'An EdTech poster for a Python bootcamp').",
@@ -57,21 +76,30 @@ def interaction_manager_node(state: AgentState) -> dict:
 
         # Step 2: If we have the core idea, generate the context-aware follow-up questions.
         if 'question_queue' not in interaction_data:
-            print(f"💡 Core idea received. Generating smart follow-up questions...")
+            logger.info("💡 Core idea received. Generating smart follow-up questions...")
             main_idea = collected_content['main_idea']
-            prompt_skeleton = get_poster_prompt_skeleton()
-            all_questions = generate_questions_from_skeleton(main_idea, prompt_skeleton).get("questions", [])
+            # Usually generated already while the user was typing the idea (POST /prefetch).
+            question_prefetcher = get_question_prefetcher()
+            result = await question_prefetcher.take(config["configurable"]["thread_id"], main_idea) \
+                if question_prefetcher is not None else None
+            if result is None:
+                prompt_skeleton = get_poster_prompt_skeleton()
+                result = await generate_questions_from_skeleton_async(main_idea, prompt_skeleton)
+            all_questions = result.get("questions", [])
             interaction_data['question_queue'] = all_questions
-            print(f"🗂️ Stored {len(all_questions)} consolidated questions in the queue.")
+            logger.info(f"🗂️ Stored {len(all_questions)} consolidated questions in the queue.")
 
         # Step 3: Ask the next question from our new, shorter queue.
         if interaction_data.get('question_queue'):
             next_question = interaction_data['question_queue'].pop(0)
-            print(f"❓ Asking next poster question: '{next_question.get('id')}'.")
+            logger.info(f"❓ Asking next poster question: '{next_question.get('id')}'.")
+            # Opt-in: if this last question is optional, start the image with the defaults now.
+            if not interaction_data['question_queue'] and (speculator := get_image_speculator()) is not None:
+                speculator.maybe_start(config["configurable"]["thread_id"], collected_content, next_question)
             return {"interaction_is_required": True, "questions_for_user": [next_question], "interaction": interaction_data}
 
     # --- EXIT ---
-    print("✅ All questions answered. Interaction phase complete.")
+    logger.info("✅ All questions answered. Interaction phase complete.")
     return {
         "interaction_is_required": False,
         "questions_for_user": [],
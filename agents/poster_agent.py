@@ -116,18 +116,23 @@
 
 
 #+====================================================================================================
+import logging
 import json
+from langchain_core.runnables import RunnableConfig
 from graph_state import AgentState
-from tools.poster_tools import build_image_prompt_tool, generate_image_from_prompt_tool
+from tools.poster_tools import build_image_prompt_tool, generate_image_from_prompt_tool_async
+from tools.image_speculation import get_image_speculator
 
-def run_interactive_poster_flow_node(state: AgentState):
+logger = logging.getLogger(__name__)
+
+async def run_interactive_poster_flow_node(state: AgentState, config: RunnableConfig):
     """
     The Poster Agent for the interactive workflow.
     1. Takes the final collected content from the interaction manager.
     2. Builds the detailed, structured prompt for the image model.
     3. Calls the image generation API to get the final poster.
     """
-    print("\n---AGENT: 🎨 Poster Agent (Interactive) at Work 🎨---\n")
+    logger.debug("---AGENT: 🎨 Poster Agent (Interactive) at Work 🎨---")
 
     try:
         # Step 0: Get the complete brief from the interaction manager
@@ -142,20 +147,26 @@ def run_interactive_poster_flow_node(state: AgentState):
         # Step 1: Build the final mega-prompt using the artist's tool
         final_image_prompt = build_image_prompt_tool(collected_data)
 
-        # Step 2: Generate the image using the artist's tool
-        final_image_base64 = generate_image_from_prompt_tool(final_image_prompt)
+        # Step 2: Generate the image using the artist's tool, unless the speculative
+        # image started before the last (optional) answer was made for this exact prompt
+        speculator = get_image_speculator()
+        final_image_artifact = None
+        if speculator is not None:
+            final_image_artifact = await speculator.take(config["configurable"].get("thread_id"), final_image_prompt)
+        if final_image_artifact is None:
+            final_image_artifact = await generate_image_from_prompt_tool_async(final_image_prompt)
 
-        print("---SUCCESS: Interactive Poster Flow Finished---")
+        logger.debug("---SUCCESS: Interactive Poster Flow Finished---")
         
         # Return all the necessary data to update the state
         return {
-            "final_image": final_image_base64,
+            "final_image_artifact": final_image_artifact,  # reference only; bytes live in the artifact store
             "image_prompt": final_image_prompt,
             "poster_fields": collected_data, # Store the user's final choices
         }
 
     except Exception as e:
-        print(f"---ERROR in Interactive Poster Flow: {e}---")
+        logger.error(f"---ERROR in Interactive Poster Flow: {e}---")
         return {"errors": [f"Interactive Poster Flow failed: {str(e)}"]}
 
 # To keep the supervisor clean, we can have the autonomous node point here for now.
@@ -106,21 +106,61 @@
 #         }
 
 #=============================================================================================================
+import logging
+from langchain_core.runnables import RunnableConfig
 from graph_state import AgentState
+from tools.intent_prefetch import get_intent_prefetcher
 from tools.sales_tools import (
     split_conversation_by_day,
-    predict_sales_intent_tool,
-    generate_sales_analysis_tool
+    analysed_days,
+    day_content_hash,
+    predict_sales_intent_batch_tool_async,
+    generate_sales_analysis_tool_async,
+    generate_incremental_sales_analysis_tool_async,
+    SALES_INCREMENTAL_RECENT_DAYS
 )
 
-def run_sales_agent_node(state: AgentState):
+logger = logging.getLogger(__name__)
+
+def _daily_intent_analysis(daily_chunks: list[dict], daily_intents: list[dict]) -> list[dict]:
+    daily_intent_analysis = []
+    for chunk, prediction in zip(daily_chunks, daily_intents):
+        daily_intent_analysis.append({
+            "day": prediction["day_marker"],
+            "intent": prediction["intent"],
+            "text_preview": chunk["content"][:100] + "...",
+            "content_hash": day_content_hash(chunk["content"])
+        })
+    logger.info("📊 Daily Intent Analysis Complete: "
+                + ", ".join(f"{item['day']} {item['intent']}" for item in daily_intent_analysis))
+    return daily_intent_analysis
+
+async def _take_prefetched_intents(config: RunnableConfig, conversation: str, daily_chunks: list[dict],
+                                   known_days: frozenset = frozenset()):
+    """
+    The classification the interaction manager started in the background, if it
+    matches this conversation; `daily_chunks` are the days it should cover
+    (all days but `known_days`).
+    """
+    prefetcher = get_intent_prefetcher()
+    if prefetcher is None:
+        return None
+    prefetched = await prefetcher.take(config.get("configurable", {}).get("thread_id"), conversation, known_days)
+    return prefetched if prefetched is not None and len(prefetched) == len(daily_chunks) else None
+
+async def run_sales_agent_node(state: AgentState, config: RunnableConfig):
     """
     Orchestrates a multi-step sales analysis:
     1. Splits the conversation by day.
     2. Predicts intent for each day using a fine-tuned BERT model.
     3. Synthesizes the findings with an LLM for a final, rich analysis.
+
+    With `analysis_mode: "incremental"` in the collected answers, a thread that
+    already has a report is updated instead: only days not yet in its
+    daily_breakdown (or whose text changed since) are classified and the LLM
+    sees the previous analysis plus those days rather than the whole history.
     """
-    print("\n---AGENT: 🕵️ Advanced Sales Agent at Work 🕵️---\n")
+    logger.debug("---AGENT: 🕵️ Advanced Sales Agent at Work 🕵️---")
 
     try:
         # Step 0: Get the full conversation from the interaction manager's output
@@ -138,25 +178,21 @@ def run_sales_agent_node(state: AgentState):
         if not daily_chunks:
             raise ValueError("Failed to split conversation into daily chunks.")
 
-        # Step 2: Analyze each day's intent with the BERT model
-        daily_intent_analysis = []
-        for chunk in daily_chunks:
-            intent = predict_sales_intent_tool(chunk["content"])
-            daily_intent_analysis.append({
-                "day": chunk["day_marker"],
-                "intent": intent,
-                "text_preview": chunk["content"][:100] + "..."
-            })
-        print("\n📊 Daily Intent Analysis Complete:")
-        for item in daily_intent_analysis:
-            print(f"  - {item['day']} Intent: {item['intent']}")
-        print("\n")
+        previous_report = state.get("sales_analysis_report")
+        if collected_data.get("analysis_mode") == "incremental" and previous_report:
+            return await _run_incremental_analysis(state, config, previous_report, full_conversation, daily_chunks)
+
+        # Step 2: Analyze every day's intent with the BERT model in one batched call
+        # (usually already done in the background while the user answered questions)
+        daily_intents = await _take_prefetched_intents(config, full_conversation, daily_chunks) \
+            or await predict_sales_intent_batch_tool_async(daily_chunks)
+        daily_intent_analysis = _daily_intent_analysis(daily_chunks, daily_intents)
 
 
         # Step 3: Call the powerful LLM tool to synthesize everything
-        final_analysis = generate_sales_analysis_tool(full_conversation, daily_intent_analysis)
+        final_analysis = await generate_sales_analysis_tool_async(full_conversation, daily_intent_analysis)
 
-        print("---SUCCESS: Advanced Sales Agent Finished Task---")
+        logger.debug("---SUCCESS: Advanced Sales Agent Finished Task---")
 
         # Step 4: Format the final, rich output for the AgentState
         return {
@@ -170,9 +206,64 @@ def run_sales_agent_node(state: AgentState):
         }
 
     except Exception as e:
-        print(f"---ERROR in Advanced Sales Agent: {e}---")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"---ERROR in Advanced Sales Agent: {e}---")
         return {
             "errors": [f"Sales Agent failed: {str(e)}"]
-        }
\ No newline at end of file
+        }
+
+async def _run_incremental_analysis(state: AgentState, config: RunnableConfig, previous_report: dict,
+                                    conversation: str, daily_chunks: list[dict]) -> dict:
+    """
+    Appends the days that are not in the previous report and updates the
+    analysis from them. A day resubmitted with different text is reclassified
+    and replaces its old breakdown entry. If the update fails the report is
+    left as it was.
+    """
+    previous_breakdown = previous_report.get("daily_breakdown", [])
+    known_days = analysed_days(daily_chunks, previous_breakdown)
+    new_chunks = [chunk for chunk in daily_chunks if chunk["day_marker"] not in known_days]
+    revised_days = {item["day"] for item in previous_breakdown} & {chunk["day_marker"] for chunk in new_chunks}
+    logger.info(f"➕ Incremental sales analysis: {len(new_chunks) - len(revised_days)} new and "
+                f"{len(revised_days)} revised of {len(daily_chunks)} submitted days.")
+    # The interaction manager only prefetched the new and revised days.
+    prefetched = await _take_prefetched_intents(config, conversation, new_chunks, known_days)
+    if not new_chunks:
+        return {}
+
+    daily_intents = prefetched or await predict_sales_intent_batch_tool_async(new_chunks)
+    new_analysis = _daily_intent_analysis(new_chunks, daily_intents)
+
+    new_conversation = "\n".join(f"{chunk['day_marker']} {chunk['content']}" for chunk in new_chunks)
+    previous_analysis = {
+        "summary": previous_report.get("summary"),
+        "overall_intent": state.get("predicted_intent"),
+        "next_best_action": state.get("next_best_action"),
+    }
+    unchanged_breakdown = [item for item in previous_breakdown if item["day"] not in revised_days]
+    recent_days = [
+        {"day": item["day"], "intent": item["intent"]}
+        for item in unchanged_breakdown[-SALES_INCREMENTAL_RECENT_DAYS:]
+    ] if SALES_INCREMENTAL_RECENT_DAYS > 0 else []
+    final_analysis = await generate_incremental_sales_analysis_tool_async(
+        previous_analysis, recent_days, new_conversation, new_analysis
+    )
+    if final_analysis is None:
+        # Keeping the old report lets the same days be resubmitted once the LLM is back.
+        return {"errors": ["Sales Agent failed: the incremental analysis could not be generated; "
+                           "the previous report is unchanged."]}
+
+    logger.debug("---SUCCESS: Advanced Sales Agent Finished Task (incremental)---")
+
+    previous_conversation = state.get("sales_conversation") or ""
+    # Revised days keep their place in the breakdown; new days are appended.
+    updated = {item["day"]: item for item in new_analysis}
+    daily_breakdown = [updated.pop(item["day"], item) for item in previous_breakdown] + list(updated.values())
+    return {
+        "sales_conversation": f"{previous_conversation}\n{new_conversation}".strip(),
+        "predicted_intent": final_analysis.get("overall_intent", "N/A"),
+        "next_best_action": final_analysis.get("next_best_action", "N/A"),
+        "sales_analysis_report": {
+            "summary": final_analysis.get("summary"),
+            "daily_breakdown": daily_breakdown
+        }
+    }
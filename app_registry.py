@@ -0,0 +1,164 @@
+import logging
+import os
+import json
+import time
+import asyncio
+import importlib
+import importlib.util
+import threading
+from types import MappingProxyType
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+APP_REGISTRY_PATH = os.getenv(
+    "APP_REGISTRY_PATH",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), 'app_registry.json'))
+)
+APP_REGISTRY_POLL_SECONDS = float(os.getenv("APP_REGISTRY_POLL_SECONDS", "5"))  # 0 disables hot reload
+# Entrypoints are "<module>.<function>" where <module> lives in this package.
+APP_ENTRYPOINT_PACKAGE = "agents"
+
+
+class AppEntry(NamedTuple):
+    name: str
+    entrypoint: Optional[str]
+    required_fields: tuple
+    workflow_description: str
+    available: bool
+    problems: tuple  # why the app is unavailable, empty when it is available
+
+
+class RegistrySnapshot(NamedTuple):
+    apps: MappingProxyType  # name -> AppEntry
+    mtime: float
+    loaded_at: float
+
+
+def _check_entrypoint(entrypoint: str) -> Optional[str]:
+    """Imports the entrypoint's module and resolves the function; returns what is wrong, or None."""
+    module_name, attribute = entrypoint.split(".", 1)
+    qualified = f"{APP_ENTRYPOINT_PACKAGE}.{module_name}"
+    if importlib.util.find_spec(qualified) is None:
+        return f"no implementation for entrypoint '{entrypoint}' ({APP_ENTRYPOINT_PACKAGE}/{module_name}.py)"
+    try:
+        module = importlib.import_module(qualified)
+    except Exception as e:
+        return f"entrypoint module {qualified} failed to import: {e}"
+    if not callable(getattr(module, attribute, None)):
+        return f"entrypoint '{entrypoint}' not found: {qualified} has no function '{attribute}'"
+    return None
+
+
+def _validate_entry(name: str, raw) -> AppEntry:
+    """Turns one raw registry entry into an AppEntry, recording anything that makes it unusable."""
+    problems = []
+    if not isinstance(raw, dict):
+        raw, problems = {}, ["entry is not an object"]
+
+    entrypoint = raw.get("entrypoint")
+    if not isinstance(entrypoint, str) or "." not in entrypoint:
+        problems.append(f"invalid entrypoint {entrypoint!r}")
+    else:
+        problem = _check_entrypoint(entrypoint)
+        if problem:
+            problems.append(problem)
+
+    required_fields = raw.get("required_fields", [])
+    if not isinstance(required_fields, list) or not all(isinstance(field, str) for field in required_fields):
+        problems.append("required_fields must be a list of strings")
+        required_fields = []
+
+    return AppEntry(
+        name=name,
+        entrypoint=entrypoint if isinstance(entrypoint, str) else None,
+        required_fields=tuple(required_fields),
+        workflow_description=raw.get("workflow_description", ""),
+        available=not problems,
+        problems=tuple(problems),
+    )
+
+
+def load_registry_snapshot(path: str = APP_REGISTRY_PATH) -> RegistrySnapshot:
+    """Reads, validates and indexes app_registry.json. Raises if the file is missing or not valid JSON."""
+    mtime = os.stat(path).st_mtime
+    with open(path, 'r') as f:
+        raw_registry = json.load(f)
+    if not isinstance(raw_registry, dict):
+        raise ValueError("app_registry.json must contain a JSON object keyed by app name.")
+
+    apps = {name: _validate_entry(name, raw) for name, raw in raw_registry.items()}
+    for app in apps.values():
+        if not app.available:
+            logger.warning(f"⚠️ Registry: '{app.name}' is unavailable: {'; '.join(app.problems)}")
+    return RegistrySnapshot(apps=MappingProxyType(apps), mtime=mtime, loaded_at=time.time())
+
+
+class AppRegistry:
+    """
+    Process-wide view of app_registry.json. The file is parsed once into an
+    immutable snapshot; lookups are plain dict reads with no I/O. A new
+    snapshot is swapped in when the file's mtime changes (polled by `watch`)
+    or when `reload` is called, e.g. from a SIGHUP handler. A reload that
+    fails keeps serving the previous snapshot.
+    """
+
+    def __init__(self, path: str = APP_REGISTRY_PATH):
+        self.path = path
+        self._reload_lock = threading.Lock()
+        self.snapshot = load_registry_snapshot(path)
+
+    def get(self, app_name: str) -> Optional[AppEntry]:
+        return self.snapshot.apps.get(app_name)
+
+    def names(self) -> list[str]:
+        return list(self.snapshot.apps)
+
+    def reload(self, force: bool = True) -> bool:
+        """Re-reads the file (only if its mtime changed unless `force`). Returns True if a new snapshot was loaded."""
+        with self._reload_lock:
+            try:
+                if not force and os.stat(self.path).st_mtime == self.snapshot.mtime:
+                    return False
+                self.snapshot = load_registry_snapshot(self.path)
+            except (OSError, ValueError) as e:
+                logger.error(f"❌ ERROR reloading app registry, keeping the previous version: {e}")
+                return False
+        logger.info(f"🔄 App registry reloaded ({len(self.snapshot.apps)} apps).")
+        return True
+
+    async def watch(self, interval_seconds: float = APP_REGISTRY_POLL_SECONDS):
+        """Background task started in the FastAPI lifespan: hot-reloads on mtime change."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            await asyncio.to_thread(self.reload, False)
+
+    def describe(self) -> dict:
+        """Registry contents and availability for the admin endpoint."""
+        return {
+            "path": self.path,
+            "loaded_at": self.snapshot.loaded_at,
+            "apps": {
+                app.name: {
+                    "entrypoint": app.entrypoint,
+                    "required_fields": list(app.required_fields),
+                    "available": app.available,
+                    "problems": list(app.problems),
+                }
+                for app in self.snapshot.apps.values()
+            },
+        }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_app_registry() -> AppRegistry:
+    """Returns the process-wide registry, loading app_registry.json on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = AppRegistry()
+    return _registry
@@ -0,0 +1,107 @@
+"""
+Per-request logging overhead: the old print/pprint logging vs logging_config.
+
+Replays the log calls of one interactive sales request (stream events that
+carry the transcript, then the final state) against a synthetic state, and
+reports the time spent in the request's own code path, which is what blocks the
+event loop. Output goes to a temp file, as it would when stdout is redirected.
+
+    python benchmarks/bench_logging.py [--requests 200] [--transcript-kb 200] [--image-kb 1500]
+"""
+import os
+import sys
+import time
+import base64
+import pprint
+import logging
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import logging_config
+from logging_config import setup_logging, shutdown_logging, log_state
+
+EVENTS_PER_REQUEST = 8
+
+
+def build_state(transcript_kb: int, image_kb: int) -> dict:
+    day = "Day {n}: Customer asked about pricing, discounts and onboarding timelines. "
+    transcript = "".join(day.format(n=n) for n in range(transcript_kb * 1024 // len(day) + 1))[:transcript_kb * 1024]
+    return {
+        "initial_request": {"service": "sales"},
+        "interaction": {"collected_content": {"conversation": transcript, "operation": "Intent Analysis"}},
+        "sales_conversation": transcript,
+        "sales_analysis_report": {"summary": "s" * 2000, "daily_breakdown": [{"day": f"Day {n}", "intent": "Interested"} for n in range(200)]},
+        # Legacy responses carried the poster inline.
+        "image_base64": base64.b64encode(os.urandom(image_kb * 1024)).decode(),
+    }
+
+
+def old_request(state: dict, out):
+    print("📥 Service requested: 'sales' in 'interactive' mode.", file=out)
+    for _ in range(EVENTS_PER_REQUEST):
+        print(f"📡 Continue stream event: {('node', 'interaction_manager', state['interaction'])}", file=out)
+    print("\n🕵️‍♂️ --- INSPECTING FINAL STATE --- 🕵️‍♂️", file=out)
+    pprint.pprint(state, stream=out)
+    print("🕵️‍♂️ --- END OF FINAL STATE --- 🕵️‍♂️\n", file=out)
+
+
+def new_request(state: dict, logger: logging.Logger):
+    logger.info("📥 Service requested: 'sales' in 'interactive' mode.")
+    for _ in range(EVENTS_PER_REQUEST):
+        logger.debug("📡 Continue stream event", extra={"event": ("node", "interaction_manager", state["interaction"])})
+    log_state(logger, "🕵️‍♂️ Final state", state)
+
+
+def timed(fn, requests: int) -> list[float]:
+    samples = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return samples
+
+
+def report(name: str, samples: list[float]):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{name:<34} mean {statistics.mean(samples):9.3f} ms   p50 {statistics.median(samples):9.3f} ms   p95 {p95:9.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--transcript-kb", type=int, default=200)
+    parser.add_argument("--image-kb", type=int, default=1500)
+    args = parser.parse_args()
+
+    state = build_state(args.transcript_kb, args.image_kb)
+    sink = tempfile.TemporaryFile("w", encoding="utf-8")
+    print(f"{args.requests} requests, {args.transcript_kb} KB transcript, {args.image_kb} KB inline image\n")
+
+    report("before: print + pprint", timed(lambda: old_request(state, sink), args.requests))
+
+    stderr, sys.stderr = sys.stderr, sink  # setup_logging's handler writes to sys.stderr
+    try:
+        setup_logging()
+        logger = logging.getLogger("bench")
+        logging.getLogger().setLevel(logging.INFO)
+        report("after: INFO", timed(lambda: new_request(state, logger), args.requests))
+
+        logging.getLogger().setLevel(logging.DEBUG)
+        logging_config.LOG_STATE_SAMPLE_RATE = 0.01
+        report("after: DEBUG, 1% state sampling", timed(lambda: new_request(state, logger), args.requests))
+
+        logging_config.LOG_STATE_SAMPLE_RATE = 1.0
+        report("after: DEBUG, every state", timed(lambda: new_request(state, logger), args.requests))
+        started = time.perf_counter()
+        shutdown_logging()
+        print(f"\nlistener drained the queue in {(time.perf_counter() - started) * 1000.0:.1f} ms after the last request")
+    finally:
+        sys.stderr = stderr
+
+
+if __name__ == "__main__":
+    main()
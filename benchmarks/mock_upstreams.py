@@ -0,0 +1,182 @@
+"""
+Local stand-ins for the Groq chat API, the HF inference API and the a4f image
+API, for benchmarking without live upstreams. One server hosts all three:
+
+    /groq/openai/v1/chat/completions   (JSON or SSE when "stream": true)
+    /hf/models/{model}                 (single or batched text classification)
+    /a4f/v1/images/generations         -> /a4f/files/{n}.png
+
+Point the app at it with GROQ_BASE_URL=http://HOST:PORT/groq/openai/v1,
+HF_BASE_URL=http://HOST:PORT/hf and A4F_BASE_URL=http://HOST:PORT/a4f/v1.
+
+Latency specs are in milliseconds: "fixed:200", "uniform:100,300" or
+"lognormal:800,0.5" (median, sigma).
+
+    python benchmarks/mock_upstreams.py --port 8900 --groq-latency lognormal:800,0.4 --image-kb 1500
+"""
+import json
+import math
+import random
+import asyncio
+import argparse
+import itertools
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+LABELS = [f"LABEL_{n}" for n in range(8)]
+
+POSTER_QUESTIONS = {"questions": [
+    {"id": "visual_style", "text": "Which visual style fits best?", "ui_element": "radio",
+     "options": ["Neon", "Minimal", "Retro"]},
+    {"id": "color_palette", "text": "Pick a color palette.", "ui_element": "radio",
+     "options": ["Warm", "Cool", "Monochrome"]},
+    {"id": "effects", "text": "Finally, add some extra visual flair (optional):", "ui_element": "multiselect",
+     "options": ["Smoke", "Glow", "Grain"]},
+]}
+
+SALES_QUESTIONS = {"questions": [
+    {"id": f"clarification_{n}", "text": f"Clarifying question {n}?", "ui_element": "radio",
+     "options": ["Yes", "No", "Unsure"]} for n in range(1, 4)
+]}
+
+
+def parse_latency(spec: str):
+    """Returns a function that draws one latency in seconds from `spec`."""
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(",") if value]
+    if kind == "fixed":
+        return lambda: values[0] / 1000.0
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1]) / 1000.0
+    if kind == "lognormal":
+        median, sigma = values[0], values[1] if len(values) > 1 else 0.5
+        return lambda: random.lognormvariate(math.log(median), sigma) / 1000.0
+    raise ValueError(f"Unknown latency spec '{spec}'.")
+
+
+class UpstreamProfile:
+    def __init__(self, latency: str, error_rate: float, error_status: int):
+        self.draw_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self.errors = 0
+
+    async def delay(self) -> bool:
+        """Sleeps for one latency sample; returns True if this request should fail."""
+        self.requests += 1
+        await asyncio.sleep(self.draw_latency())
+        if random.random() < self.error_rate:
+            self.errors += 1
+            return True
+        return False
+
+    def error_response(self) -> Response:
+        return JSONResponse({"error": {"message": "mock upstream failure"}}, status_code=self.error_status)
+
+
+def _chat_content(prompt: str, completion_chars: int) -> dict:
+    if "Sales Intelligence" in prompt:
+        return SALES_QUESTIONS
+    if "UI/UX" in prompt:
+        return POSTER_QUESTIONS
+    return {
+        "summary": ("The prospect is engaged and asked about pricing and onboarding. " * 64)[:completion_chars],
+        "overall_intent": "Interested",
+        "next_best_action": "Send a tailored proposal and book a demo.",
+    }
+
+
+def build_app(args) -> FastAPI:
+    app = FastAPI(title="Mock upstreams")
+    profiles = {
+        "groq": UpstreamProfile(args.groq_latency, args.groq_error_rate, args.error_status),
+        "hf": UpstreamProfile(args.hf_latency, args.hf_error_rate, args.error_status),
+        "a4f": UpstreamProfile(args.a4f_latency, args.a4f_error_rate, args.error_status),
+    }
+    image = b"\x89PNG\r\n\x1a\n" + random.randbytes(max(0, args.image_kb * 1024 - 8))
+    image_ids = itertools.count()
+
+    @app.post("/groq/openai/v1/chat/completions")
+    async def chat(request: Request):
+        body = await request.json()
+        profile = profiles["groq"]
+        if await profile.delay():
+            return profile.error_response()
+        prompt = body["messages"][0]["content"]
+        text = json.dumps(_chat_content(prompt, args.completion_chars))
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(text) // 4,
+                 "total_tokens": (len(prompt) + len(text)) // 4}
+        if not body.get("stream"):
+            return {"id": "mock", "object": "chat.completion", "created": 0, "model": body["model"],
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                    "usage": usage}
+
+        async def events():
+            for start in range(0, len(text), 24):
+                chunk = {"id": "mock", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                         "choices": [{"index": 0, "delta": {"content": text[start:start + 24]}, "finish_reason": None}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(args.token_interval_ms / 1000.0)
+            final = {"id": "mock", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage}
+            yield f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/hf/models/{model:path}")
+    async def classify(model: str, request: Request):
+        body = await request.json()
+        profile = profiles["hf"]
+        if await profile.delay():
+            return profile.error_response()
+        inputs = body["inputs"]
+        if isinstance(inputs, list):
+            return [[{"label": random.choice(LABELS), "score": 0.9}] for _ in inputs]
+        return [[{"label": random.choice(LABELS), "score": 0.9}]]
+
+    @app.post("/a4f/v1/images/generations")
+    async def generate_image(request: Request):
+        profile = profiles["a4f"]
+        if await profile.delay():
+            return profile.error_response()
+        base = str(request.base_url).rstrip("/")
+        return {"data": [{"url": f"{base}/a4f/files/{next(image_ids)}.png"}]}
+
+    @app.get("/a4f/files/{name}")
+    async def image_file(name: str):
+        return Response(image, media_type="image/png")
+
+    @app.get("/stats")
+    async def stats():
+        return {name: {"requests": p.requests, "errors": p.errors} for name, p in profiles.items()}
+
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Mock options, shared with run_load_test.py which passes them through."""
+    parser.add_argument("--groq-latency", default="lognormal:600,0.4")
+    parser.add_argument("--hf-latency", default="lognormal:150,0.3")
+    parser.add_argument("--a4f-latency", default="lognormal:4000,0.3")
+    parser.add_argument("--groq-error-rate", type=float, default=0.0)
+    parser.add_argument("--hf-error-rate", type=float, default=0.0)
+    parser.add_argument("--a4f-error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--image-kb", type=int, default=1500, help="size of every generated image")
+    parser.add_argument("--completion-chars", type=int, default=1500, help="length of the sales summary")
+    parser.add_argument("--token-interval-ms", type=float, default=5.0, help="delay between streamed chunks")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(build_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
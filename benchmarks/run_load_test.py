@@ -0,0 +1,311 @@
+"""
+Offline load test: runs the real app (uvicorn main:app) against the local mock
+upstreams in benchmarks/mock_upstreams.py and drives complete flows at a fixed
+concurrency.
+
+Scenarios:
+  poster       interactive poster: /generate, then /continue until the image is ready
+  sales        interactive sales: /generate, the conversation form, the clarifying answers
+  poster_auto  autonomous /generate for a poster (the endpoint takes no other input)
+  sales_auto   autonomous /generate for sales
+
+Interactive flows only count as successful if they end with that agent's
+result; the generic "Workflow completed!" fallback is an error.
+
+Reports p50/p95/p99 latency per scenario (whole flows and single requests),
+throughput in requests and flows per second, error counts, the mocks' request
+counts and the app's peak RSS. Caches are off unless --keep-caches, so every
+flow does its full upstream work.
+
+    python benchmarks/run_load_test.py --concurrency 20 --duration 60 --scenarios poster=1,sales=2
+    python benchmarks/run_load_test.py --flows 200 --groq-latency fixed:300 --a4f-error-rate 0.05 --json out.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+from collections import defaultdict
+
+import httpx
+
+from mock_upstreams import add_arguments as add_mock_arguments
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SCENARIOS = ("poster", "sales", "poster_auto", "sales_auto")
+MAX_STEPS = 12
+
+
+def percentile(samples: list[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100.0 * len(ordered) + 0.5)) - 1))]
+
+
+def parse_weights(spec: str) -> dict:
+    weights = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario '{name}'; choose from {', '.join(SCENARIOS)}.")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def sales_conversation(days: int, flow_id: int) -> str:
+    lines = [
+        "Customer asked about pricing tiers and annual discounts.",
+        "Rep shared the deck; customer wants to loop in their CTO.",
+        "Customer raised concerns about onboarding time.",
+        "Customer requested a live demo for the team.",
+        "Customer compared us with a competitor on price.",
+    ]
+    return " ".join(f"Day {day}: [flow {flow_id}] {random.choice(lines)}" for day in range(1, days + 1))
+
+
+def answer_questions(questions: list[dict], flow_id: int, conversation: str) -> dict:
+    answers = {}
+    for question in questions:
+        fields = question.get("fields") if question.get("ui_element") == "form" else [question]
+        for field in fields:
+            field_id = field["id"]
+            options = field.get("options") or []
+            if field_id == "conversation":
+                answers[field_id] = conversation
+            elif field_id == "main_idea":
+                # Distinct per flow, so neither single-flight nor caches merge flows.
+                answers[field_id] = f"A poster for community workshop number {flow_id} about Python"
+            elif field.get("ui_element") == "multiselect" or field.get("type") == "multiselect":
+                answers[field_id] = options[:1]
+            elif options:
+                answers[field_id] = options[0]
+            else:
+                answers[field_id] = f"Answer for flow {flow_id}"
+    return answers
+
+
+class Results:
+    def __init__(self):
+        self.flow_latencies = defaultdict(list)
+        self.request_latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.requests = 0
+
+    def request(self, scenario: str, seconds: float):
+        self.requests += 1
+        self.request_latencies[scenario].append(seconds)
+
+
+async def post(client: httpx.AsyncClient, results: Results, scenario: str, path: str, body: dict) -> dict:
+    started = time.perf_counter()
+    response = await client.post(path, json=body)
+    results.request(scenario, time.perf_counter() - started)
+    response.raise_for_status()
+    return response.json()
+
+
+async def run_flow(client: httpx.AsyncClient, results: Results, scenario: str, flow_id: int, args):
+    started = time.perf_counter()
+    service = scenario.split("_")[0]
+    try:
+        if scenario.endswith("_auto"):
+            reply = await post(client, results, scenario, "/generate", {"service": service, "mode": "autonomous"})
+        else:
+            conversation = sales_conversation(args.conversation_days, flow_id)
+            reply = await post(client, results, scenario, "/generate", {"service": service, "mode": "interactive"})
+            for _ in range(MAX_STEPS):
+                if reply.get("status") != "requires_input":
+                    break
+                answers = answer_questions(reply["questions"], flow_id, conversation)
+                reply = await post(client, results, scenario, "/continue",
+                                   {"thread_id": reply["thread_id"], "user_answers": answers})
+        if reply.get("status") != "success":
+            raise RuntimeError(f"flow ended with status {reply.get('status')!r}")
+        # A failed agent still ends in "success", as the generic orchestrator response.
+        if not scenario.endswith("_auto") and reply.get("agent_type") != service:
+            raise RuntimeError(f"flow ended without a {service} result: {reply.get('message')!r}")
+    except Exception as e:
+        results.errors[scenario] += 1
+        if args.verbose:
+            print(f"flow {flow_id} ({scenario}) failed: {e!r}", file=sys.stderr)
+        return
+    results.flow_latencies[scenario].append(time.perf_counter() - started)
+
+
+async def drive(args, weights: dict) -> tuple[Results, float]:
+    results = Results()
+    names, scenario_weights = list(weights), list(weights.values())
+    flow_ids = iter(range(args.flows if args.flows else sys.maxsize))
+    deadline = time.perf_counter() + args.duration
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.app_port}", timeout=args.timeout, limits=limits) as client:
+        async def worker():
+            for flow_id in flow_ids:
+                if not args.flows and time.perf_counter() >= deadline:
+                    return
+                await run_flow(client, results, random.choices(names, scenario_weights)[0], flow_id, args)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(args.concurrency)])
+        return results, time.perf_counter() - started
+
+
+class RssMonitor(threading.Thread):
+    """Samples the app's resident set size from /proc; the kernel's VmHWM gives the true peak."""
+
+    def __init__(self, pid: int):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.peak_kb = 0
+        self._done = threading.Event()
+
+    def _read(self, field: str) -> int:
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith(field + ":"):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        return 0
+
+    def run(self):
+        while not self._done.wait(0.2):
+            self.peak_kb = max(self.peak_kb, self._read("VmRSS"))
+
+    def stop(self) -> float:
+        self.peak_kb = max(self.peak_kb, self._read("VmHWM"))
+        self._done.set()
+        return self.peak_kb / 1024.0
+
+
+def wait_until_up(url: str, process: subprocess.Popen, seconds: float = 60.0):
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"{url} exited with code {process.returncode} before becoming ready.")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"{url} did not come up within {seconds:.0f}s.")
+
+
+def mock_argv(args) -> list[str]:
+    argv = []
+    for name in ("groq_latency", "hf_latency", "a4f_latency", "groq_error_rate", "hf_error_rate", "a4f_error_rate",
+                 "error_status", "image_kb", "completion_chars", "token_interval_ms"):
+        argv += ["--" + name.replace("_", "-"), str(getattr(args, name))]
+    return argv
+
+
+def app_env(args, data_dir: str) -> dict:
+    mock = f"http://127.0.0.1:{args.mock_port}"
+    env = dict(os.environ)
+    env.update({
+        "GROQ_BASE_URL": f"{mock}/groq/openai/v1",
+        "HF_BASE_URL": f"{mock}/hf",
+        "A4F_BASE_URL": f"{mock}/a4f/v1",
+        "GROQ_API_KEY": "mock", "HUGGINGFACE_TOKEN": "mock", "IMAGEGEN_API_KEY": "mock",
+        "SALES_INTENT_BACKEND": "hf",
+        "LOG_LEVEL": args.log_level,
+        "ARTIFACT_DIR": os.path.join(data_dir, "artifacts"),
+        "IMAGE_CACHE_DIR": os.path.join(data_dir, "image_cache"),
+        "CHECKPOINT_SQLITE_PATH": os.path.join(data_dir, "checkpoints.sqlite"),
+    })
+    if not args.keep_caches:
+        env.update({"QUESTION_CACHE_ENABLED": "false", "IMAGE_CACHE_ENABLED": "false", "INTENT_MEMO_ENABLED": "false"})
+    return env
+
+
+def report(args, results: Results, elapsed: float, peak_rss_mb: float, mock_stats: dict) -> dict:
+    summary = {
+        "elapsed_s": round(elapsed, 2),
+        "concurrency": args.concurrency,
+        "requests": results.requests,
+        "rps": round(results.requests / elapsed, 2) if elapsed else 0.0,
+        "flows": sum(len(v) for v in results.flow_latencies.values()),
+        "flows_per_s": round(sum(len(v) for v in results.flow_latencies.values()) / elapsed, 2) if elapsed else 0.0,
+        "errors": sum(results.errors.values()),
+        "peak_rss_mb": round(peak_rss_mb, 1),
+        "upstream_requests": mock_stats,
+        "scenarios": {},
+    }
+    print(f"\n{results.requests} requests in {elapsed:.1f}s at concurrency {args.concurrency}: "
+          f"{summary['rps']} req/s, {summary['flows_per_s']} flows/s, peak RSS {summary['peak_rss_mb']} MB\n")
+    print(f"{'scenario':<12} {'flows':>6} {'errors':>6}   {'flow p50':>9} {'p95':>8} {'p99':>8}   "
+          f"{'request p50':>11} {'p95':>8} {'p99':>8}")
+    for scenario in sorted(set(results.request_latencies) | set(results.errors)):
+        flows, requests = results.flow_latencies[scenario], results.request_latencies[scenario]
+        row = {
+            "flows": len(flows), "errors": results.errors[scenario],
+            "flow_p50_s": percentile(flows, 50), "flow_p95_s": percentile(flows, 95), "flow_p99_s": percentile(flows, 99),
+            "request_p50_s": percentile(requests, 50), "request_p95_s": percentile(requests, 95),
+            "request_p99_s": percentile(requests, 99),
+        }
+        summary["scenarios"][scenario] = {key: round(value, 4) for key, value in row.items()}
+        print(f"{scenario:<12} {row['flows']:>6} {row['errors']:>6}   {row['flow_p50_s']:>8.3f}s {row['flow_p95_s']:>7.3f}s "
+              f"{row['flow_p99_s']:>7.3f}s   {row['request_p50_s']:>10.3f}s {row['request_p95_s']:>7.3f}s "
+              f"{row['request_p99_s']:>7.3f}s")
+    print(f"\nupstream requests: {json.dumps(mock_stats)}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=10, help="flows in flight at once")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run (ignored with --flows)")
+    parser.add_argument("--flows", type=int, default=0, help="run exactly this many flows instead of --duration")
+    parser.add_argument("--scenarios", default="poster=1,sales=1", help="weighted mix, e.g. poster=1,sales=2,sales_auto=1")
+    parser.add_argument("--conversation-days", type=int, default=20, help="days in each generated sales conversation")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request client timeout, seconds")
+    parser.add_argument("--app-port", type=int, default=8800)
+    parser.add_argument("--mock-port", type=int, default=8900)
+    parser.add_argument("--keep-caches", action="store_true", help="leave question/image/intent caches on")
+    parser.add_argument("--log-level", default="WARNING", help="LOG_LEVEL for the app under test")
+    parser.add_argument("--json", help="also write the summary to this file")
+    parser.add_argument("--verbose", action="store_true", help="print every failed flow")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+    weights = parse_weights(args.scenarios)
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory(prefix="load-test-") as data_dir:
+        mock = subprocess.Popen([sys.executable, os.path.join(here, "mock_upstreams.py"), "--port", str(args.mock_port)]
+                                + mock_argv(args))
+        app = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.app_port),
+                                "--log-level", "warning", "--no-access-log"], cwd=REPO_ROOT, env=app_env(args, data_dir))
+        try:
+            wait_until_up(f"http://127.0.0.1:{args.mock_port}/stats", mock)
+            wait_until_up(f"http://127.0.0.1:{args.app_port}/metrics", app)
+            monitor = RssMonitor(app.pid)
+            monitor.start()
+            results, elapsed = asyncio.run(drive(args, weights))
+            peak_rss_mb = monitor.stop()
+            mock_stats = httpx.get(f"http://127.0.0.1:{args.mock_port}/stats").json()
+        finally:
+            for process in (app, mock):
+                process.terminate()
+            for process in (app, mock):
+                try:
+                    process.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+    summary = report(args, results, elapsed, peak_rss_mb, mock_stats)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
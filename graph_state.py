@@ -37,7 +37,7 @@ class AgentState(TypedDict):
     # Poster Agent
     poster_fields: Optional[Dict[str, Any]]
     image_prompt: Optional[str]
-    final_image: Optional[str]
+    final_image_artifact: Optional[Dict[str, Any]]  # {"id", "size", "content_type", "url"} in storage/artifacts.py
     
     # Sales Agent
     sales_conversation: Optional[str]
@@ -0,0 +1,184 @@
+import os
+import json
+import queue
+import random
+import logging
+import threading
+import logging.handlers
+from typing import Any, Optional
+
+# --- Configuration ---
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Per-module overrides, e.g. "tools.sales_tools=DEBUG,main=WARNING".
+LOG_LEVELS = os.getenv("LOG_LEVELS", "httpx=WARNING,httpcore=WARNING")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()  # "text" | "json"
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "500"))
+LOG_MAX_MESSAGE_CHARS = int(os.getenv("LOG_MAX_MESSAGE_CHARS", "4000"))
+LOG_REDACT_KEYS = {
+    key.strip().lower() for key in os.getenv(
+        "LOG_REDACT_KEYS", "api_key,authorization,password,secret,token,hf_token,image_base64"
+    ).split(",") if key.strip()
+}
+LOG_STATE_SAMPLE_RATE = float(os.getenv("LOG_STATE_SAMPLE_RATE", "0.01"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Attributes every LogRecord has; anything else came in through `extra=` and is a structured field.
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+
+def compact_for_log(value: Any, max_chars: int = LOG_MAX_FIELD_CHARS, _depth: int = 0) -> Any:
+    """
+    Copy of `value` that is safe to log: keys listed in LOG_REDACT_KEYS are
+    masked, long strings and bytes are cut to `max_chars` with their original
+    length noted, and long lists or deep nesting are elided.
+    """
+    if isinstance(value, dict):
+        if _depth >= 8:
+            return f"<dict of {len(value)} keys>"
+        return {
+            key: "***" if str(key).lower() in LOG_REDACT_KEYS else compact_for_log(item, max_chars, _depth + 1)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        if _depth >= 8:
+            return f"<list of {len(value)} items>"
+        items = [compact_for_log(item, max_chars, _depth + 1) for item in value[:20]]
+        if len(value) > 20:
+            items.append(f"<{len(value) - 20} more items>")
+        return items
+    if isinstance(value, (bytes, bytearray)):
+        return f"<{len(value)} bytes>"
+    if isinstance(value, str) and len(value) > max_chars:
+        return f"{value[:max_chars]}…<{len(value)} chars>"
+    return value
+
+
+class _CompactingFormatter(logging.Formatter):
+    """Text or JSON lines with the (already compacted) `extra=` fields appended."""
+
+    def __init__(self, as_json: bool):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        self.as_json = as_json
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        if len(message) > LOG_MAX_MESSAGE_CHARS:
+            message = f"{message[:LOG_MAX_MESSAGE_CHARS]}…<{len(message)} chars>"
+        fields = {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+        if self.as_json:
+            entry = {"ts": round(record.created, 3), "level": record.levelname, "logger": record.name, "msg": message}
+            entry.update(fields)
+            if record.exc_info:
+                entry["exc"] = self.formatException(record.exc_info)
+            return json.dumps(entry, ensure_ascii=False, default=str)
+
+        record.message = message
+        record.asctime = self.formatTime(record)
+        line = self.formatMessage(record)
+        if fields:
+            line += " " + json.dumps(fields, ensure_ascii=False, default=str)
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread without ever blocking the caller.
+    The message and the `extra=` fields are rendered and compacted here, since
+    the caller may mutate them afterwards; this only happens for records that
+    pass the level check. Formatting and the stdout write happen on the
+    listener thread. When the queue is full the record is dropped and counted.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        for key, value in list(vars(record).items()):
+            if key not in _RECORD_ATTRS:
+                setattr(record, key, compact_for_log(value))
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[_DroppingQueueHandler] = None
+_setup_lock = threading.Lock()
+_state_dumps = {"sampled": 0, "skipped": 0}
+
+
+def _parse_levels(spec: str) -> dict:
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging():
+    """
+    Installs the queue-backed root handler and the configured levels. Safe to
+    call more than once; only the first call does anything.
+    """
+    global _listener, _queue_handler
+    with _setup_lock:
+        if _listener is not None:
+            return
+        log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        output = logging.StreamHandler()
+        output.setFormatter(_CompactingFormatter(as_json=LOG_FORMAT == "json"))
+        _queue_handler = _DroppingQueueHandler(log_queue)
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_queue_handler)
+        root.setLevel(LOG_LEVEL)
+        for name, level in _parse_levels(LOG_LEVELS).items():
+            logging.getLogger(name).setLevel(level)
+
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+        _listener.start()
+
+
+def shutdown_logging():
+    """Flushes the queue and stops the listener thread."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def log_state(logger: logging.Logger, label: str, state: dict):
+    """
+    Debug dump of a (possibly large) graph state, compacted and emitted for
+    only a LOG_STATE_SAMPLE_RATE fraction of calls.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    if random.random() >= LOG_STATE_SAMPLE_RATE:
+        _state_dumps["skipped"] += 1
+        return
+    _state_dumps["sampled"] += 1
+    logger.debug(label, extra={"state": dict(state)})
+
+
+def get_logging_stats() -> dict:
+    return {
+        "level": logging.getLevelName(logging.getLogger().level),
+        "format": LOG_FORMAT,
+        "queue_size": _queue_handler.queue.qsize() if _queue_handler else 0,
+        "dropped": _queue_handler.dropped if _queue_handler else 0,
+        "state_dumps": dict(_state_dumps),
+    }
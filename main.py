@@ -1,114 +1,469 @@
-import pprint
 import uuid
-from fastapi import FastAPI
+import logging
+import base64
+import json
+from contextlib import asynccontextmanager
+import asyncio
+import os
+import signal
+import secrets
+from fastapi import APIRouter, Depends, FastAPI, Header, HTTPException, Request
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
-from supervisor import app as langgraph_app
+from logging_config import setup_logging, shutdown_logging, log_state, get_logging_stats
+setup_logging()  # before the graph modules below, which log while they are imported
+from supervisor import app as langgraph_app, checkpointer
+from storage.thread_lifecycle import ThreadLifecycleManager
+from storage.artifacts import get_artifact_store
+from tools.sales_tools import SALES_INTENT_BACKEND
+from tools.intent_batcher import get_intent_batcher_stats
+from tools.question_cache import get_question_cache
+from tools.intent_memo import get_intent_memo
+from tools.intent_prefetch import get_intent_prefetcher
+from tools.question_prefetch import get_question_prefetcher
+from tools.image_speculation import get_image_speculator
+from tools.image_cache import get_image_cache
+from tools.poster_tools import get_image_flight_stats
+from tools.transcript_compactor import get_transcript_compactor
+from tools.clients import aclose_clients
+from tools.resilience import deadline, get_circuit_stats
+from tools.rate_limiter import PRIORITY_AUTONOMOUS, PRIORITY_INTERACTIVE, request_priority, get_rate_limiter_stats
+from tools.llm import STREAM_TOKENS_CONFIG_KEY, LLM_SINGLE_FLIGHT_ENABLED, get_llm_flight_stats
+from app_registry import APP_REGISTRY_POLL_SECONDS, get_app_registry
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render_metrics
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "2"))  # also how often a disconnect is checked
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")  # /admin/* is disabled while unset
 
 # --- Pydantic Models ---
 class ServiceRequest(BaseModel):
     service: str  # "poster" | "sales"
     mode: str = "interactive"  # "interactive" | "autonomous"
+    response_format: str = "url"  # poster results: "url" | "file" (raw image body) | "base64" (legacy inline JSON)
 
 class ContinueRequest(BaseModel):
     thread_id: str
     user_answers: Dict[str, Any]
+    response_format: str = "url"
+
+class PrefetchRequest(BaseModel):
+    thread_id: str
+    partial_idea: str
+
+# Bounds the checkpointer: idle TTL plus LRU eviction under THREAD_MAX_COUNT / THREAD_MAX_BYTES.
+thread_manager = ThreadLifecycleManager(checkpointer)
+
+# --- Startup / Shutdown ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_logging()  # no-op unless a previous shutdown stopped the listener
+    if SALES_INTENT_BACKEND == "local":
+        # Load the BERT model once at startup instead of on the first sales request.
+        from tools.local_bert_engine import get_local_intent_engine
+        get_local_intent_engine()
+    sweeper = asyncio.create_task(thread_manager.run_periodic_sweeps())
+    artifact_sweeper = asyncio.create_task(get_artifact_store().run_periodic_sweeps())
+    # app_registry.json is parsed once; it is re-read when its mtime changes or on SIGHUP.
+    registry = get_app_registry()
+    registry_watcher = asyncio.create_task(registry.watch()) if APP_REGISTRY_POLL_SECONDS > 0 else None
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, registry.reload)
+    except (NotImplementedError, RuntimeError, AttributeError):
+        pass  # no SIGHUP on this platform / not on the main thread
+    yield
+    sweeper.cancel()
+    artifact_sweeper.cancel()
+    if registry_watcher is not None:
+        registry_watcher.cancel()
+    await aclose_clients()
+    shutdown_logging()
 
 # --- FastAPI Setup ---
-app = FastAPI(title="Agentic LangGraph Backend", version="2.0.0")
+app = FastAPI(title="Agentic LangGraph Backend", version="2.0.0", lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"],
 )
 
+# --- Admin Auth ---
+async def require_admin(authorization: Optional[str] = Header(None), x_admin_token: Optional[str] = Header(None)):
+    """/admin/* is opt-in: it needs ADMIN_TOKEN, sent as `Authorization: Bearer ...` or `X-Admin-Token`."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin API is disabled; set ADMIN_TOKEN to enable it.")
+    token = x_admin_token
+    if token is None and authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:].strip()
+    if not token or not secrets.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token.", headers={"WWW-Authenticate": "Bearer"})
+
+admin = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
+
+# --- Graph Runner ---
+async def _run_until_pause(graph_input: dict, config: dict, interactive: bool = True):
+    """
+    Streams a graph run as ("node", name, update) and ("token", chunk) items and,
+    when the interaction_manager asks the user something, a final
+    ("requires_input", questions) item.
+
+    The graph loops back into interaction_manager after asking, so a run is
+    paused by no longer consuming it. We wait until that step's checkpoint is
+    emitted and then close the stream, so the saved state is always the one
+    right after the question was asked.
+    """
+    graph_stream = langgraph_app.astream(graph_input, config=config, stream_mode=["updates", "custom", "checkpoints"])
+    questions = None
+    try:
+        async for mode, chunk in graph_stream:
+            if mode == "checkpoints":
+                if questions is not None:
+                    yield ("requires_input", questions)
+                    return
+            elif mode == "custom":
+                yield ("token", chunk)
+            else:
+                for node, output in chunk.items():
+                    yield ("node", node, output)
+                    output = output or {}
+                    if interactive and node == "interaction_manager" \
+                            and output.get("interaction_is_required") and output.get("questions_for_user"):
+                        questions = output["questions_for_user"]
+    finally:
+        await graph_stream.aclose()
+
 # --- Generate Endpoint ---
 @app.post("/generate")
 async def generate(payload: ServiceRequest):
-    print(f"📥 Service requested: '{payload.service}' in '{payload.mode}' mode.")
+    logger.info(f"📥 Service requested: '{payload.service}' in '{payload.mode}' mode.")
     thread_id = str(uuid.uuid4())
     config = {"configurable": {"thread_id": thread_id}}
+    thread_manager.touch(thread_id)
 
     initial_input = {
         "initial_request": {"service": payload.service},
         "execution_mode": payload.mode
     }
 
-    print("🚀 Starting LangGraph execution...")
+    logger.info("🚀 Starting LangGraph execution...")
 
-    if payload.mode == "interactive":
-        async for event in langgraph_app.astream(initial_input, config=config):
-            print(f"📡 Stream event: {event}")
+    # Every retry, backoff and upstream call of this request shares one deadline budget,
+    # and its calls queue in the rate limiters ahead of autonomous runs when it is interactive.
+    priority = PRIORITY_INTERACTIVE if payload.mode == "interactive" else PRIORITY_AUTONOMOUS
+    with deadline(), request_priority(priority):
+        if payload.mode == "interactive":
+            async for event in _run_until_pause(initial_input, config):
+                logger.debug("📡 Stream event", extra={"event": event})
 
-            if "interaction_manager" in event:
-                node_output = event["interaction_manager"]
-                print(f"🔍 DEBUG: interaction_manager output: {node_output}")
-
-                if node_output.get("interaction_is_required") and node_output.get("questions_for_user"):
-                    print(f"⏸️ Graph paused for user input. Thread ID: {thread_id}")
+                if event[0] == "requires_input":
+                    logger.info(f"⏸️ Graph paused for user input. Thread ID: {thread_id}")
                     return {
                         "status": "requires_input",
                         "thread_id": thread_id,
-                        "questions": node_output["questions_for_user"]
+                        "questions": event[1]
                     }
 
-        final_state = await langgraph_app.aget_state(config=config)
-        return format_final_response(final_state)
+            final_state = await langgraph_app.aget_state(config=config)
+            return format_final_response(final_state, payload.response_format)
 
-    else: # Autonomous mode
-        final_state = await langgraph_app.ainvoke(initial_input, config=config)
-        print("✅ Autonomous graph execution finished.")
-        return format_final_response(final_state)
+        else: # Autonomous mode
+            final_state = await langgraph_app.ainvoke(initial_input, config=config)
+            logger.info("✅ Autonomous graph execution finished.")
+            return format_final_response(final_state, payload.response_format)
 
 # --- Continue Endpoint ---
 @app.post("/continue")
 async def continue_workflow(payload: ContinueRequest):
-    print(f"▶️ Continuing workflow for thread: {payload.thread_id}")
+    logger.info(f"▶️ Continuing workflow for thread: {payload.thread_id}")
     config = {"configurable": {"thread_id": payload.thread_id}}
+    thread_manager.touch(payload.thread_id)
     user_answer_input = {"user_answers": payload.user_answers}
 
-    async for event in langgraph_app.astream(user_answer_input, config=config):
-        print(f"📡 Continue stream event: {event}")
+    with deadline(), request_priority(PRIORITY_INTERACTIVE):
+        async for event in _run_until_pause(user_answer_input, config):
+            logger.debug("📡 Continue stream event", extra={"event": event})
 
-        if "interaction_manager" in event:
-            node_output = event["interaction_manager"]
-            if node_output.get("interaction_is_required") and node_output.get("questions_for_user"):
-                print(f"⏸️ Graph paused AGAIN for user input. Thread ID: {payload.thread_id}")
+            if event[0] == "requires_input":
+                logger.info(f"⏸️ Graph paused AGAIN for user input. Thread ID: {payload.thread_id}")
                 return {
                     "status": "requires_input",
                     "thread_id": payload.thread_id,
-                    "questions": node_output["questions_for_user"]
+                    "questions": event[1]
                 }
 
-    final_state = await langgraph_app.aget_state(config=config)
-    print("✅ Continued graph execution finished.")
-    return format_final_response(final_state)
+        final_state = await langgraph_app.aget_state(config=config)
+        logger.info("✅ Continued graph execution finished.")
+        return format_final_response(final_state, payload.response_format)
+
+
+# --- Streaming (Server-Sent Events) Endpoints ---
+def _sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def _stream_graph_run(request: Request, graph_input: dict, thread_id: str, interactive: bool):
+    """
+    Runs the graph in a background task and relays it as SSE:
+    `thread` first, then a `node` event per node update and a `token` event per
+    LLM delta, and finally `requires_input`, `result` or `error`. If the client
+    goes away, the run is cancelled.
+    """
+    config = {"configurable": {"thread_id": thread_id, STREAM_TOKENS_CONFIG_KEY: True}}
+    events = asyncio.Queue()
+
+    async def run_graph():
+        try:
+            with deadline(), request_priority(PRIORITY_INTERACTIVE if interactive else PRIORITY_AUTONOMOUS):
+                async for event in _run_until_pause(graph_input, config, interactive):
+                    if event[0] == "token":
+                        events.put_nowait(_sse_event("token", event[1]))
+                    elif event[0] == "node":
+                        events.put_nowait(_sse_event("node", {"node": event[1], "update": event[2]}))
+                    else:
+                        logger.info(f"⏸️ Streamed graph paused for user input. Thread ID: {thread_id}")
+                        events.put_nowait(_sse_event("requires_input", {
+                            "status": "requires_input",
+                            "thread_id": thread_id,
+                            "questions": event[1]
+                        }))
+                        return
+                final_state = await langgraph_app.aget_state(config=config)
+                events.put_nowait(_sse_event("result", format_final_response(final_state)))
+        except Exception as e:
+            logger.error(f"❌ ERROR in streamed graph run {thread_id}: {e}", exc_info=True)
+            events.put_nowait(_sse_event("error", {"status": "error", "thread_id": thread_id, "message": str(e)}))
+        finally:
+            events.put_nowait(None)
+
+    runner = asyncio.create_task(run_graph())
+    try:
+        yield _sse_event("thread", {"thread_id": thread_id})
+        while True:
+            try:
+                event = await asyncio.wait_for(events.get(), SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    logger.info(f"🔌 Client disconnected, cancelling thread {thread_id}.")
+                    break
+                yield ": keep-alive\n\n"
+                continue
+            if event is None:
+                break
+            yield event
+    finally:
+        runner.cancel()
+
+def _sse_response(generator) -> StreamingResponse:
+    return StreamingResponse(
+        generator,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/generate/stream")
+async def generate_stream(payload: ServiceRequest, request: Request):
+    logger.info(f"📥 Service requested (stream): '{payload.service}' in '{payload.mode}' mode.")
+    thread_id = str(uuid.uuid4())
+    thread_manager.touch(thread_id)
+    initial_input = {
+        "initial_request": {"service": payload.service},
+        "execution_mode": payload.mode
+    }
+    return _sse_response(_stream_graph_run(request, initial_input, thread_id, payload.mode == "interactive"))
+
+@app.post("/continue/stream")
+async def continue_stream(payload: ContinueRequest, request: Request):
+    logger.info(f"▶️ Continuing workflow (stream) for thread: {payload.thread_id}")
+    thread_manager.touch(payload.thread_id)
+    return _sse_response(_stream_graph_run(request, {"user_answers": payload.user_answers}, payload.thread_id, True))
 
 
+# --- Speculative Question Prefetch ---
+@app.post("/prefetch")
+async def prefetch(payload: PrefetchRequest):
+    """
+    Called by the client while the user types the poster idea. Cheap: it only
+    (re)starts a debounced background generation of the follow-up questions,
+    and only for a thread whose checkpoint is waiting for `main_idea`.
+    """
+    prefetcher = get_question_prefetcher()
+    if prefetcher is None:
+        return {"status": "disabled"}
+    state = await langgraph_app.aget_state(config={"configurable": {"thread_id": payload.thread_id}})
+    pending = (state.values or {}).get("questions_for_user") or []
+    if not any(question.get("id") == "main_idea" for question in pending):
+        return {"status": "not_awaiting_idea"}
+    return {"status": prefetcher.report(payload.thread_id, payload.partial_idea)}
+
+
+# --- Artifacts (generated images) ---
+@app.get("/artifacts/{artifact_id}")
+async def get_artifact(artifact_id: str):
+    store = get_artifact_store()
+    path = store.path(artifact_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Unknown artifact '{artifact_id}'.")
+    await asyncio.to_thread(store.touch, artifact_id)  # keeps served artifacts out of retention sweeps
+    # Content-addressed, so the bytes behind an id never change.
+    return FileResponse(
+        path,
+        media_type=await asyncio.to_thread(store.content_type, artifact_id),
+        headers={"Cache-Control": "public, max-age=31536000, immutable", "ETag": f'"{artifact_id}"'},
+    )
+
+
+# --- Admin: Intent Micro-Batcher Metrics ---
+@admin.get("/intent-batcher")
+async def intent_batcher_stats():
+    stats = get_intent_batcher_stats()
+    if stats is None:
+        return {"status": "idle", "message": "Micro-batcher has not received any requests yet."}
+    return {"status": "ok", **stats}
+
+# --- Admin: Question Cache Metrics ---
+@admin.get("/question-cache")
+async def question_cache_stats():
+    cache = get_question_cache()
+    if cache is None:
+        return {"status": "disabled"}
+    return {"status": "ok", **cache.stats()}
+
+# --- Admin: Intent Memo Metrics ---
+@admin.get("/intent-memo")
+async def intent_memo_stats():
+    memo = get_intent_memo()
+    if memo is None:
+        return {"status": "disabled"}
+    return {"status": "ok", **memo.stats()}
+
+# --- Admin: Background Intent Classification ---
+@admin.get("/intent-prefetch")
+async def intent_prefetch_stats():
+    prefetcher = get_intent_prefetcher()
+    if prefetcher is None:
+        return {"status": "disabled"}
+    return {"status": "ok", **prefetcher.stats()}
+
+# --- Admin: Speculative Question Prefetch ---
+@admin.get("/question-prefetch")
+async def question_prefetch_stats():
+    prefetcher = get_question_prefetcher()
+    if prefetcher is None:
+        return {"status": "disabled"}
+    return {"status": "ok", **prefetcher.stats()}
+
+# --- Admin: Speculative Poster Images ---
+@admin.get("/image-speculation")
+async def image_speculation_stats():
+    speculator = get_image_speculator()
+    if speculator is None:
+        return {"status": "disabled"}
+    return {"status": "ok", **speculator.stats()}
+
+# --- Admin: Image Cache Metrics ---
+@admin.get("/image-cache")
+async def image_cache_stats():
+    cache = get_image_cache()
+    if cache is None:
+        return {"status": "disabled", "single_flight": get_image_flight_stats()}
+    stats = await asyncio.to_thread(cache.stats)
+    return {"status": "ok", **stats, "single_flight": get_image_flight_stats()}
+
+# --- Admin: LLM Request Coalescing ---
+@admin.get("/llm-single-flight")
+async def llm_single_flight_stats():
+    if not LLM_SINGLE_FLIGHT_ENABLED:
+        return {"status": "disabled"}
+    return {"status": "ok", **get_llm_flight_stats()}
+
+# --- Admin: Upstream Circuit Breakers ---
+@admin.get("/circuits")
+async def circuit_stats():
+    return {"status": "ok", "circuits": get_circuit_stats()}
+
+# --- Admin: Upstream Rate Limiters ---
+@admin.get("/rate-limits")
+async def rate_limit_stats():
+    return {"status": "ok", "limiters": get_rate_limiter_stats()}
+
+# --- Prometheus Metrics ---
+@app.get("/metrics")
+async def metrics():
+    """Node latencies, external call latencies/errors/retries, circuit rejections, rate-limiter queue waits, LLM tokens and downloaded bytes."""
+    return PlainTextResponse(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+# --- Admin: Logging ---
+@admin.get("/logging")
+async def logging_stats():
+    return {"status": "ok", **get_logging_stats()}
+
+# --- Admin: Sales Prompt Size ---
+@admin.get("/sales-prompt")
+async def sales_prompt_stats():
+    return {"status": "ok", **get_transcript_compactor().stats()}
+
+# --- Admin: App Registry ---
+@admin.get("/registry")
+async def registry_info():
+    return get_app_registry().describe()
+
+@admin.post("/registry/reload")
+async def registry_reload():
+    reloaded = await asyncio.to_thread(get_app_registry().reload)
+    return {"status": "ok" if reloaded else "error", **get_app_registry().describe()}
+
+# --- Admin: Thread Lifecycle ---
+@admin.get("/threads")
+async def list_threads(limit: int = 100):
+    return await thread_manager.report_async(limit)
+
+@admin.delete("/threads/{thread_id}")
+async def delete_thread(thread_id: str):
+    if not await thread_manager.delete_async(thread_id):
+        raise HTTPException(status_code=404, detail=f"Unknown thread '{thread_id}'.")
+    return {"status": "deleted", "thread_id": thread_id}
+
+@admin.post("/threads/sweep")
+async def sweep_threads():
+    return {"status": "ok", "evicted": await thread_manager.enforce_async()}
+
+app.include_router(admin)
+
 # --- Response Formatter (FIXED) ---
-def format_final_response(state):
-    print("\n🕵️‍♂️ --- INSPECTING FINAL STATE --- 🕵️‍♂️")
-    # This safely gets the dictionary of values from the state object
-    final_state_values = getattr(state, 'values', state)
-    pprint.pprint(final_state_values)
-    print("🕵️‍♂️ --- END OF FINAL STATE --- 🕵️‍♂️\n")
-
-    if final_state_values.get("final_image"):
-        print("🎨 Formatting response for Poster Agent...")
-        return {
+def format_final_response(state, response_format: str = "url"):
+    # A StateSnapshot from aget_state, or the plain dict returned by ainvoke
+    # (whose `.values` is the dict method, so getattr alone is not enough)
+    final_state_values = state if isinstance(state, dict) else state.values
+    # Sampled, compacted debug dump; large fields are truncated and secrets redacted.
+    log_state(logger, "🕵️‍♂️ Final state", final_state_values)
+
+    if final_state_values.get("final_image_artifact"):
+        logger.info("🎨 Formatting response for Poster Agent...")
+        artifact = final_state_values["final_image_artifact"]
+        path = get_artifact_store().path(artifact["id"])
+        if response_format == "file" and path is not None:
+            # The image itself as the response body, streamed from disk.
+            return FileResponse(path, media_type=artifact["content_type"], headers={"X-Artifact-Id": artifact["id"]})
+        response = {
             "status": "success",
             "agent_type": "poster",
-            "image_base64": final_state_values.get("final_image", ""),
+            "image_url": artifact["url"],
+            "artifact": artifact,
             "message": "Poster generated!"
         }
+        if response_format == "base64" and path is not None:
+            response["image_base64"] = base64.b64encode(get_artifact_store().read(artifact["id"])).decode('utf-8')
+        return response
     
     # ✅ --- THIS IS THE FIX --- ✅
     # Instead of looking for just `next_best_action`, we now look for the
     # rich `sales_analysis_report` object. This is a much better indicator
     # that the advanced sales agent ran successfully.
     elif final_state_values.get("sales_analysis_report"):
-        print("💼 Formatting response for Advanced Sales Agent...")
+        logger.info("💼 Formatting response for Advanced Sales Agent...")
         return {
             "status": "success",
             "agent_type": "sales",
@@ -0,0 +1,246 @@
+import os
+import time
+import bisect
+import inspect
+import functools
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterable
+
+# --- Configuration ---
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series = {}  # label values tuple -> value(s)
+        _REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = sorted(self._series.items())
+            lines.extend(self._render_series(series))
+        return lines
+
+    def _render_series(self, series: list) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in series]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; each series keeps bucket counts, a sum and a count."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def _render_series(self, series: list) -> list[str]:
+        lines = []
+        for key, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+_REGISTRY: list[_Metric] = []
+
+NODE_DURATION = Histogram(
+    "graph_node_duration_seconds", "Wall time of one LangGraph node execution.", ("node", "service"))
+NODE_ERRORS = Counter(
+    "graph_node_errors_total", "LangGraph node executions that raised or returned errors.", ("node", "service"))
+EXTERNAL_CALL_DURATION = Histogram(
+    "external_call_duration_seconds", "Latency of one call to an external dependency (one attempt).",
+    ("service", "operation", "model"))
+EXTERNAL_CALL_ERRORS = Counter(
+    "external_call_errors_total", "External calls (attempts) that raised.", ("service", "operation", "model"))
+EXTERNAL_CALL_RETRIES = Counter(
+    "external_call_retries_total", "Retries scheduled after a failed external call.", ("service", "operation"))
+CIRCUIT_REJECTIONS = Counter(
+    "circuit_breaker_rejections_total", "Calls failed fast because the upstream's circuit was open.", ("service",))
+RATE_LIMIT_QUEUE_WAIT = Histogram(
+    "rate_limit_queue_wait_seconds", "Time a call waited in the client-side rate limiter before it was sent.",
+    ("provider", "model", "priority"))
+RATE_LIMIT_PAUSES = Counter(
+    "rate_limit_pauses_total", "Rate-limiter queues paused after an upstream 429.", ("provider", "model"))
+DEADLINE_EXCEEDED = Counter(
+    "request_deadline_exceeded_total", "External calls abandoned because the request deadline ran out.",
+    ("service", "operation"))
+LLM_TOKENS = Counter(
+    "llm_tokens_total", "Tokens reported by the LLM provider.", ("model", "kind"))
+DOWNLOADED_BYTES = Counter(
+    "downloaded_bytes_total", "Bytes downloaded from external services.", ("service", "operation"))
+
+
+@contextmanager
+def track_call(service: str, operation: str, model: str = ""):
+    """Times the enclosed external call and counts it as an error if it raises."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        EXTERNAL_CALL_ERRORS.inc(service=service, operation=operation, model=model)
+        raise
+    finally:
+        EXTERNAL_CALL_DURATION.observe(time.perf_counter() - started, service=service, operation=operation, model=model)
+
+
+def record_retry(service: str, operation: str):
+    if METRICS_ENABLED:
+        EXTERNAL_CALL_RETRIES.inc(service=service, operation=operation)
+
+
+def record_circuit_rejection(service: str):
+    if METRICS_ENABLED:
+        CIRCUIT_REJECTIONS.inc(service=service)
+
+
+def record_deadline_exceeded(service: str, operation: str):
+    if METRICS_ENABLED:
+        DEADLINE_EXCEEDED.inc(service=service, operation=operation)
+
+
+def record_queue_wait(provider: str, model: str, priority: str, seconds: float):
+    if METRICS_ENABLED:
+        RATE_LIMIT_QUEUE_WAIT.observe(seconds, provider=provider, model=model, priority=priority)
+
+
+def record_rate_limit_pause(provider: str, model: str):
+    if METRICS_ENABLED:
+        RATE_LIMIT_PAUSES.inc(provider=provider, model=model)
+
+
+def record_tokens(model: str, usage):
+    """Adds an OpenAI-style usage object (or dict) to llm_tokens_total; None is ignored."""
+    if not METRICS_ENABLED or usage is None:
+        return
+    if not isinstance(usage, dict):
+        usage = {"prompt_tokens": getattr(usage, "prompt_tokens", 0), "completion_tokens": getattr(usage, "completion_tokens", 0)}
+    LLM_TOKENS.inc(usage.get("prompt_tokens") or 0, model=model, kind="prompt")
+    LLM_TOKENS.inc(usage.get("completion_tokens") or 0, model=model, kind="completion")
+
+
+def record_download(service: str, operation: str, size: int):
+    if METRICS_ENABLED:
+        DOWNLOADED_BYTES.inc(size, service=service, operation=operation)
+
+
+def _service_of(state) -> str:
+    if isinstance(state, dict):
+        return (state.get("initial_request") or {}).get("service", "")
+    return ""
+
+
+def _count_failed_update(name: str, state, update):
+    # Agent nodes catch their own exceptions and report them as {"errors": [...]}.
+    if isinstance(update, dict) and update.get("errors"):
+        NODE_ERRORS.inc(node=name, service=_service_of(state))
+
+
+def instrument_node(name: str, fn: Callable) -> Callable:
+    """
+    Wraps a graph node so every execution is timed and failures (raised, or
+    returned as a non-empty `errors` list) are counted, labelled by node and
+    by the run's service. functools.wraps keeps the signature, so LangGraph
+    still injects `config` into nodes that take it.
+    """
+    if not METRICS_ENABLED:
+        return fn
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_node(state, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                update = await fn(state, *args, **kwargs)
+                _count_failed_update(name, state, update)
+                return update
+            except Exception:
+                NODE_ERRORS.inc(node=name, service=_service_of(state))
+                raise
+            finally:
+                NODE_DURATION.observe(time.perf_counter() - started, node=name, service=_service_of(state))
+        return async_node
+
+    @functools.wraps(fn)
+    def node(state, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            update = fn(state, *args, **kwargs)
+            _count_failed_update(name, state, update)
+            return update
+        except Exception:
+            NODE_ERRORS.inc(node=name, service=_service_of(state))
+            raise
+        finally:
+            NODE_DURATION.observe(time.perf_counter() - started, node=name, service=_service_of(state))
+    return node
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
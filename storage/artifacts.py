@@ -0,0 +1,265 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Iterable, AsyncIterable, Optional
+
+# --- Configuration ---
+ARTIFACT_DIR = os.getenv(
+    "ARTIFACT_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'artifacts'))
+)
+ARTIFACT_CHUNK_SIZE = int(os.getenv("ARTIFACT_CHUNK_SIZE", str(64 * 1024)))
+# Retention: artifacts not written or served for this long are deleted; 0 disables.
+ARTIFACT_MAX_AGE_SECONDS = int(os.getenv("ARTIFACT_MAX_AGE_SECONDS", str(7 * 24 * 3600)))
+# Least recently used artifacts are deleted beyond this total size; 0 disables.
+ARTIFACT_MAX_BYTES = int(os.getenv("ARTIFACT_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+ARTIFACT_SWEEP_INTERVAL_SECONDS = int(os.getenv("ARTIFACT_SWEEP_INTERVAL_SECONDS", "600"))
+
+logger = logging.getLogger(__name__)
+
+# Magic-byte prefixes of the formats the image upstream can return.
+_CONTENT_TYPES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF8", "image/gif"),
+)
+
+
+def sniff_content_type(head: bytes) -> str:
+    """Guesses the MIME type from the first bytes of an artifact."""
+    for magic, content_type in _CONTENT_TYPES:
+        if head.startswith(magic):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+class ArtifactWriter:
+    """
+    Incremental write into the store: chunks are hashed and appended to a temp
+    file as they arrive, and `commit` renames the file to its content address.
+    Only one chunk is ever held in memory.
+    """
+
+    def __init__(self, store: "ArtifactStore"):
+        self.store = store
+        self._hash = hashlib.sha256()
+        self._size = 0
+        self._head = b""
+        fd, self._tmp_path = tempfile.mkstemp(dir=store.root, prefix=".tmp-")
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, chunk: bytes):
+        if len(self._head) < 16:
+            self._head += chunk[:16 - len(self._head)]
+        self._hash.update(chunk)
+        self._file.write(chunk)
+        self._size += len(chunk)
+
+    def commit(self) -> dict:
+        """Moves the temp file into place (or drops it if the content is already stored)."""
+        self._file.close()
+        artifact_id = self._hash.hexdigest()
+        directory = os.path.join(self.store.root, artifact_id[:2])
+        final_path = os.path.join(directory, artifact_id)
+        if os.path.exists(final_path):
+            os.remove(self._tmp_path)
+            self.store.touch(artifact_id)
+        else:
+            os.makedirs(directory, exist_ok=True)
+            os.replace(self._tmp_path, final_path)
+        return self.store.reference(artifact_id, self._size, sniff_content_type(self._head))
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+class ArtifactStore:
+    """
+    Content-addressed blob store on local disk. An artifact's id is the sha256
+    of its bytes, so identical images are stored once and ids never go stale.
+    Graph state keeps only the small reference returned by `put`; the bytes are
+    served from disk by the /artifacts/{id} endpoint.
+
+    Layout: <root>/<id[:2]>/<id>. Writes go to a temp file in the same
+    directory and are renamed into place, so readers never see partial files.
+
+    Retention: a file's mtime is its last write or serve; `enforce_retention`
+    deletes artifacts older than `max_age_seconds` and then the least
+    recently used ones until the store is under `max_bytes`.
+    """
+
+    def __init__(self, root: str = ARTIFACT_DIR, max_age_seconds: int = ARTIFACT_MAX_AGE_SECONDS,
+                 max_bytes: int = ARTIFACT_MAX_BYTES):
+        self.root = root
+        self.max_age_seconds = max_age_seconds
+        self.max_bytes = max_bytes
+        self.evictions = {"expired": 0, "lru": 0}
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def _valid_id(artifact_id: str) -> bool:
+        return len(artifact_id) == 64 and all(c in "0123456789abcdef" for c in artifact_id)
+
+    def path(self, artifact_id: str) -> Optional[str]:
+        """Filesystem path of an artifact, or None if the id is malformed or unknown."""
+        if not self._valid_id(artifact_id):
+            return None
+        path = os.path.join(self.root, artifact_id[:2], artifact_id)
+        return path if os.path.exists(path) else None
+
+    def writer(self) -> ArtifactWriter:
+        return ArtifactWriter(self)
+
+    def put(self, data: bytes) -> dict:
+        """Stores `data` (if not already present) and returns its reference."""
+        return self.put_stream([data])
+
+    def put_stream(self, chunks: Iterable[bytes]) -> dict:
+        """Stores an artifact from an iterable of byte chunks without buffering it whole."""
+        writer = self.writer()
+        try:
+            for chunk in chunks:
+                writer.write(chunk)
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.commit()
+
+    async def put_stream_async(self, chunks: AsyncIterable[bytes]) -> dict:
+        """Async variant of put_stream, e.g. for httpx `response.aiter_bytes()`.
+        File I/O (temp file, chunk writes, rename) runs in a worker thread so the event loop is never blocked on disk."""
+        writer = await asyncio.to_thread(self.writer)
+        try:
+            async for chunk in chunks:
+                await asyncio.to_thread(writer.write, chunk)
+        except BaseException:
+            await asyncio.shield(asyncio.to_thread(writer.abort))
+            raise
+        return await asyncio.to_thread(writer.commit)
+
+    @staticmethod
+    def reference(artifact_id: str, size: int, content_type: str) -> dict:
+        """The small dict stored in graph state in place of the bytes."""
+        return {
+            "id": artifact_id,
+            "size": size,
+            "content_type": content_type,
+            "url": f"/artifacts/{artifact_id}",
+        }
+
+    def content_type(self, artifact_id: str) -> str:
+        path = self.path(artifact_id)
+        if path is None:
+            return "application/octet-stream"
+        with open(path, "rb") as f:
+            return sniff_content_type(f.read(16))
+
+    def read(self, artifact_id: str) -> bytes:
+        path = self.path(artifact_id)
+        if path is None:
+            raise KeyError(artifact_id)
+        with open(path, "rb") as f:
+            return f.read()
+
+    def delete(self, artifact_id: str) -> bool:
+        path = self.path(artifact_id)
+        if path is None:
+            return False
+        os.remove(path)
+        return True
+
+    def touch(self, artifact_id: str):
+        """Marks an artifact as used now, so retention keeps it."""
+        path = self.path(artifact_id)
+        if path is not None:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+
+    # --- Retention ---
+    def _scan(self) -> list[tuple[float, int, str]]:
+        """(mtime, size, path) of every stored artifact and of temp files left behind by crashed writes."""
+        files = []
+        for entry in os.scandir(self.root):
+            if entry.is_dir():
+                candidates = (e for e in os.scandir(entry.path) if self._valid_id(e.name))
+            elif entry.name.startswith(".tmp-"):
+                candidates = (entry,)
+            else:
+                continue
+            for item in candidates:
+                try:
+                    stat = item.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, item.path))
+        return files
+
+    def enforce_retention(self) -> dict:
+        """Deletes expired artifacts, then LRU ones beyond max_bytes; returns how many went for each reason."""
+        files = self._scan()
+        now = time.time()
+        evicted = {"expired": 0, "lru": 0}
+        kept = []
+        for mtime, size, path in files:
+            # Temp files are only ever removed once expired; they may still be being written.
+            expired = self.max_age_seconds > 0 and now - mtime > self.max_age_seconds
+            if expired or os.path.basename(path).startswith(".tmp-"):
+                if expired and self._remove(path):
+                    evicted["expired"] += 1
+                continue
+            kept.append((mtime, size, path))
+
+        if self.max_bytes > 0:
+            total = sum(size for _, size, _ in kept)
+            for mtime, size, path in sorted(kept):
+                if total <= self.max_bytes:
+                    break
+                if self._remove(path):
+                    evicted["lru"] += 1
+                total -= size
+
+        if evicted["expired"] or evicted["lru"]:
+            logger.info(f"🧹 Artifact sweep deleted {evicted['expired']} expired and {evicted['lru']} LRU artifacts.")
+        self.evictions["expired"] += evicted["expired"]
+        self.evictions["lru"] += evicted["lru"]
+        return evicted
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    async def run_periodic_sweeps(self, interval_seconds: int = ARTIFACT_SWEEP_INTERVAL_SECONDS):
+        """Background task started in the FastAPI lifespan."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await asyncio.to_thread(self.enforce_retention)
+            except Exception as e:
+                logger.error(f"❌ ERROR during artifact sweep: {e}")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_artifact_store() -> ArtifactStore:
+    """Returns the process-wide artifact store."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ArtifactStore()
+    return _store
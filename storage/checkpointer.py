@@ -0,0 +1,631 @@
+import logging
+import os
+import time
+import random
+import sqlite3
+import asyncio
+import threading
+from typing import Any, Iterator, AsyncIterator, Optional, Sequence
+
+import ormsgpack
+import zstandard
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import MemorySaver
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "sqlite").lower()  # "sqlite" | "redis" | "memory"
+CHECKPOINT_SQLITE_PATH = os.getenv(
+    "CHECKPOINT_SQLITE_PATH",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'checkpoints.sqlite'))
+)
+CHECKPOINT_REDIS_URL = os.getenv("CHECKPOINT_REDIS_URL", "redis://localhost:6379/0")
+CHECKPOINT_TTL_SECONDS = int(os.getenv("CHECKPOINT_TTL_SECONDS", str(24 * 3600)))  # 0 disables eviction
+CHECKPOINT_SWEEP_INTERVAL_SECONDS = int(os.getenv("CHECKPOINT_SWEEP_INTERVAL_SECONDS", "300"))
+CHECKPOINT_COMPRESSION_THRESHOLD = int(os.getenv("CHECKPOINT_COMPRESSION_THRESHOLD", "1024"))
+# Checkpoints kept per thread and namespace; older ones, their writes and unreferenced blobs are dropped. 0 keeps all.
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "10"))
+
+_RAW = b"r"
+_ZSTD = b"z"
+
+
+class DurableCheckpointSaver(BaseCheckpointSaver):
+    """
+    Shared logic for the durable checkpointers. Subclasses only implement the
+    storage primitives (_store_*, _load_*, _iter_checkpoints, _prune,
+    _delete_thread, _evict_idle); this class handles the LangGraph protocol,
+    the compact msgpack + zstd encoding of every stored value, pruning of old
+    checkpoints and TTL sweeps.
+    """
+
+    def __init__(self, ttl_seconds: int = CHECKPOINT_TTL_SECONDS, keep_last: int = CHECKPOINT_KEEP_LAST):
+        super().__init__()
+        self.ttl_seconds = ttl_seconds
+        self.keep_last = keep_last
+        self._compressor = zstandard.ZstdCompressor(level=3)
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._last_sweep = time.time()
+
+    # --- Encoding ---
+    def _encode(self, value: Any) -> bytes:
+        """serde.dumps_typed -> msgpack [type, data] -> zstd when it pays off."""
+        type_, data = self.serde.dumps_typed(value)
+        packed = ormsgpack.packb([type_, data])
+        if len(packed) >= CHECKPOINT_COMPRESSION_THRESHOLD:
+            return _ZSTD + self._compressor.compress(packed)
+        return _RAW + packed
+
+    def _decode(self, blob: bytes) -> Any:
+        packed = blob[1:]
+        if blob[:1] == _ZSTD:
+            packed = self._decompressor.decompress(packed)
+        type_, data = ormsgpack.unpackb(packed)
+        return self.serde.loads_typed((type_, data))
+
+    # --- Storage primitives (implemented by subclasses) ---
+    def _store_checkpoint(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str, parent_id: Optional[str],
+                          checkpoint: bytes, metadata: bytes, blobs: list[tuple[str, str, Optional[bytes]]]):
+        raise NotImplementedError
+
+    def _load_checkpoint(self, thread_id: str, checkpoint_ns: str, checkpoint_id: Optional[str]) -> Optional[tuple]:
+        """Returns (checkpoint_id, parent_id, checkpoint, metadata); the latest one when checkpoint_id is None."""
+        raise NotImplementedError
+
+    def _iter_checkpoints(self, thread_id: Optional[str], checkpoint_ns: Optional[str],
+                          before_id: Optional[str]) -> Iterator[tuple]:
+        """Yields (thread_id, checkpoint_ns, checkpoint_id, parent_id, checkpoint, metadata), newest first."""
+        raise NotImplementedError
+
+    def _load_blobs(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> dict[str, bytes]:
+        raise NotImplementedError
+
+    def _store_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str,
+                      rows: list[tuple[str, int, str, bytes, str]], overwrite: bool):
+        raise NotImplementedError
+
+    def _load_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> list[tuple[str, str, bytes]]:
+        """Returns (task_id, channel, value) rows ordered by task and write index."""
+        raise NotImplementedError
+
+    def _prune(self, thread_id: str, checkpoint_ns: str, keep: int) -> int:
+        """Drops all but the newest `keep` checkpoints of the namespace; returns how many were removed."""
+        raise NotImplementedError
+
+    def _delete_thread(self, thread_id: str):
+        raise NotImplementedError
+
+    def _evict_idle(self, cutoff: float) -> int:
+        """Deletes every thread last written before `cutoff`; returns how many were removed."""
+        raise NotImplementedError
+
+    def thread_stats(self) -> dict[str, dict]:
+        """Returns {thread_id: {"bytes", "checkpoints", "last_access"}} for every stored thread."""
+        raise NotImplementedError
+
+    def _referenced_versions(self, checkpoint_blobs) -> set[tuple[str, str]]:
+        """(channel, version) pairs still read by the given stored checkpoints."""
+        referenced = set()
+        for blob in checkpoint_blobs:
+            for channel, version in self._decode(blob)["channel_versions"].items():
+                referenced.add((channel, str(version)))
+        return referenced
+
+    # --- TTL ---
+    def evict_idle_threads(self) -> int:
+        """Deletes threads idle for longer than the TTL."""
+        if self.ttl_seconds <= 0:
+            return 0
+        evicted = self._evict_idle(time.time() - self.ttl_seconds)
+        if evicted:
+            logger.info(f"🧹 Evicted {evicted} idle checkpoint threads (TTL {self.ttl_seconds}s).")
+        return evicted
+
+    def _maybe_sweep(self):
+        now = time.time()
+        if now - self._last_sweep >= CHECKPOINT_SWEEP_INTERVAL_SECONDS:
+            self._last_sweep = now
+            self.evict_idle_threads()
+
+    # --- LangGraph checkpointer protocol ---
+    def _build_tuple(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str, parent_id: Optional[str],
+                     checkpoint_blob: bytes, metadata_blob: bytes, metadata: Optional[dict] = None) -> CheckpointTuple:
+        checkpoint: Checkpoint = self._decode(checkpoint_blob)
+        channel_values = {
+            channel: self._decode(blob)
+            for channel, blob in self._load_blobs(thread_id, checkpoint_ns, checkpoint["channel_versions"]).items()
+        }
+        writes = self._load_writes(thread_id, checkpoint_ns, checkpoint_id)
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}},
+            checkpoint={**checkpoint, "channel_values": channel_values},
+            metadata=metadata if metadata is not None else self._decode(metadata_blob),
+            pending_writes=[(task_id, channel, self._decode(value)) for task_id, channel, value in writes],
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_id}}
+                if parent_id else None
+            ),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        row = self._load_checkpoint(thread_id, checkpoint_ns, get_checkpoint_id(config))
+        if row is None:
+            return None
+        checkpoint_id, parent_id, checkpoint_blob, metadata_blob = row
+        return self._build_tuple(thread_id, checkpoint_ns, checkpoint_id, parent_id, checkpoint_blob, metadata_blob)
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"] if config else None
+        checkpoint_ns = config["configurable"].get("checkpoint_ns") if config else None
+        config_checkpoint_id = get_checkpoint_id(config) if config else None
+        before_id = get_checkpoint_id(before) if before else None
+
+        for row in self._iter_checkpoints(thread_id, checkpoint_ns, before_id):
+            row_thread_id, row_ns, checkpoint_id, parent_id, checkpoint_blob, metadata_blob = row
+            if config_checkpoint_id and checkpoint_id != config_checkpoint_id:
+                continue
+            metadata = self._decode(metadata_blob)
+            if filter and not all(metadata.get(key) == value for key, value in filter.items()):
+                continue
+            if limit is not None:
+                if limit <= 0:
+                    break
+                limit -= 1
+            yield self._build_tuple(row_thread_id, row_ns, checkpoint_id, parent_id,
+                                    checkpoint_blob, metadata_blob, metadata=metadata)
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        stored = checkpoint.copy()
+        values = stored.pop("channel_values")
+        blobs = [
+            (channel, str(version), self._encode(values[channel]) if channel in values else None)
+            for channel, version in new_versions.items()
+        ]
+        self._store_checkpoint(
+            thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+            self._encode(stored), self._encode(get_checkpoint_metadata(config, metadata)), blobs
+        )
+        if self.keep_last > 0:
+            self._prune(thread_id, checkpoint_ns, self.keep_last)
+        self._maybe_sweep()
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = [
+            (task_id, WRITES_IDX_MAP.get(channel, idx), channel, self._encode(value), task_path)
+            for idx, (channel, value) in enumerate(writes)
+        ]
+        # Special writes (errors, interrupts, ...) replace earlier ones; regular writes are kept once.
+        overwrite = all(channel in WRITES_IDX_MAP for channel, _ in writes)
+        self._store_writes(thread_id, checkpoint_ns, checkpoint_id, rows, overwrite)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self._delete_thread(thread_id)
+
+    # Storage calls block on disk or network, so the async API runs them in a worker thread.
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+
+class SqliteCheckpointSaver(DurableCheckpointSaver):
+    """Single-node durable checkpointer. WAL mode lets several uvicorn workers share one file."""
+
+    def __init__(self, path: str = CHECKPOINT_SQLITE_PATH, ttl_seconds: int = CHECKPOINT_TTL_SECONDS,
+                 keep_last: int = CHECKPOINT_KEEP_LAST):
+        super().__init__(ttl_seconds=ttl_seconds, keep_last=keep_last)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS threads (
+                thread_id TEXT PRIMARY KEY,
+                last_access REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL DEFAULT '',
+                checkpoint_id TEXT NOT NULL,
+                parent_checkpoint_id TEXT,
+                checkpoint BLOB NOT NULL,
+                metadata BLOB NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+            );
+            CREATE TABLE IF NOT EXISTS blobs (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL DEFAULT '',
+                channel TEXT NOT NULL,
+                version TEXT NOT NULL,
+                value BLOB,
+                PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+            );
+            CREATE TABLE IF NOT EXISTS writes (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL DEFAULT '',
+                checkpoint_id TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                channel TEXT NOT NULL,
+                value BLOB NOT NULL,
+                task_path TEXT NOT NULL DEFAULT '',
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+            );
+            CREATE INDEX IF NOT EXISTS threads_last_access ON threads (last_access);
+        """)
+        self.conn.commit()
+
+    def _store_checkpoint(self, thread_id, checkpoint_ns, checkpoint_id, parent_id, checkpoint, metadata, blobs):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint_id, parent_id, checkpoint, metadata)
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?)",
+                [(thread_id, checkpoint_ns, channel, version, value) for channel, version, value in blobs]
+            )
+            self.conn.execute("INSERT OR REPLACE INTO threads VALUES (?, ?)", (thread_id, time.time()))
+
+    def _load_checkpoint(self, thread_id, checkpoint_ns, checkpoint_id):
+        with self._lock:
+            if checkpoint_id:
+                cursor = self.conn.execute(
+                    "SELECT checkpoint_id, parent_checkpoint_id, checkpoint, metadata FROM checkpoints "
+                    "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id)
+                )
+            else:
+                cursor = self.conn.execute(
+                    "SELECT checkpoint_id, parent_checkpoint_id, checkpoint, metadata FROM checkpoints "
+                    "WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns)
+                )
+            return cursor.fetchone()
+
+    def _iter_checkpoints(self, thread_id, checkpoint_ns, before_id):
+        clauses, params = [], []
+        if thread_id is not None:
+            clauses.append("thread_id = ?")
+            params.append(thread_id)
+        if checkpoint_ns is not None:
+            clauses.append("checkpoint_ns = ?")
+            params.append(checkpoint_ns)
+        if before_id is not None:
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, checkpoint, metadata "
+                f"FROM checkpoints {where} ORDER BY thread_id, checkpoint_ns, checkpoint_id DESC",
+                params
+            ).fetchall()
+        return iter(rows)
+
+    def _load_blobs(self, thread_id, checkpoint_ns, versions):
+        if not versions:
+            return {}
+        pairs = [item for channel, version in versions.items() for item in (channel, str(version))]
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT channel, value FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? "
+                f"AND (channel, version) IN (VALUES {', '.join(['(?, ?)'] * len(versions))})",
+                (thread_id, checkpoint_ns, *pairs)
+            ).fetchall()
+        return {channel: value for channel, value in rows if value is not None}
+
+    def _store_writes(self, thread_id, checkpoint_ns, checkpoint_id, rows, overwrite):
+        verb = "INSERT OR REPLACE" if overwrite else "INSERT OR IGNORE"
+        with self._lock, self.conn:
+            self.conn.executemany(
+                f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, value, task_path)
+                 for task_id, idx, channel, value, task_path in rows]
+            )
+
+    def _load_writes(self, thread_id, checkpoint_ns, checkpoint_id):
+        with self._lock:
+            return self.conn.execute(
+                "SELECT task_id, channel, value FROM writes "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+                (thread_id, checkpoint_ns, checkpoint_id)
+            ).fetchall()
+
+    def _prune(self, thread_id, checkpoint_ns, keep):
+        with self._lock, self.conn:
+            kept = self.conn.execute(
+                "SELECT checkpoint_id, checkpoint FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "ORDER BY checkpoint_id DESC LIMIT ?",
+                (thread_id, checkpoint_ns, keep)
+            ).fetchall()
+            if len(kept) < keep:
+                return 0
+            oldest_kept = kept[-1][0]
+            removed = self.conn.execute(
+                "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+                (thread_id, checkpoint_ns, oldest_kept)
+            ).rowcount
+            if not removed:
+                return 0
+            self.conn.execute(
+                "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+                (thread_id, checkpoint_ns, oldest_kept)
+            )
+            # Channels that did not change keep pointing at old versions, so only unreferenced blobs go.
+            referenced = self._referenced_versions(blob for _, blob in kept)
+            stale = [
+                (thread_id, checkpoint_ns, channel, version)
+                for channel, version in self.conn.execute(
+                    "SELECT channel, version FROM blobs WHERE thread_id = ? AND checkpoint_ns = ?",
+                    (thread_id, checkpoint_ns)
+                )
+                if (channel, version) not in referenced
+            ]
+            self.conn.executemany(
+                "DELETE FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?", stale
+            )
+        return removed
+
+    def _delete_thread(self, thread_id):
+        with self._lock, self.conn:
+            for table in ("checkpoints", "blobs", "writes", "threads"):
+                self.conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    def _evict_idle(self, cutoff):
+        with self._lock, self.conn:
+            stale = [row[0] for row in self.conn.execute(
+                "SELECT thread_id FROM threads WHERE last_access < ?", (cutoff,)
+            )]
+            for thread_id in stale:
+                for table in ("checkpoints", "blobs", "writes", "threads"):
+                    self.conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+        return len(stale)
+
+
+    def thread_stats(self):
+        with self._lock:
+            stats = {
+                thread_id: {"bytes": 0, "checkpoints": 0, "last_access": last_access}
+                for thread_id, last_access in self.conn.execute("SELECT thread_id, last_access FROM threads")
+            }
+            queries = (
+                "SELECT thread_id, COUNT(*), SUM(LENGTH(checkpoint) + LENGTH(metadata)) FROM checkpoints GROUP BY thread_id",
+                "SELECT thread_id, 0, SUM(IFNULL(LENGTH(value), 0)) FROM blobs GROUP BY thread_id",
+                "SELECT thread_id, 0, SUM(LENGTH(value)) FROM writes GROUP BY thread_id",
+            )
+            for query in queries:
+                for thread_id, count, size in self.conn.execute(query):
+                    entry = stats.setdefault(thread_id, {"bytes": 0, "checkpoints": 0, "last_access": 0.0})
+                    entry["checkpoints"] += count
+                    entry["bytes"] += size or 0
+        return stats
+
+
+class RedisCheckpointSaver(DurableCheckpointSaver):
+    """
+    Multi-node durable checkpointer for any Redis-compatible server. Takes a
+    redis-py style client, so a local stand-in (e.g. fakeredis) can serve it
+    in tests. Every key of a thread carries the TTL, refreshed on each write,
+    so Redis evicts idle threads by itself.
+
+    Key layout (prefix "lg"):
+      lg:threads                      zset  thread_id -> last write time
+      lg:keys:{thread}                set   every key owned by the thread
+      lg:idx:{thread}:{ns}            zset  checkpoint ids (lexicographic order)
+      lg:cp:{thread}:{ns}:{id}        hash  parent / checkpoint / metadata
+      lg:blobs:{thread}:{ns}          hash  "{channel}|{version}" -> value
+      lg:writes:{thread}:{ns}:{id}    hash  "{task_id}|{idx:+06d}" -> packed write
+    """
+
+    def __init__(self, client=None, url: str = CHECKPOINT_REDIS_URL, ttl_seconds: int = CHECKPOINT_TTL_SECONDS,
+                 prefix: str = "lg", keep_last: int = CHECKPOINT_KEEP_LAST):
+        super().__init__(ttl_seconds=ttl_seconds, keep_last=keep_last)
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise ImportError("CHECKPOINT_BACKEND=redis requires the 'redis' package (pip install redis).") from e
+            client = redis.Redis.from_url(url)
+        self.redis = client
+        self.prefix = prefix
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.prefix, *parts))
+
+    def _own(self, pipe, thread_id: str, *keys: str):
+        """Registers keys under the thread, stamps its last write and refreshes the TTL on all of them."""
+        owned = self._key("keys", thread_id)
+        pipe.sadd(owned, *keys)
+        pipe.zadd(self._key("threads"), {thread_id: time.time()})
+        if self.ttl_seconds > 0:
+            for key in (owned, *keys):
+                pipe.expire(key, self.ttl_seconds)
+
+    def _store_checkpoint(self, thread_id, checkpoint_ns, checkpoint_id, parent_id, checkpoint, metadata, blobs):
+        index_key = self._key("idx", thread_id, checkpoint_ns)
+        checkpoint_key = self._key("cp", thread_id, checkpoint_ns, checkpoint_id)
+        blobs_key = self._key("blobs", thread_id, checkpoint_ns)
+        pipe = self.redis.pipeline()
+        pipe.zadd(index_key, {checkpoint_id: 0})
+        pipe.hset(checkpoint_key, mapping={"parent": parent_id or "", "checkpoint": checkpoint, "metadata": metadata})
+        if blobs:
+            pipe.hset(blobs_key, mapping={f"{channel}|{version}": value or b"" for channel, version, value in blobs})
+        self._own(pipe, thread_id, index_key, checkpoint_key, blobs_key)
+        pipe.execute()
+
+    def _read_checkpoint(self, thread_id, checkpoint_ns, checkpoint_id):
+        row = self.redis.hmget(self._key("cp", thread_id, checkpoint_ns, checkpoint_id), "parent", "checkpoint", "metadata")
+        if row[1] is None:
+            return None
+        parent = row[0].decode() if row[0] else None
+        return checkpoint_id, parent or None, row[1], row[2]
+
+    def _load_checkpoint(self, thread_id, checkpoint_ns, checkpoint_id):
+        if not checkpoint_id:
+            latest = self.redis.zrevrangebylex(self._key("idx", thread_id, checkpoint_ns), "+", "-", start=0, num=1)
+            if not latest:
+                return None
+            checkpoint_id = latest[0].decode()
+        return self._read_checkpoint(thread_id, checkpoint_ns, checkpoint_id)
+
+    def _iter_checkpoints(self, thread_id, checkpoint_ns, before_id):
+        thread_ids = [thread_id] if thread_id is not None else [t.decode() for t in self.redis.zrange(self._key("threads"), 0, -1)]
+        for tid in thread_ids:
+            if checkpoint_ns is not None:
+                namespaces = [checkpoint_ns]
+            else:
+                prefix = self._key("idx", tid, "")
+                namespaces = [key.decode()[len(prefix):] for key in self.redis.smembers(self._key("keys", tid))
+                              if key.decode().startswith(prefix)]
+            for ns in sorted(namespaces):
+                upper = f"({before_id}" if before_id else "+"
+                for raw_id in self.redis.zrevrangebylex(self._key("idx", tid, ns), upper, "-"):
+                    row = self._read_checkpoint(tid, ns, raw_id.decode())
+                    if row is not None:
+                        yield (tid, ns, *row)
+
+    def _load_blobs(self, thread_id, checkpoint_ns, versions):
+        if not versions:
+            return {}
+        channels = list(versions.keys())
+        values = self.redis.hmget(self._key("blobs", thread_id, checkpoint_ns),
+                                  [f"{channel}|{versions[channel]}" for channel in channels])
+        return {channel: value for channel, value in zip(channels, values) if value}
+
+    def _store_writes(self, thread_id, checkpoint_ns, checkpoint_id, rows, overwrite):
+        writes_key = self._key("writes", thread_id, checkpoint_ns, checkpoint_id)
+        pipe = self.redis.pipeline()
+        for task_id, idx, channel, value, task_path in rows:
+            field = f"{task_id}|{idx:+06d}"
+            packed = ormsgpack.packb([task_id, channel, value, task_path])
+            if overwrite:
+                pipe.hset(writes_key, field, packed)
+            else:
+                pipe.hsetnx(writes_key, field, packed)
+        self._own(pipe, thread_id, writes_key)
+        pipe.execute()
+
+    def _load_writes(self, thread_id, checkpoint_ns, checkpoint_id):
+        stored = self.redis.hgetall(self._key("writes", thread_id, checkpoint_ns, checkpoint_id))
+        rows = []
+        for field in sorted(stored):
+            task_id, channel, value, _ = ormsgpack.unpackb(stored[field])
+            rows.append((task_id, channel, value))
+        return rows
+
+    def _prune(self, thread_id, checkpoint_ns, keep):
+        index_key = self._key("idx", thread_id, checkpoint_ns)
+        stale_ids = [raw_id.decode() for raw_id in self.redis.zrevrangebylex(index_key, "+", "-", start=keep, num=-1)]
+        if not stale_ids:
+            return 0
+        kept_ids = [raw_id.decode() for raw_id in self.redis.zrevrangebylex(index_key, "+", "-", start=0, num=keep)]
+        referenced = {
+            f"{channel}|{version}" for channel, version in self._referenced_versions(
+                blob for blob in (self.redis.hget(self._key("cp", thread_id, checkpoint_ns, cid), "checkpoint")
+                                  for cid in kept_ids) if blob is not None
+            )
+        }
+        blobs_key = self._key("blobs", thread_id, checkpoint_ns)
+        stale_blobs = [field for field in self.redis.hkeys(blobs_key) if field.decode() not in referenced]
+        stale_keys = [key for cid in stale_ids for key in (
+            self._key("cp", thread_id, checkpoint_ns, cid), self._key("writes", thread_id, checkpoint_ns, cid)
+        )]
+        pipe = self.redis.pipeline()
+        pipe.zrem(index_key, *stale_ids)
+        pipe.delete(*stale_keys)
+        pipe.srem(self._key("keys", thread_id), *stale_keys)
+        if stale_blobs:
+            pipe.hdel(blobs_key, *stale_blobs)
+        pipe.execute()
+        return len(stale_ids)
+
+    def _delete_thread(self, thread_id):
+        owned = self._key("keys", thread_id)
+        keys = list(self.redis.smembers(owned))
+        pipe = self.redis.pipeline()
+        if keys:
+            pipe.delete(*keys)
+        pipe.delete(owned)
+        pipe.zrem(self._key("threads"), thread_id)
+        pipe.execute()
+
+    def _evict_idle(self, cutoff):
+        # Keys expire on their own; this only drops index entries for threads that are gone.
+        stale = [t.decode() for t in self.redis.zrangebyscore(self._key("threads"), "-inf", cutoff)]
+        for thread_id in stale:
+            self._delete_thread(thread_id)
+        return len(stale)
+
+    def thread_stats(self):
+        stats = {}
+        for raw_id, last_access in self.redis.zrange(self._key("threads"), 0, -1, withscores=True):
+            thread_id = raw_id.decode()
+            size, checkpoints = 0, 0
+            for raw_key in self.redis.smembers(self._key("keys", thread_id)):
+                key = raw_key.decode()
+                if key.startswith(self._key("idx", "")):
+                    checkpoints += self.redis.zcard(key)
+                else:
+                    size += sum(len(value) for value in self.redis.hvals(key))
+            stats[thread_id] = {"bytes": size, "checkpoints": checkpoints, "last_access": last_access}
+        return stats
+
+
+def build_checkpointer():
+    """Creates the checkpointer selected by CHECKPOINT_BACKEND."""
+    if CHECKPOINT_BACKEND == "memory":
+        return MemorySaver()
+    if CHECKPOINT_BACKEND == "redis":
+        return RedisCheckpointSaver()
+    if CHECKPOINT_BACKEND == "sqlite":
+        return SqliteCheckpointSaver(path=CHECKPOINT_SQLITE_PATH)
+    raise ValueError(f"Unknown CHECKPOINT_BACKEND '{CHECKPOINT_BACKEND}'. Use sqlite, redis or memory.")
@@ -0,0 +1,170 @@
+import logging
+import os
+import time
+import asyncio
+from collections import defaultdict
+from typing import Optional
+
+from langgraph.checkpoint.memory import MemorySaver
+from storage.checkpointer import CHECKPOINT_TTL_SECONDS, DurableCheckpointSaver
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+THREAD_IDLE_TTL_SECONDS = int(os.getenv("THREAD_IDLE_TTL_SECONDS", str(CHECKPOINT_TTL_SECONDS)))  # 0 disables
+THREAD_MAX_COUNT = int(os.getenv("THREAD_MAX_COUNT", "10000"))  # 0 disables
+THREAD_MAX_BYTES = int(os.getenv("THREAD_MAX_BYTES", str(512 * 1024 * 1024)))  # 0 disables
+THREAD_SWEEP_INTERVAL_SECONDS = int(os.getenv("THREAD_SWEEP_INTERVAL_SECONDS", "60"))
+
+
+def _memory_saver_stats(saver: MemorySaver) -> dict[str, dict]:
+    """Walks MemorySaver's internal dicts once and sums the serialized bytes per thread."""
+    stats = defaultdict(lambda: {"bytes": 0, "checkpoints": 0, "last_access": 0.0})
+    for thread_id, namespaces in list(saver.storage.items()):
+        for checkpoints in list(namespaces.values()):
+            for checkpoint, metadata, _ in list(checkpoints.values()):
+                stats[thread_id]["checkpoints"] += 1
+                stats[thread_id]["bytes"] += len(checkpoint[1]) + len(metadata[1])
+    for (thread_id, *_), writes in list(saver.writes.items()):
+        stats[thread_id]["bytes"] += sum(len(value[1]) for _, _, value, _ in list(writes.values()))
+    for (thread_id, *_), value in list(saver.blobs.items()):
+        stats[thread_id]["bytes"] += len(value[1])
+    return dict(stats)
+
+
+class ThreadLifecycleManager:
+    """
+    Keeps the checkpointer bounded. Every sweep:
+    1. deletes threads idle for longer than `idle_ttl_seconds`;
+    2. evicts least-recently-used threads until both the thread count and the
+       total serialized size are under their caps.
+    Access times come from the API (touch) and, for durable backends, from
+    the checkpointer's own record of the last write.
+    """
+
+    def __init__(self, checkpointer, idle_ttl_seconds: int = THREAD_IDLE_TTL_SECONDS,
+                 max_threads: int = THREAD_MAX_COUNT, max_bytes: int = THREAD_MAX_BYTES):
+        self.checkpointer = checkpointer
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_threads = max_threads
+        self.max_bytes = max_bytes
+        self._last_access = {}
+        self.evictions = {"idle": 0, "lru": 0}
+
+    def touch(self, thread_id: str):
+        """Marks a thread as used now (called on every /generate and /continue)."""
+        self._last_access[thread_id] = time.time()
+
+    def thread_stats(self) -> dict[str, dict]:
+        """{thread_id: {"bytes", "checkpoints", "last_access"}} for every live thread."""
+        if isinstance(self.checkpointer, DurableCheckpointSaver):
+            stats = self.checkpointer.thread_stats()
+        elif isinstance(self.checkpointer, MemorySaver):
+            stats = _memory_saver_stats(self.checkpointer)
+        else:
+            return {}
+
+        now = time.time()
+        for thread_id, entry in stats.items():
+            # Threads we have never seen (e.g. created before a restart) start their clock now.
+            local = self._last_access.setdefault(thread_id, entry["last_access"] or now)
+            entry["last_access"] = max(entry["last_access"], local)
+        for thread_id in list(self._last_access):
+            if thread_id not in stats:
+                del self._last_access[thread_id]
+        return stats
+
+    def delete(self, thread_id: str):
+        self.checkpointer.delete_thread(thread_id)
+        self._last_access.pop(thread_id, None)
+
+    def enforce(self) -> dict:
+        """Runs one TTL + LRU sweep and returns how many threads were evicted for each reason."""
+        stats = self.thread_stats()
+        now = time.time()
+        evicted = {"idle": 0, "lru": 0}
+
+        if self.idle_ttl_seconds > 0:
+            for thread_id, entry in list(stats.items()):
+                if now - entry["last_access"] > self.idle_ttl_seconds:
+                    self.delete(thread_id)
+                    del stats[thread_id]
+                    evicted["idle"] += 1
+
+        total_bytes = sum(entry["bytes"] for entry in stats.values())
+        lru_order = sorted(stats.items(), key=lambda item: item[1]["last_access"])
+        for thread_id, entry in lru_order:
+            over_count = self.max_threads > 0 and len(stats) > self.max_threads
+            over_bytes = self.max_bytes > 0 and total_bytes > self.max_bytes
+            if not (over_count or over_bytes):
+                break
+            self.delete(thread_id)
+            del stats[thread_id]
+            total_bytes -= entry["bytes"]
+            evicted["lru"] += 1
+
+        if evicted["idle"] or evicted["lru"]:
+            logger.info(f"🧹 Thread sweep evicted {evicted['idle']} idle and {evicted['lru']} LRU threads.")
+        self.evictions["idle"] += evicted["idle"]
+        self.evictions["lru"] += evicted["lru"]
+        return evicted
+
+    async def _run(self, fn, *args):
+        # MemorySaver is mutated on the event loop by the graph, so it is read there too;
+        # durable backends lock internally and are queried in a worker thread.
+        if isinstance(self.checkpointer, DurableCheckpointSaver):
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    async def enforce_async(self) -> dict:
+        return await self._run(self.enforce)
+
+    async def report_async(self, limit: Optional[int] = None) -> dict:
+        return await self._run(self.report, limit)
+
+    async def delete_async(self, thread_id: str) -> bool:
+        """Deletes a thread if it exists; returns False for unknown threads."""
+        def _delete():
+            if thread_id not in self.thread_stats():
+                return False
+            self.delete(thread_id)
+            return True
+        return await self._run(_delete)
+
+    async def run_periodic_sweeps(self, interval_seconds: int = THREAD_SWEEP_INTERVAL_SECONDS):
+        """Background task started in the FastAPI lifespan."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.enforce_async()
+            except Exception as e:
+                logger.error(f"❌ ERROR during thread sweep: {e}")
+
+    def report(self, limit: Optional[int] = None) -> dict:
+        """Live threads and their footprint, most recently used first, for the admin endpoint."""
+        stats = self.thread_stats()
+        now = time.time()
+        threads = sorted(
+            (
+                {
+                    "thread_id": thread_id,
+                    "bytes": entry["bytes"],
+                    "checkpoints": entry["checkpoints"],
+                    "idle_seconds": round(now - entry["last_access"], 1),
+                }
+                for thread_id, entry in stats.items()
+            ),
+            key=lambda item: item["idle_seconds"]
+        )
+        return {
+            "backend": type(self.checkpointer).__name__,
+            "thread_count": len(threads),
+            "total_bytes": sum(item["bytes"] for item in threads),
+            "limits": {
+                "idle_ttl_seconds": self.idle_ttl_seconds,
+                "max_threads": self.max_threads,
+                "max_bytes": self.max_bytes,
+            },
+            "evictions": dict(self.evictions),
+            "threads": threads[:limit] if limit else threads,
+        }
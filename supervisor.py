@@ -1,15 +1,18 @@
 
 
 #=========================================================================================
+import logging
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
 from graph_state import AgentState
 from agents.interaction_manager import interaction_manager_node
 from agents.poster_agent import run_poster_agent_node, run_interactive_poster_flow_node
 from agents.sales_agent import run_sales_agent_node
 from tools.orchestrator_tools import prepare_poster_payload_node, prepare_sales_payload_node
-import os
-import json
+from storage.checkpointer import build_checkpointer
+from app_registry import get_app_registry
+from metrics import instrument_node
+
+logger = logging.getLogger(__name__)
 
 # --- 1. THE NODE: Its only job is to update the state ---
 def override_intent_node(state: AgentState) -> dict:
@@ -17,14 +20,9 @@ def override_intent_node(state: AgentState) -> dict:
     Reads the initial request and adds the 'intent_data' to the state.
     It returns a dictionary, which is the correct output for a node.
     """
-    print("---NODE: Overriding Intent---")
+    logger.debug("---NODE: Overriding Intent---")
     service = state.get("initial_request", {}).get("service")
 
-    # This path assumes app_registry.json is in the same directory as supervisor.py
-    registry_path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'app_registry.json'))
-    with open(registry_path, 'r') as f:
-        registry = json.load(f)
-
     if service == "sales":
         app_name = "Lead/Sales Intent Generator"
         intent_text = "Analyze sales conversation and generate next best action"
@@ -35,12 +33,14 @@ def override_intent_node(state: AgentState) -> dict:
         app_name = "orchestrator"
         intent_text = "No specific app selected"
 
+    # In-memory lookup; the registry is loaded once and hot-reloaded in the background.
+    app = get_app_registry().get(app_name)
     intent_data = {
         "status": "ok",
         "intent": intent_text,
         "recommended_app": app_name,
-        "entrypoint": registry.get(app_name, {}).get("entrypoint"),
-        "required_fields": registry.get(app_name, {}).get("required_fields", [])
+        "entrypoint": app.entrypoint if app else None,
+        "required_fields": list(app.required_fields) if app else []
     }
     
     return {"intent_data": intent_data}
@@ -50,7 +50,7 @@ def route_after_intent(state: AgentState) -> str:
     """
     Reads the state and returns a string to route the workflow.
     """
-    print("---ROUTER: Deciding path after intent override---")
+    logger.debug("---ROUTER: Deciding path after intent override---")
     execution_mode = state.get("execution_mode")
     service = state.get("initial_request", {}).get("service")
 
@@ -90,13 +90,15 @@ def after_interaction_router(state: AgentState) -> str:
 workflow = StateGraph(AgentState)
 
 # --- ADD NODES ---
-workflow.add_node("override_intent", override_intent_node)
-workflow.add_node("interaction_manager", interaction_manager_node)
+# The interaction manager and agent nodes are async: their LLM, HF and Imagen
+# calls await on shared async clients instead of blocking the event loop.
+workflow.add_node("override_intent", instrument_node("override_intent", override_intent_node))
+workflow.add_node("interaction_manager", instrument_node("interaction_manager", interaction_manager_node))
 # Autonomous nodes (can be placeholders if not used)
-workflow.add_node("poster_agent_auto", run_poster_agent_node) 
-workflow.add_node("sales_agent_auto", run_sales_agent_node)
+workflow.add_node("poster_agent_auto", instrument_node("poster_agent_auto", run_poster_agent_node)) 
+workflow.add_node("sales_agent_auto", instrument_node("sales_agent_auto", run_sales_agent_node))
 # Interactive node for poster
-workflow.add_node("poster_agent_interactive", run_interactive_poster_flow_node)
+workflow.add_node("poster_agent_interactive", instrument_node("poster_agent_interactive", run_interactive_poster_flow_node))
 
 # --- GRAPH ENTRY POINT ---
 workflow.set_entry_point("override_intent")
@@ -131,7 +133,9 @@ workflow.add_edge("poster_agent_interactive", END)
 
 
 # --- COMPILE GRAPH ---
-checkpointer = MemorySaver()
+# Durable by default (SQLite/WAL), so paused threads survive restarts and any
+# worker can serve /continue. See CHECKPOINT_BACKEND in storage/checkpointer.py.
+checkpointer = build_checkpointer()
 app = workflow.compile(checkpointer=checkpointer)
 
-print("✅ Supervisor graph compiled: Full interactive poster flow is now online.")
+logger.info("✅ Supervisor graph compiled: Full interactive poster flow is now online.")
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules live at the repository root (main.py, tools/, storage/, ...), not in an installed package.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -0,0 +1,132 @@
+import operator
+import time
+from typing import Annotated, TypedDict
+
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.graph import END, StateGraph
+from langgraph.types import Command, interrupt
+
+import storage.checkpointer as checkpointer
+from storage.checkpointer import RedisCheckpointSaver, SqliteCheckpointSaver, build_checkpointer
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def make_saver(request, tmp_path):
+    def make(**kwargs):
+        if request.param == "sqlite":
+            return SqliteCheckpointSaver(path=str(tmp_path / "checkpoints.sqlite"), **kwargs)
+        fakeredis = pytest.importorskip("fakeredis")
+        return RedisCheckpointSaver(client=fakeredis.FakeRedis(), **kwargs)
+    return make
+
+
+def _put(saver, config, values, step):
+    """Stores a checkpoint chained to `config` with every channel in `values` bumped to a new version."""
+    checkpoint = empty_checkpoint()
+    previous = saver.get_tuple(config)
+    versions = dict(previous.checkpoint["channel_versions"]) if previous else {}
+    new_versions = {channel: saver.get_next_version(versions.get(channel), None) for channel in values}
+    versions.update(new_versions)
+    carried = dict(previous.checkpoint["channel_values"]) if previous else {}
+    checkpoint.update(channel_values={**carried, **values}, channel_versions=versions)
+    return saver.put(config, checkpoint, {"source": "loop", "step": step}, new_versions)
+
+
+def test_put_get_and_list_round_trip(make_saver):
+    saver = make_saver(keep_last=0)
+    config = {"configurable": {"thread_id": "t1", "checkpoint_ns": ""}}
+    first = _put(saver, config, {"report": {"days": ["Day 1"]}, "note": "x" * 5000}, step=0)
+    second = _put(saver, first, {"report": {"days": ["Day 1", "Day 2"]}}, step=1)
+
+    latest = saver.get_tuple(config)
+    assert latest.config["configurable"]["checkpoint_id"] == second["configurable"]["checkpoint_id"]
+    assert latest.parent_config["configurable"]["checkpoint_id"] == first["configurable"]["checkpoint_id"]
+    # The unchanged (and compressed) channel is still read from the first checkpoint's blob.
+    assert latest.checkpoint["channel_values"] == {"report": {"days": ["Day 1", "Day 2"]}, "note": "x" * 5000}
+    assert latest.metadata["step"] == 1
+
+    older = saver.get_tuple(first)
+    assert older.checkpoint["channel_values"]["report"] == {"days": ["Day 1"]}
+
+    history = list(saver.list(config))
+    assert [item.metadata["step"] for item in history] == [1, 0]
+    assert [item.metadata["step"] for item in saver.list(config, filter={"step": 0})] == [0]
+    assert len(list(saver.list(config, before=second))) == 1
+    assert list(saver.list({"configurable": {"thread_id": "other"}})) == []
+
+
+def test_pending_writes_round_trip(make_saver):
+    saver = make_saver(keep_last=0)
+    config = _put(saver, {"configurable": {"thread_id": "t1", "checkpoint_ns": ""}}, {"n": 1}, step=0)
+    saver.put_writes(config, [("log", ["a"]), ("n", 2)], task_id="task-1")
+    saver.put_writes(config, [("log", ["b"])], task_id="task-2")
+
+    writes = saver.get_tuple(config).pending_writes
+    assert sorted(writes) == [("task-1", "log", ["a"]), ("task-1", "n", 2), ("task-2", "log", ["b"])]
+
+
+def test_pruning_keeps_the_newest_checkpoints_per_thread(make_saver):
+    saver = make_saver(keep_last=3)
+    for thread_id in ("t1", "t2"):
+        config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+        latest = config
+        for step in range(6):
+            values = {"n": step, "static": "kept"} if step == 0 else {"n": step}
+            latest = _put(saver, latest, values, step=step)
+
+        assert [item.metadata["step"] for item in saver.list(config)] == [5, 4, 3]
+        # Values written before the retained window are still reachable.
+        assert saver.get_tuple(config).checkpoint["channel_values"] == {"n": 5, "static": "kept"}
+
+    assert {thread: stats["checkpoints"] for thread, stats in saver.thread_stats().items()} == {"t1": 3, "t2": 3}
+
+
+def test_idle_threads_expire_after_the_ttl(make_saver, monkeypatch):
+    saver = make_saver(ttl_seconds=60, keep_last=0)
+    _put(saver, {"configurable": {"thread_id": "idle", "checkpoint_ns": ""}}, {"n": 1}, step=0)
+    assert saver.evict_idle_threads() == 0
+
+    now = time.time()
+    monkeypatch.setattr(checkpointer.time, "time", lambda: now + 30)
+    _put(saver, {"configurable": {"thread_id": "active", "checkpoint_ns": ""}}, {"n": 1}, step=0)
+    monkeypatch.setattr(checkpointer.time, "time", lambda: now + 61)
+
+    assert saver.evict_idle_threads() == 1
+    assert saver.get_tuple({"configurable": {"thread_id": "idle"}}) is None
+    assert saver.get_tuple({"configurable": {"thread_id": "active"}}) is not None
+    assert set(saver.thread_stats()) == {"active"}
+
+
+class _State(TypedDict):
+    topic: str
+    answers: Annotated[list, operator.add]
+
+
+def _ask(state: _State):
+    return {"answers": [interrupt(f"What about {state['topic']}?")]}
+
+
+def _graph():
+    graph = StateGraph(_State)
+    graph.add_node("ask", _ask)
+    graph.set_entry_point("ask")
+    graph.add_edge("ask", END)
+    return graph
+
+
+def test_interrupted_graph_resumes_through_build_checkpointer(tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpointer, "CHECKPOINT_BACKEND", "sqlite")
+    monkeypatch.setattr(checkpointer, "CHECKPOINT_SQLITE_PATH", str(tmp_path / "graph.sqlite"))
+    config = {"configurable": {"thread_id": "poster-1"}}
+
+    app = _graph().compile(checkpointer=build_checkpointer())
+    result = app.invoke({"topic": "colors", "answers": []}, config)
+    assert result["__interrupt__"][0].value == "What about colors?"
+
+    # A fresh checkpointer on the same file stands in for a restarted server.
+    resumed = _graph().compile(checkpointer=build_checkpointer())
+    assert resumed.get_state(config).next == ("ask",)
+    result = resumed.invoke(Command(resume="blue and gold"), config)
+    assert result == {"topic": "colors", "answers": ["blue and gold"]}
+    assert resumed.get_state(config).next == ()
@@ -0,0 +1,100 @@
+import time
+
+import httpx
+import pytest
+
+import tools.resilience as resilience
+from tools.resilience import CircuitBreaker, CircuitOpenError, resilient_call
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_seconds=60)
+    for _ in range(2):
+        breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.is_open
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.stats()["rejected"] == 1
+    assert breaker.stats()["times_opened"] == 1
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_seconds=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert not breaker.is_open
+
+
+def test_half_open_probe_closes_on_success():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.before_call()  # the single probe
+    assert breaker.stats()["state"] == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # no second call while the probe is out
+    breaker.record_success()
+    assert breaker.stats()["state"] == "closed"
+    breaker.before_call()
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.is_open
+    assert breaker.stats()["times_opened"] == 2
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_zero_threshold_disables_the_breaker():
+    breaker = CircuitBreaker("test", failure_threshold=0, reset_seconds=60)
+    for _ in range(10):
+        breaker.record_failure()
+    breaker.before_call()
+    assert not breaker.is_open
+
+
+def _status_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "https://upstream.test")
+    return httpx.HTTPStatusError(str(status), request=request, response=httpx.Response(status, request=request))
+
+
+def _raise(exc):
+    def call():
+        raise exc
+    return call
+
+
+@pytest.fixture
+def groq_breaker(monkeypatch):
+    breaker = CircuitBreaker("groq", failure_threshold=2, reset_seconds=0.05)
+    monkeypatch.setitem(resilience._breakers, "groq", breaker)
+    return breaker
+
+
+def test_client_errors_do_not_reset_the_failure_count(groq_breaker):
+    groq_breaker.record_failure()
+    with pytest.raises(httpx.HTTPStatusError):
+        resilient_call("groq", "test", _raise(_status_error(400)))
+    assert groq_breaker.stats()["consecutive_failures"] == 1
+    groq_breaker.record_failure()
+    assert groq_breaker.is_open
+
+
+def test_client_error_on_the_probe_keeps_the_circuit_half_open(groq_breaker):
+    groq_breaker.record_failure()
+    groq_breaker.record_failure()
+    time.sleep(0.06)
+    with pytest.raises(httpx.HTTPStatusError):
+        resilient_call("groq", "test", _raise(_status_error(400)))
+    assert groq_breaker.stats()["state"] == "half_open"
+    # The probe slot was released, so the next call is let through as the new probe.
+    assert resilient_call("groq", "test", lambda: "ok") == "ok"
+    assert groq_breaker.stats()["state"] == "closed"
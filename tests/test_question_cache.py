@@ -0,0 +1,48 @@
+import pytest
+
+from tools.question_cache import QuestionCache, content_words, normalize_idea
+
+QUESTIONS = {"questions": [{"key": "theme", "question": "Which theme?"}]}
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("Grand opening of our new bakery downtown", "Grand opening of our new gym downtown"),
+    ("Charity marathon in Berlin this summer", "Charity concert in Berlin this summer"),
+    ("Python bootcamp for beginners", "AI bootcamp for beginners"),
+    ("New bakery opening", "Bakery opening"),
+    ("Discounts on all pastries", "Discounts on pastries"),
+])
+def test_different_subjects_do_not_share_questions(cached, asked):
+    cache = QuestionCache()
+    cache.put("ns", cached, QUESTIONS)
+    assert cache.get("ns", asked) is None
+    assert cache.stats()["semantic_hits"] == 0
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("Grand opening of our bakery downtown!", "grand opening of the bakery, downtown"),
+    ("Summer sale on running shoes", "Running shoes summer sale"),
+    ("Yoga workshops for seniors", "Yoga workshop for seniors"),
+])
+def test_rephrasings_share_questions(cached, asked):
+    cache = QuestionCache()
+    cache.put("ns", cached, QUESTIONS)
+    assert cache.get("ns", asked) == QUESTIONS
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_exact_match_ignores_case_and_punctuation():
+    cache = QuestionCache()
+    cache.put("ns", "Coffee tasting, Friday!", QUESTIONS)
+    assert cache.get("ns", "coffee tasting friday") == QUESTIONS
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_namespaces_are_separate():
+    cache = QuestionCache()
+    cache.put("poster-v1", "Coffee tasting on Friday", QUESTIONS)
+    assert cache.get("poster-v2", "Coffee tasting on Friday") is None
+
+
+def test_content_words_drop_stopwords_and_plurals():
+    assert content_words(normalize_idea("The shoes of our new store")) == frozenset({"shoe", "new", "store"})
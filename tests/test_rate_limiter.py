@@ -0,0 +1,137 @@
+import asyncio
+import threading
+import time
+
+import httpx
+
+import tools.rate_limiter as rate_limiter
+from tools.rate_limiter import (
+    PRIORITY_AUTONOMOUS, PRIORITY_INTERACTIVE, PRIORITY_SPECULATIVE, RateLimiter, _Ticket, request_priority,
+)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_queued_calls_are_admitted_by_priority_then_arrival():
+    limiter = RateLimiter("groq", "test", concurrency=1)
+    order = []
+
+    async def job(name, priority, hold):
+        with request_priority(priority):
+            async with limiter.slot_async():
+                order.append(name)
+                await asyncio.sleep(hold)
+
+    async def main():
+        tasks = [asyncio.create_task(job("first", PRIORITY_AUTONOMOUS, 0.1))]
+        await asyncio.sleep(0.01)
+        for name, priority in (("speculative", PRIORITY_SPECULATIVE), ("autonomous", PRIORITY_AUTONOMOUS),
+                               ("interactive-1", PRIORITY_INTERACTIVE), ("interactive-2", PRIORITY_INTERACTIVE)):
+            tasks.append(asyncio.create_task(job(name, priority, 0)))
+            await asyncio.sleep(0.01)
+        await asyncio.gather(*tasks)
+
+    _run(main())
+    assert order == ["first", "interactive-1", "interactive-2", "autonomous", "speculative"]
+
+
+def test_tpm_reservation_is_settled_against_reported_usage():
+    limiter = RateLimiter("groq", "test", tpm=600)
+
+    async def main():
+        async with limiter.slot_async(500) as ticket:
+            assert limiter.stats()["tokens_available"] == 100
+            ticket.used_tokens = 100
+
+    _run(main())
+    # 400 of the 500 reserved tokens are returned (plus a negligible refill).
+    assert 500 <= limiter.stats()["tokens_available"] <= 510
+
+
+def test_tpm_waits_when_the_bucket_cannot_cover_the_estimate():
+    limiter = RateLimiter("groq", "test", tpm=60 * 100)  # refills 100 tokens per second
+
+    async def main():
+        async with limiter.slot_async(60 * 100):
+            pass
+        started = time.monotonic()
+        async with limiter.slot_async(20):
+            return time.monotonic() - started
+
+    assert 0.1 <= _run(main()) < 1.0
+
+
+def test_429_pauses_the_queue_for_retry_after():
+    limiter = RateLimiter("groq", "test")
+    request = httpx.Request("POST", "https://upstream.test")
+    error = httpx.HTTPStatusError(
+        "429", request=request, response=httpx.Response(429, headers={"retry-after": "0.3"}, request=request)
+    )
+
+    async def main():
+        try:
+            async with limiter.slot_async():
+                raise error
+        except httpx.HTTPStatusError:
+            pass
+        assert limiter.stats()["pauses"] == 1
+        started = time.monotonic()
+        async with limiter.slot_async():
+            return time.monotonic() - started
+
+    assert 0.25 <= _run(main()) < 1.0
+
+
+def test_other_errors_do_not_pause():
+    limiter = RateLimiter("groq", "test")
+    try:
+        with limiter.slot():
+            raise ValueError("boom")
+    except ValueError:
+        pass
+    assert limiter.stats()["pauses"] == 0
+    assert limiter.stats()["in_flight"] == 0
+
+
+
+class _GrantedDuringCheck(_Ticket):
+    """A ticket that lets another thread try to admit it right after its caller reads `granted`."""
+    __slots__ = ("_granted", "on_check")
+
+    def __init__(self, *args):
+        self.on_check = None
+        super().__init__(*args)
+
+    @property
+    def granted(self):
+        value = self._granted
+        hook, self.on_check = self.on_check, None
+        if hook is not None:
+            hook()
+        return value
+
+    @granted.setter
+    def granted(self, value):
+        self._granted = value
+
+
+def test_cancel_racing_a_grant_never_leaks_a_slot(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_Ticket", _GrantedDuringCheck)
+    limiter = RateLimiter("groq", "test", concurrency=1)
+    holder = limiter.acquire()
+    waiter = limiter._enqueue(0, lambda: None)
+    granting = threading.Thread(target=limiter.release, args=(holder,))
+
+    def grant_now():
+        granting.start()
+        granting.join(0.2)  # blocks while _abandon holds the lock, as it should
+
+    waiter.on_check = grant_now
+    limiter._abandon(waiter)
+    granting.join()
+
+    assert limiter.stats()["in_flight"] == 0
+    assert limiter.stats()["waiting"] == 0
+    assert limiter.stats()["abandoned"] == 1
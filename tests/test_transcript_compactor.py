@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+from tools.sales_tools import split_conversation_by_day
+from tools.transcript_compactor import SALES_PROMPT_TOKENIZER_PATH, TranscriptCompactor
+
+TOKENIZERS = [
+    pytest.param(SALES_PROMPT_TOKENIZER_PATH, id="bert-tokenizer",
+                 marks=pytest.mark.skipif(not os.path.exists(SALES_PROMPT_TOKENIZER_PATH), reason="no tokenizer.json")),
+    pytest.param("/nonexistent/tokenizer.json", id="char-estimate"),
+]
+
+
+def _render(conversation, breakdown):
+    return f"Analyse this sales conversation.\n---\n{conversation}\n---\nDaily intents:\n{breakdown}\n"
+
+
+def _transcript(days, intents):
+    conversation = "\n".join(
+        f"Day {i}: The customer asked about pricing and delivery for the enterprise plan. We sent the details."
+        for i in range(1, days + 1)
+    )
+    analysis = [{"day": f"Day {i}:", "intent": intents[i % len(intents)]} for i in range(1, days + 1)]
+    return conversation, analysis
+
+
+@pytest.mark.parametrize("tokenizer_path", TOKENIZERS)
+@pytest.mark.parametrize("days, intents", [
+    (5, ["warm"]),
+    (300, ["warm", "warm", "cold"]),
+    (1000, ["warm", "cold"]),  # the intent flips every day, so the run breakdown alone exceeds the budget
+    (3000, ["warm", "cold", "hot"]),
+])
+def test_prompt_stays_within_budget(tokenizer_path, days, intents):
+    compactor = TranscriptCompactor(token_budget=2000, tokenizer_path=tokenizer_path)
+    conversation, analysis = _transcript(days, intents)
+    prompt = compactor.fit_prompt(conversation, analysis, _render, split_conversation_by_day)
+    assert compactor.count_tokens(prompt) <= 2000
+    assert f"Day {days}:" in prompt  # the newest day is always kept
+
+
+def test_small_prompt_is_left_alone():
+    compactor = TranscriptCompactor(token_budget=2000)
+    conversation, analysis = _transcript(3, ["warm"])
+    prompt = compactor.fit_prompt(conversation, analysis, _render, split_conversation_by_day)
+    assert conversation in prompt
+    assert compactor.stats()["compacted"] == 0
+
+
+def test_breakdown_is_trimmed_to_its_share():
+    compactor = TranscriptCompactor(token_budget=2000)
+    _, analysis = _transcript(1000, ["warm", "cold"])
+    breakdown, omitted = compactor.fit_breakdown(analysis, 300)
+    assert compactor.count_tokens(breakdown) <= 300
+    assert omitted > 0
+    assert breakdown.endswith('{"days":"Day 1000","intent":"warm"}]')
+
+
+def test_incremental_prompt_goes_through_the_budget():
+    from tools.sales_tools import _build_incremental_sales_analysis_prompt
+    from tools.transcript_compactor import get_transcript_compactor
+
+    compactor = get_transcript_compactor()
+    conversation, analysis = _transcript(2000, ["warm", "cold"])
+    before = compactor.stats()["by_kind"].get("incremental", 0)
+    prompt = _build_incremental_sales_analysis_prompt({"summary": "Earlier days."}, analysis[:5], conversation, analysis)
+    if compactor.token_budget > 0:
+        assert compactor.count_tokens(prompt) <= compactor.token_budget
+    assert compactor.stats()["by_kind"]["incremental"] == before + 1
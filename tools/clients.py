@@ -0,0 +1,137 @@
+import os
+import importlib.util
+import threading
+import httpx
+from openai import OpenAI, AsyncOpenAI
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- Configuration ---
+# One entry per upstream. Every tool draws its client from here, so TCP/TLS
+# connections are kept alive and reused instead of being set up per call.
+# Each value can be overridden with <UPSTREAM>_<SETTING>, e.g. GROQ_MAX_CONNECTIONS=50.
+# The retry and circuit settings are used by tools/resilience.py.
+def _upstream_config(name: str, base_url: str, timeout: float, connect_timeout: float = 5.0,
+                     max_connections: int = 100, max_keepalive: int = 20, keepalive_expiry: float = 30.0,
+                     retry_attempts: int = 3, retry_base_delay: float = 0.5, retry_max_delay: float = 8.0,
+                     circuit_failures: int = 5, circuit_reset_seconds: float = 30.0) -> dict:
+    prefix = name.upper()
+    return {
+        "base_url": os.getenv(f"{prefix}_BASE_URL", base_url),
+        "timeout": float(os.getenv(f"{prefix}_TIMEOUT", timeout)),
+        "connect_timeout": float(os.getenv(f"{prefix}_CONNECT_TIMEOUT", connect_timeout)),
+        "max_connections": int(os.getenv(f"{prefix}_MAX_CONNECTIONS", max_connections)),
+        "max_keepalive": int(os.getenv(f"{prefix}_MAX_KEEPALIVE", max_keepalive)),
+        "keepalive_expiry": float(os.getenv(f"{prefix}_KEEPALIVE_EXPIRY", keepalive_expiry)),
+        "http2": os.getenv(f"{prefix}_HTTP2", "true").lower() in ("1", "true", "yes"),
+        "retry_attempts": int(os.getenv(f"{prefix}_RETRY_ATTEMPTS", retry_attempts)),
+        "retry_base_delay": float(os.getenv(f"{prefix}_RETRY_BASE_DELAY", retry_base_delay)),
+        "retry_max_delay": float(os.getenv(f"{prefix}_RETRY_MAX_DELAY", retry_max_delay)),
+        # Consecutive failures that open the circuit; 0 disables the breaker.
+        "circuit_failures": int(os.getenv(f"{prefix}_CIRCUIT_FAILURES", circuit_failures)),
+        "circuit_reset_seconds": float(os.getenv(f"{prefix}_CIRCUIT_RESET_SECONDS", circuit_reset_seconds)),
+    }
+
+UPSTREAMS = {
+    "groq": _upstream_config("groq", "https://api.groq.com/openai/v1", timeout=60.0),
+    # A cold HF model answers 503 with an estimated load time, so allow it a few more attempts.
+    "hf": _upstream_config("hf", "https://api-inference.huggingface.co", timeout=20.0,
+                           retry_attempts=4, retry_base_delay=1.0, retry_max_delay=20.0),
+    "a4f": _upstream_config("a4f", "https://api.a4f.co/v1", timeout=60.0, retry_base_delay=1.0),
+}
+GROQ_BASE_URL = UPSTREAMS["groq"]["base_url"]
+
+# HTTP/2 needs the optional `h2` package; fall back to HTTP/1.1 keep-alive without it.
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+def _client_kwargs(upstream: str) -> dict:
+    config = UPSTREAMS[upstream]
+    return {
+        "http2": config["http2"] and HTTP2_AVAILABLE,
+        "limits": httpx.Limits(
+            max_connections=config["max_connections"],
+            max_keepalive_connections=config["max_keepalive"],
+            keepalive_expiry=config["keepalive_expiry"],
+        ),
+        "timeout": httpx.Timeout(config["timeout"], connect=config["connect_timeout"]),
+        "follow_redirects": True,
+    }
+
+
+# --- Sync clients (thread-safe, shared across worker threads) ---
+_http_clients = {}
+_groq_client = None
+_sync_lock = threading.Lock()
+
+def get_http_client(upstream: str) -> httpx.Client:
+    """Returns the pooled httpx.Client for an upstream ("groq", "hf" or "a4f")."""
+    client = _http_clients.get(upstream)
+    if client is None:
+        with _sync_lock:
+            client = _http_clients.get(upstream)
+            if client is None:
+                client = httpx.Client(**_client_kwargs(upstream))
+                _http_clients[upstream] = client
+    return client
+
+def get_groq_client() -> OpenAI:
+    """Returns the shared OpenAI client pointed at Groq, on the pooled Groq connection pool."""
+    global _groq_client
+    if _groq_client is None:
+        with _sync_lock:
+            if _groq_client is None:
+                _groq_client = OpenAI(
+                    api_key=os.getenv("GROQ_API_KEY"),
+                    base_url=GROQ_BASE_URL,
+                    max_retries=0,  # retried by tools/resilience.py
+                    http_client=httpx.Client(**_client_kwargs("groq")),
+                )
+    return _groq_client
+
+
+# --- Async clients ---
+# Created lazily on first use so they bind to the running event loop
+# (uvicorn's), and closed in the FastAPI lifespan.
+_async_http_clients = {}
+_async_groq_client = None
+
+def get_async_http_client(upstream: str) -> httpx.AsyncClient:
+    """Returns the pooled httpx.AsyncClient for an upstream ("groq", "hf" or "a4f")."""
+    client = _async_http_clients.get(upstream)
+    if client is None:
+        client = httpx.AsyncClient(**_client_kwargs(upstream))
+        _async_http_clients[upstream] = client
+    return client
+
+def get_async_groq_client() -> AsyncOpenAI:
+    """Returns the shared AsyncOpenAI client pointed at Groq."""
+    global _async_groq_client
+    if _async_groq_client is None:
+        _async_groq_client = AsyncOpenAI(
+            api_key=os.getenv("GROQ_API_KEY"),
+            base_url=GROQ_BASE_URL,
+            max_retries=0,
+            http_client=httpx.AsyncClient(**_client_kwargs("groq")),
+        )
+    return _async_groq_client
+
+
+async def aclose_clients():
+    """Closes every shared client, sync and async (called on application shutdown)."""
+    global _async_groq_client, _groq_client
+    if _async_groq_client is not None:
+        await _async_groq_client.close()
+        _async_groq_client = None
+    for client in _async_http_clients.values():
+        await client.aclose()
+    _async_http_clients.clear()
+
+    with _sync_lock:
+        if _groq_client is not None:
+            _groq_client.close()
+            _groq_client = None
+        for client in _http_clients.values():
+            client.close()
+        _http_clients.clear()
@@ -0,0 +1,142 @@
+import os
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+from typing import Optional
+
+from storage.artifacts import ArtifactStore, get_artifact_store
+
+# --- Configuration ---
+IMAGE_CACHE_ENABLED = os.getenv("IMAGE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+IMAGE_CACHE_DIR = os.getenv(
+    "IMAGE_CACHE_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'image_cache'))
+)
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+IMAGE_CACHE_MAX_ENTRIES = int(os.getenv("IMAGE_CACHE_MAX_ENTRIES", "10000"))
+
+
+def image_cache_key(model: str, size: str, prompt: str) -> str:
+    """Identity of a generation request: same model, size and prompt give the same key."""
+    return hashlib.sha256(f"{model}\x00{size}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+def _link_or_copy(src: str, dst: str):
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp = f"{dst}.tmp-{threading.get_ident()}"
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+class ImageCache:
+    """
+    Disk-backed cache of generated images keyed by image_cache_key.
+
+    The cache keeps its own content-addressed copy of every image (a hard
+    link to the artifact store's file where possible, so no bytes are
+    duplicated) plus a SQLite index with sizes and last use. Evicting an entry
+    only drops the cache's link, so artifact URLs already handed out keep
+    working. Entries are evicted least recently used first beyond `max_bytes`
+    or `max_entries`.
+    """
+
+    def __init__(self, root: str = IMAGE_CACHE_DIR, max_bytes: int = IMAGE_CACHE_MAX_BYTES,
+                 max_entries: int = IMAGE_CACHE_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.blobs = ArtifactStore(os.path.join(root, "blobs"))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS image_cache (key TEXT PRIMARY KEY, artifact_id TEXT NOT NULL, "
+            "size INTEGER NOT NULL, content_type TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS image_cache_last_used ON image_cache (last_used)")
+        self._stats = {"hits": 0, "misses": 0, "stored": 0, "evictions": 0}
+
+    def _blob_path(self, artifact_id: str) -> str:
+        return os.path.join(self.blobs.root, artifact_id[:2], artifact_id)
+
+    def get(self, key: str) -> Optional[dict]:
+        """The artifact reference for `key`, restored into the artifact store if it was deleted there."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT artifact_id, size, content_type FROM image_cache WHERE key = ?", (key,)
+            ).fetchone()
+            blob = self.blobs.path(row[0]) if row else None
+            if blob is None:
+                if row:
+                    self._conn.execute("DELETE FROM image_cache WHERE key = ?", (key,))
+                self._stats["misses"] += 1
+                return None
+            artifact_id, size, content_type = row
+            store = get_artifact_store()
+            if store.path(artifact_id) is None:
+                _link_or_copy(blob, os.path.join(store.root, artifact_id[:2], artifact_id))
+            store.touch(artifact_id)
+            self._conn.execute("UPDATE image_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._stats["hits"] += 1
+        return ArtifactStore.reference(artifact_id, size, content_type)
+
+    def put(self, key: str, artifact: dict):
+        """Adds a freshly generated artifact (already in the artifact store) under `key`."""
+        source = get_artifact_store().path(artifact["id"])
+        if source is None:
+            return
+        with self._lock:
+            if self.blobs.path(artifact["id"]) is None:
+                _link_or_copy(source, self._blob_path(artifact["id"]))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO image_cache (key, artifact_id, size, content_type, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, artifact["id"], artifact["size"], artifact["content_type"], time.time())
+            )
+            self._stats["stored"] += 1
+            self._evict()
+
+    def _evict(self):
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM image_cache").fetchone()
+        while count > 1 and ((self.max_bytes > 0 and total > self.max_bytes)
+                             or (self.max_entries > 0 and count > self.max_entries)):
+            key, artifact_id, size = self._conn.execute(
+                "SELECT key, artifact_id, size FROM image_cache ORDER BY last_used LIMIT 1"
+            ).fetchone()
+            self._conn.execute("DELETE FROM image_cache WHERE key = ?", (key,))
+            # Identical images share one blob; keep it while another key still uses it.
+            if not self._conn.execute("SELECT 1 FROM image_cache WHERE artifact_id = ?", (artifact_id,)).fetchone():
+                self.blobs.delete(artifact_id)
+            count, total = count - 1, total - size
+            self._stats["evictions"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM image_cache").fetchone()
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["entries"] = count
+        stats["bytes"] = total
+        stats["max_bytes"] = self.max_bytes
+        stats["max_entries"] = self.max_entries
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_image_cache() -> Optional[ImageCache]:
+    """Returns the process-wide image cache, or None when IMAGE_CACHE_ENABLED is off."""
+    global _cache
+    if not IMAGE_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ImageCache()
+    return _cache
@@ -0,0 +1,144 @@
+import logging
+import os
+import time
+import asyncio
+from collections import OrderedDict, deque
+from typing import Optional
+
+from tools.poster_tools import build_image_prompt_tool, generate_image_from_prompt_tool_async
+from tools.resilience import without_deadline
+from tools.rate_limiter import speculative
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+POSTER_SPECULATIVE_IMAGE_ENABLED = os.getenv("POSTER_SPECULATIVE_IMAGE_ENABLED", "false").lower() in ("1", "true", "yes")
+# Question ids treated as optional in addition to questions whose text says "(optional)".
+POSTER_SPECULATIVE_OPTIONAL_IDS = {
+    item.strip() for item in os.getenv("POSTER_SPECULATIVE_OPTIONAL_IDS", "effects").split(",") if item.strip()
+}
+POSTER_SPECULATIVE_MAX_WASTED_PER_HOUR = int(os.getenv("POSTER_SPECULATIVE_MAX_WASTED_PER_HOUR", "20"))
+POSTER_SPECULATIVE_MAX_IN_FLIGHT = int(os.getenv("POSTER_SPECULATIVE_MAX_IN_FLIGHT", "4"))
+POSTER_SPECULATIVE_MAX_THREADS = int(os.getenv("POSTER_SPECULATIVE_MAX_THREADS", "1000"))
+
+_WASTE_WINDOW_SECONDS = 3600.0
+
+
+def is_optional_question(question: dict) -> bool:
+    return question.get("id") in POSTER_SPECULATIVE_OPTIONAL_IDS or "optional" in question.get("text", "").lower()
+
+
+class ImageSpeculator:
+    """
+    Starts the poster image generation before the last question is answered
+    when that question is optional. The prompt is built from the answers so
+    far, with `build_image_prompt_tool`'s defaults for the rest. The poster
+    node reuses the image if the final prompt is identical, i.e. the user
+    kept the default; otherwise the speculative call is cancelled and counted
+    as wasted. A finished but unused artifact is left to the artifact store's
+    retention: content addressing and single-flight mean another request may
+    share it.
+
+    Budget: at most `max_in_flight` speculative calls run at once, and no new
+    speculation starts while `max_wasted_per_hour` wasted calls have been
+    recorded in the last hour.
+    """
+
+    def __init__(self, max_wasted_per_hour: int = POSTER_SPECULATIVE_MAX_WASTED_PER_HOUR,
+                 max_in_flight: int = POSTER_SPECULATIVE_MAX_IN_FLIGHT,
+                 max_threads: int = POSTER_SPECULATIVE_MAX_THREADS):
+        self.max_wasted_per_hour = max_wasted_per_hour
+        self.max_in_flight = max_in_flight
+        self.max_threads = max(1, max_threads)
+        self._speculations = OrderedDict()  # thread_id -> (prompt, task)
+        self._wasted_at = deque()
+        self._stats = {"started": 0, "reused": 0, "wasted": 0, "skipped_budget": 0, "failed": 0}
+
+    def _wasted_recently(self) -> int:
+        cutoff = time.time() - _WASTE_WINDOW_SECONDS
+        while self._wasted_at and self._wasted_at[0] < cutoff:
+            self._wasted_at.popleft()
+        return len(self._wasted_at)
+
+    def _in_flight(self) -> int:
+        return sum(1 for _, task in self._speculations.values() if not task.done())
+
+    def maybe_start(self, thread_id: str, collected_content: dict, remaining_question: dict) -> bool:
+        """Called when `remaining_question` is about to be asked as the last one."""
+        if not is_optional_question(remaining_question):
+            return False
+        if self._wasted_recently() >= self.max_wasted_per_hour or self._in_flight() >= self.max_in_flight:
+            self._stats["skipped_budget"] += 1
+            logger.info("⏳ Speculative poster image skipped: budget exhausted.")
+            return False
+
+        self.discard(thread_id)
+        prompt = build_image_prompt_tool(collected_content)
+        # Outlives the request that started it, so it gets no deadline of its own,
+        # and yields the image model to requests that are waiting on a result.
+        task = asyncio.create_task(speculative(without_deadline(generate_image_from_prompt_tool_async(prompt))))
+        task.add_done_callback(lambda done: self._log_failure(thread_id, done))
+        self._speculations[thread_id] = (prompt, task)
+        self._stats["started"] += 1
+        while len(self._speculations) > self.max_threads:
+            oldest_thread = next(iter(self._speculations))
+            self.discard(oldest_thread)
+        logger.info(f"🔮 Speculative poster image started for thread {thread_id} "
+                    f"(last question '{remaining_question.get('id')}' is optional).")
+        return True
+
+    async def take(self, thread_id: Optional[str], final_prompt: str) -> Optional[dict]:
+        """The speculative artifact if it was generated for exactly `final_prompt`, else None."""
+        entry = self._speculations.pop(thread_id, None) if thread_id else None
+        if entry is None:
+            return None
+        prompt, task = entry
+        if prompt != final_prompt or task.get_loop() is not asyncio.get_running_loop():
+            self._waste(task)
+            return None
+        try:
+            artifact = await task
+        except Exception:
+            return None  # already logged by _log_failure
+        self._stats["reused"] += 1
+        logger.info(f"🔮 Reusing the speculative poster image for thread {thread_id}.")
+        return artifact
+
+    def _log_failure(self, thread_id: str, task: asyncio.Task):
+        # Runs for every speculation, so a failure is reported even when nobody takes the result.
+        if task.cancelled() or task.exception() is None:
+            return
+        self._stats["failed"] += 1
+        logger.error(f"❌ ERROR in speculative poster image for thread {thread_id}: {task.exception()}")
+
+    def discard(self, thread_id: str):
+        entry = self._speculations.pop(thread_id, None)
+        if entry is not None:
+            self._waste(entry[1])
+
+    def _waste(self, task: asyncio.Task):
+        self._stats["wasted"] += 1
+        self._wasted_at.append(time.time())
+        if not task.done():
+            task.cancel()
+
+    def stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["in_flight"] = self._in_flight()
+        stats["wasted_last_hour"] = self._wasted_recently()
+        stats["max_wasted_per_hour"] = self.max_wasted_per_hour
+        stats["max_in_flight"] = self.max_in_flight
+        return stats
+
+
+_speculator = None
+
+def get_image_speculator() -> Optional[ImageSpeculator]:
+    """Returns the process-wide speculator, or None unless POSTER_SPECULATIVE_IMAGE_ENABLED is on."""
+    global _speculator
+    if not POSTER_SPECULATIVE_IMAGE_ENABLED:
+        return None
+    if _speculator is None:
+        # Only ever used from the event loop, so no lock is needed.
+        _speculator = ImageSpeculator()
+    return _speculator
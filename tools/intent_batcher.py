@@ -0,0 +1,188 @@
+import logging
+import os
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Optional
+
+from tools.resilience import DeadlineExceeded, current_deadline, deadline_at, remaining_budget
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+INTENT_MICROBATCH_ENABLED = os.getenv("INTENT_MICROBATCH_ENABLED", "false").lower() in ("1", "true", "yes")
+INTENT_MICROBATCH_WINDOW_MS = float(os.getenv("INTENT_MICROBATCH_WINDOW_MS", "8"))
+INTENT_MICROBATCH_MAX_SIZE = int(os.getenv("INTENT_MICROBATCH_MAX_SIZE", "32"))
+# Batches sent to the backend at the same time, so one slow batch (retries, backoff) does not stall the rest.
+INTENT_MICROBATCH_MAX_IN_FLIGHT = int(os.getenv("INTENT_MICROBATCH_MAX_IN_FLIGHT", "4"))
+
+
+class IntentMicroBatcher:
+    """
+    Collects intent-prediction requests from every in-flight sales run and
+    sends them to the backend as one batch. A batch is flushed when it holds
+    `max_batch_size` texts or when `window_ms` has passed since its first text
+    arrived, whichever comes first. Each caller gets a Future for its own text.
+
+    A collector thread forms the batches and hands them to a pool of
+    `max_in_flight` workers. While every worker is busy the collector waits,
+    so new texts keep accumulating into the next (larger) batch.
+
+    Each text carries its request's deadline into the worker thread: a batch
+    runs under the latest deadline of its texts (none if any has none),
+    texts whose deadline has already passed are failed without being sent,
+    and callers stop waiting when their own budget runs out.
+    """
+
+    def __init__(self, predict_fn: Callable[[list[str]], list[Optional[str]]],
+                 window_ms: float = INTENT_MICROBATCH_WINDOW_MS,
+                 max_batch_size: int = INTENT_MICROBATCH_MAX_SIZE,
+                 max_in_flight: int = INTENT_MICROBATCH_MAX_IN_FLIGHT):
+        self.predict_fn = predict_fn
+        self.window_seconds = window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_in_flight = max(1, max_in_flight)
+        self._queue = queue.Queue()
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="intent-batch")
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "batches": 0,
+            "items": 0,
+            "failed_batches": 0,
+            "max_batch_size_seen": 0,
+            "total_wait_ms": 0.0,
+            "max_wait_ms": 0.0,
+            "in_flight": 0,
+        }
+        self._worker = threading.Thread(target=self._run, name="intent-microbatcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        """Queues one text and returns a Future resolving to its intent (or None)."""
+        future = Future()
+        self._queue.put((text, future, time.perf_counter(), current_deadline()))
+        return future
+
+    def predict_many(self, texts: list[str]) -> list[Optional[str]]:
+        """
+        Submits every text and blocks until all are resolved. Items whose batch
+        failed come back as None so the caller can fall back per item.
+        """
+        futures = [self.submit(text) for text in texts]
+        results = []
+        for future in futures:
+            remaining = remaining_budget()
+            try:
+                results.append(future.result(timeout=None if remaining is None else max(0.0, remaining)))
+            except FutureTimeoutError:
+                future.cancel()
+                results.append(None)
+            except Exception:
+                results.append(None)
+        return results
+
+    async def predict_many_async(self, texts: list[str]) -> list[Optional[str]]:
+        """Async variant of predict_many: awaits the futures without blocking the event loop."""
+        futures = [asyncio.wrap_future(self.submit(text)) for text in texts]
+        remaining = remaining_budget()
+        try:
+            results = await asyncio.wait_for(asyncio.gather(*futures, return_exceptions=True),
+                                             None if remaining is None else max(0.0, remaining))
+        except asyncio.TimeoutError:
+            # The gather was cancelled along with every future still queued.
+            return [None] * len(texts)
+        return [None if isinstance(result, Exception) else result for result in results]
+
+    def stats(self) -> dict:
+        """Queue-depth, batch-size and wait-time metrics for the admin endpoint."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        batches = stats["batches"]
+        stats["queue_depth"] = self._queue.qsize()
+        stats["avg_batch_size"] = round(stats["items"] / batches, 2) if batches else 0.0
+        stats["avg_wait_ms"] = round(stats["total_wait_ms"] / stats["items"], 3) if stats["items"] else 0.0
+        stats["window_ms"] = self.window_seconds * 1000.0
+        stats["max_batch_size"] = self.max_batch_size
+        stats["max_in_flight"] = self.max_in_flight
+        return stats
+
+    def _collect_batch(self) -> list:
+        """Blocks for the first item, then gathers more until the window closes or the batch is full."""
+        batch = [self._queue.get()]
+        flush_at = batch[0][2] + self.window_seconds
+        while len(batch) < self.max_batch_size:
+            remaining = flush_at - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            self._slots.acquire()
+            with self._stats_lock:
+                self._stats["in_flight"] += 1
+            self._pool.submit(self._predict_batch, batch)
+
+    def _predict_batch(self, batch: list):
+        started = time.perf_counter()
+        waits_ms = [(started - enqueued) * 1000.0 for _, _, enqueued, _ in batch]
+        try:
+            # Callers that gave up cancelled their futures; once running, a future can no longer be cancelled.
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            now = time.monotonic()
+            for _, future, _, expires in batch:
+                if expires is not None and expires <= now:
+                    future.set_exception(DeadlineExceeded("Request deadline exceeded before the intent micro-batch ran."))
+            batch = [item for item in batch if item[3] is None or item[3] > now]
+            if not batch:
+                return
+            expiries = [expires for _, _, _, expires in batch]
+            try:
+                with deadline_at(None if None in expiries else max(expiries)):
+                    results = self.predict_fn([text for text, _, _, _ in batch])
+                if len(results) != len(batch):
+                    raise ValueError(f"Backend returned {len(results)} results for {len(batch)} inputs.")
+                for (_, future, _, _), result in zip(batch, results):
+                    future.set_result(result)
+                failed = False
+            except Exception as e:
+                logger.error(f"❌ ERROR in intent micro-batch of {len(batch)}: {e}")
+                for _, future, _, _ in batch:
+                    future.set_exception(e)
+                failed = True
+
+            with self._stats_lock:
+                self._stats["batches"] += 1
+                self._stats["items"] += len(batch)
+                self._stats["failed_batches"] += int(failed)
+                self._stats["max_batch_size_seen"] = max(self._stats["max_batch_size_seen"], len(batch))
+                self._stats["total_wait_ms"] += sum(waits_ms)
+                self._stats["max_wait_ms"] = max(self._stats["max_wait_ms"], max(waits_ms))
+        finally:
+            with self._stats_lock:
+                self._stats["in_flight"] -= 1
+            self._slots.release()
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+def get_intent_batcher(predict_fn: Callable[[list[str]], list[Optional[str]]]) -> IntentMicroBatcher:
+    """Returns the process-wide batcher, starting its collector thread on first use."""
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = IntentMicroBatcher(predict_fn)
+    return _batcher
+
+def get_intent_batcher_stats() -> Optional[dict]:
+    """Metrics of the running batcher, or None if it has not been started."""
+    return _batcher.stats() if _batcher is not None else None
@@ -0,0 +1,152 @@
+import os
+import re
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import xxhash
+
+# --- Configuration ---
+INTENT_MEMO_ENABLED = os.getenv("INTENT_MEMO_ENABLED", "true").lower() in ("1", "true", "yes")
+INTENT_MEMO_MAX_ENTRIES = int(os.getenv("INTENT_MEMO_MAX_ENTRIES", "50000"))  # in-memory LRU bound
+INTENT_MEMO_PATH = os.getenv("INTENT_MEMO_PATH", "")  # SQLite file for persistence; empty = memory only
+INTENT_MEMO_MAX_DISK_ENTRIES = int(os.getenv("INTENT_MEMO_MAX_DISK_ENTRIES", "1000000"))
+_DISK_TRIM_EVERY = 1000  # writes between checks of the on-disk row count
+
+_SPACES = re.compile(r"\s+")
+
+
+def chunk_key(text: str, namespace: str) -> str:
+    """xxhash of the whitespace-normalised chunk, scoped to the backend/model that predicted it."""
+    normalized = _SPACES.sub(" ", text).strip()
+    return xxhash.xxh3_128_hexdigest(f"{namespace}\x00{normalized}")
+
+
+class IntentMemo:
+    """
+    Memo of per-chunk intent predictions keyed by content hash, so re-submitted
+    days of a growing conversation are never sent to BERT again.
+
+    Memory holds at most `max_entries` keys (LRU). With a `path`, every
+    prediction is also written to SQLite and memory misses fall through to it,
+    so the memo survives restarts; the table is trimmed to `max_disk_entries`
+    by last use.
+    """
+
+    def __init__(self, max_entries: int = INTENT_MEMO_MAX_ENTRIES, path: str = INTENT_MEMO_PATH,
+                 max_disk_entries: int = INTENT_MEMO_MAX_DISK_ENTRIES):
+        self.max_entries = max(1, max_entries)
+        self.max_disk_entries = max_disk_entries
+        self.path = path or None
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "stored": 0}
+        self._conn = None
+        self._writes_since_trim = 0
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS intent_memo (key TEXT PRIMARY KEY, intent TEXT NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS intent_memo_last_used ON intent_memo (last_used)")
+
+    @property
+    def persistent(self) -> bool:
+        return self._conn is not None
+
+    def _remember(self, key: str, intent: str):
+        self._entries[key] = intent
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def get_many(self, keys: list[str]) -> list[Optional[str]]:
+        """Looks up every key; returns the memoised intent or None per key."""
+        results = []
+        missing = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                intent = self._entries.get(key)
+                if intent is not None:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                else:
+                    missing.setdefault(key, []).append(i)
+                results.append(intent)
+
+            if missing and self._conn is not None:
+                placeholders = ",".join("?" * len(missing))
+                rows = self._conn.execute(
+                    f"SELECT key, intent FROM intent_memo WHERE key IN ({placeholders})", list(missing)
+                ).fetchall()
+                for key, intent in rows:
+                    for i in missing.pop(key):
+                        results[i] = intent
+                        self._stats["disk_hits"] += 1
+                    self._remember(key, intent)
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE intent_memo SET last_used = ? WHERE key = ?", [(time.time(), key) for key, _ in rows]
+                    )
+            self._stats["misses"] += sum(len(positions) for positions in missing.values())
+        return results
+
+    def put_many(self, items: dict[str, str]):
+        """Stores {key: intent}."""
+        if not items:
+            return
+        with self._lock:
+            for key, intent in items.items():
+                self._remember(key, intent)
+            self._stats["stored"] += len(items)
+            if self._conn is not None:
+                now = time.time()
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO intent_memo (key, intent, last_used) VALUES (?, ?, ?)",
+                    [(key, intent, now) for key, intent in items.items()]
+                )
+                self._writes_since_trim += len(items)
+                if self._writes_since_trim >= _DISK_TRIM_EVERY:
+                    self._writes_since_trim = 0
+                    self._trim_disk()
+
+    def _trim_disk(self):
+        if self.max_disk_entries <= 0:
+            return
+        count = self._conn.execute("SELECT COUNT(*) FROM intent_memo").fetchone()[0]
+        if count > self.max_disk_entries:
+            self._conn.execute(
+                "DELETE FROM intent_memo WHERE key IN (SELECT key FROM intent_memo ORDER BY last_used LIMIT ?)",
+                (count - self.max_disk_entries,)
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        stats["max_entries"] = self.max_entries
+        stats["persistent"] = self.persistent
+        return stats
+
+
+_memo = None
+_memo_lock = threading.Lock()
+
+def get_intent_memo() -> Optional[IntentMemo]:
+    """Returns the process-wide memo, or None when INTENT_MEMO_ENABLED is off."""
+    global _memo
+    if not INTENT_MEMO_ENABLED:
+        return None
+    if _memo is None:
+        with _memo_lock:
+            if _memo is None:
+                _memo = IntentMemo()
+    return _memo
@@ -0,0 +1,124 @@
+import logging
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+import xxhash
+
+from tools.sales_tools import split_conversation_by_day, predict_sales_intent_batch_tool_async
+from tools.resilience import without_deadline
+from tools.rate_limiter import speculative
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+INTENT_PREFETCH_ENABLED = os.getenv("INTENT_PREFETCH_ENABLED", "true").lower() in ("1", "true", "yes")
+INTENT_PREFETCH_MAX_THREADS = int(os.getenv("INTENT_PREFETCH_MAX_THREADS", "1000"))
+
+
+class IntentPrefetcher:
+    """
+    Starts the per-day intent classification of a sales conversation in the
+    background as soon as the conversation is submitted, keyed by thread, so
+    it overlaps with clarifying-question generation and with the user
+    answering. The sales agent then `take`s the finished (or still running)
+    result instead of classifying from scratch. For an incremental update,
+    the days already in the thread's report are skipped.
+
+    Lives on the server's event loop, outside the graph run: a paused run
+    stops being consumed, so work started inside it would not survive the
+    pause. At most `max_threads` prefetches are kept; the oldest is cancelled
+    beyond that.
+    """
+
+    def __init__(self, max_threads: int = INTENT_PREFETCH_MAX_THREADS):
+        self.max_threads = max(1, max_threads)
+        self._tasks = OrderedDict()  # thread_id -> (conversation key, started_at, task)
+        self._stats = {"started": 0, "used": 0, "stale": 0, "failed": 0, "wait_ms_total": 0.0}
+
+    @staticmethod
+    def _key(conversation: str, skip_days: frozenset) -> str:
+        return xxhash.xxh3_64_hexdigest("\x00".join([conversation, *sorted(skip_days)]))
+
+    def start(self, thread_id: str, conversation: str, skip_days: Iterable[str] = ()):
+        """
+        Begins classifying the days of `conversation` (except `skip_days`) for
+        `thread_id`, replacing any earlier prefetch of another text.
+        """
+        skip_days = frozenset(skip_days)
+        key = self._key(conversation, skip_days)
+        held = self._tasks.get(thread_id)
+        if held is not None and held[0] == key:
+            return
+        self.discard(thread_id)
+        # Runs past the request that started it, so it must not inherit that request's deadline,
+        # and queues behind calls someone is already waiting for.
+        task = asyncio.create_task(speculative(without_deadline(self._classify(conversation, skip_days))))
+        self._tasks[thread_id] = (key, time.perf_counter(), task)
+        self._stats["started"] += 1
+        while len(self._tasks) > self.max_threads:
+            _, (_, _, oldest) = self._tasks.popitem(last=False)
+            oldest.cancel()
+        logger.info(f"⚡ Intent prefetch started for thread {thread_id}.")
+
+    @staticmethod
+    async def _classify(conversation: str, skip_days: frozenset) -> list[dict]:
+        daily_chunks = [chunk for chunk in split_conversation_by_day(conversation) if chunk["day_marker"] not in skip_days]
+        return await predict_sales_intent_batch_tool_async(daily_chunks)
+
+    async def take(self, thread_id: Optional[str], conversation: str,
+                   skip_days: Iterable[str] = ()) -> Optional[list[dict]]:
+        """
+        Returns the prefetched {"day_marker", "intent"} list for this exact
+        conversation and `skip_days`, waiting for it if it is still running.
+        None if there is no usable prefetch.
+        """
+        entry = self._tasks.pop(thread_id, None) if thread_id else None
+        if entry is None:
+            return None
+        key, started_at, task = entry
+        if key != self._key(conversation, frozenset(skip_days)) or task.get_loop() is not asyncio.get_running_loop():
+            task.cancel()
+            self._stats["stale"] += 1
+            return None
+
+        waited_from = time.perf_counter()
+        try:
+            daily_intents = await task
+        except Exception as e:
+            logger.error(f"❌ ERROR in intent prefetch for thread {thread_id}: {e}")
+            self._stats["failed"] += 1
+            return None
+        wait_ms = (time.perf_counter() - waited_from) * 1000.0
+        self._stats["used"] += 1
+        self._stats["wait_ms_total"] += wait_ms
+        logger.info(f"⚡ Using prefetched intents for thread {thread_id} "
+              f"(started {time.perf_counter() - started_at:.2f}s ago, waited {wait_ms:.0f}ms).")
+        return daily_intents
+
+    def discard(self, thread_id: str):
+        entry = self._tasks.pop(thread_id, None)
+        if entry is not None:
+            entry[2].cancel()
+
+    def stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["pending"] = sum(1 for _, _, task in self._tasks.values() if not task.done())
+        stats["held"] = len(self._tasks)
+        stats["avg_wait_ms"] = round(stats["wait_ms_total"] / stats["used"], 3) if stats["used"] else 0.0
+        return stats
+
+
+_prefetcher = None
+
+def get_intent_prefetcher() -> Optional[IntentPrefetcher]:
+    """Returns the process-wide prefetcher, or None when INTENT_PREFETCH_ENABLED is off."""
+    global _prefetcher
+    if not INTENT_PREFETCH_ENABLED:
+        return None
+    if _prefetcher is None:
+        # Only ever used from the event loop, so no lock is needed.
+        _prefetcher = IntentPrefetcher()
+    return _prefetcher
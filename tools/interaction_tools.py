@@ -2,26 +2,36 @@
 
 
 
+import logging
+import copy
 import json
-import os
-from openai import OpenAI
+from typing import Optional
 from dotenv import load_dotenv
 from graph_state import AgentState
 from tools.poster_tools import POSTER_PROMPT_SKELETON
+from tools.question_cache import get_question_cache, namespace_for
+from tools.llm import chat_completion, chat_completion_async
+
+logger = logging.getLogger(__name__)
 
 # --- CONFIGURATION ---
 load_dotenv()
-client = OpenAI(
-    api_key=os.getenv("GROQ_API_KEY"),
-    base_url="https://api.groq.com/openai/v1"
-)
 MODEL = 'openai/gpt-oss-120b'
 
+# Generic questions returned when the LLM call fails.
+SALES_QUESTIONS_FALLBACK = {
+    "questions": [
+        {"id": "fallback_1", "text": "What is the primary industry of the client?", "ui_element": "text_input"},
+        {"id": "fallback_2", "text": "Who is the key decision-maker you've been in contact with?", "ui_element": "text_input"}
+    ]
+}
+SKELETON_QUESTIONS_FALLBACK = {"questions": [{"id": "fallback", "text": "Error generating questions.", "ui_element": "text", "options": []}]}
+
 
 # --- NEW FUNCTION ---
 def get_poster_prompt_skeleton() -> str:
     """A simple data provider to fetch the poster skeleton for the manager."""
-    print("---TOOL:  fetching poster prompt skeleton---")
+    logger.debug("---TOOL:  fetching poster prompt skeleton---")
     return POSTER_PROMPT_SKELETON
 
 
@@ -31,15 +41,51 @@ def generate_clarifying_sales_questions(state: AgentState) -> dict:
     Analyzes a sales conversation and generates 3 highly specific,
     context-driven questions to extract critical missing information.
     """
-    print("---TOOL: Generatitheng Clarifying Sales Questions---")
-    
+    logger.debug("---TOOL: Generatitheng Clarifying Sales Questions---")
+    system_prompt = _build_clarifying_sales_prompt(state)
+    try:
+        content = chat_completion(
+            model=MODEL,
+            messages=[{"role": "system", "content": system_prompt}],
+            temperature=0.5,
+            response_format={"type": "json_object"}
+        )
+        result = json.loads(content)
+        logger.info(f"✅ Generated {len(result.get('questions', []))} sales questions.")
+        logger.debug("Generated sales questions", extra={"result": result})
+        return result
+    except Exception as e:
+        logger.error(f"❌ ERROR generating sales questions: {e}")
+        # Fallback with generic questions
+        return copy.deepcopy(SALES_QUESTIONS_FALLBACK)
+
+async def generate_clarifying_sales_questions_async(state: AgentState) -> dict:
+    """Async variant of generate_clarifying_sales_questions on the shared AsyncOpenAI client."""
+    logger.debug("---TOOL: Generating Clarifying Sales Questions (async)---")
+    system_prompt = _build_clarifying_sales_prompt(state)
+    try:
+        content = await chat_completion_async(
+            model=MODEL,
+            messages=[{"role": "system", "content": system_prompt}],
+            temperature=0.5,
+            response_format={"type": "json_object"}
+        )
+        result = json.loads(content)
+        logger.info(f"✅ Generated {len(result.get('questions', []))} sales questions.")
+        logger.debug("Generated sales questions", extra={"result": result})
+        return result
+    except Exception as e:
+        logger.error(f"❌ ERROR generating sales questions: {e}")
+        return copy.deepcopy(SALES_QUESTIONS_FALLBACK)
+
+def _build_clarifying_sales_prompt(state: AgentState) -> str:
     interaction_data = state.get("interaction", {})
     collected_content = interaction_data.get("collected_content", {})
     
     conversation = collected_content.get("conversation", "No conversation provided.")
     operation = collected_content.get("operation", "Intent Analysis") # Default operation
 
-    system_prompt = f"""
+    return f"""
 You are a Sales Intelligence Question Generator. Your job is to analyze a sales conversation and generate 3 highly specific, context-driven questions that extract missing critical information for the selected operation.
 
 OPERATION: {operation}
@@ -73,25 +119,6 @@ EXAMPLE FORMAT:
   ]
 }}
 """
-    try:
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=[{"role": "system", "content": system_prompt}],
-            temperature=0.5,
-            response_format={"type": "json_object"}
-        )
-        result = json.loads(response.choices[0].message.content)
-        print(f"✅ Generated sales questions: {json.dumps(result, indent=2)}")
-        return result
-    except Exception as e:
-        print(f"❌ ERROR generating sales questions: {e}")
-        # Fallback with generic questions
-        return {
-            "questions": [
-                {"id": "fallback_1", "text": "What is the primary industry of the client?", "ui_element": "text_input"},
-                {"id": "fallback_2", "text": "Who is the key decision-maker you've been in contact with?", "ui_element": "text_input"}
-            ]
-        }
     
   # --- Tool 1: The Dynamic Question Generator ---
 # ✅ --- THIS IS THE NEW, SMARTER QUESTION GENERATOR --- ✅
@@ -99,9 +126,63 @@ def generate_questions_from_skeleton(main_idea: str, prompt_skeleton: str) -> di
     """
     Uses an LLM to generate a CONSOLIDATED and CONTEXT-AWARE set of questions.
     """
-    print(f"---TOOL: 🧠 Generating CONTEXT-AWARE questions for '{main_idea}'---")
-    
-    meta_prompt = f"""
+    logger.debug(f"---TOOL: 🧠 Generating CONTEXT-AWARE questions for '{main_idea}'---")
+    if (cached := _cached_skeleton_questions(main_idea, prompt_skeleton)) is not None:
+        return cached
+    meta_prompt = _build_skeleton_meta_prompt(main_idea, prompt_skeleton)
+    try:
+        content = chat_completion(
+            model=MODEL,
+            messages=[{"role": "system", "content": meta_prompt}],
+            temperature=0.4,
+            response_format={"type": "json_object"}
+        )
+        result = json.loads(content)
+        logger.info("✅ Dynamically generated a SMALLER set of questions.")
+        _store_skeleton_questions(main_idea, prompt_skeleton, result)
+        return result
+    except Exception as e:
+        logger.error(f"❌ ERROR generating consolidated questions: {e}")
+        return copy.deepcopy(SKELETON_QUESTIONS_FALLBACK)
+
+async def generate_questions_from_skeleton_async(main_idea: str, prompt_skeleton: str) -> dict:
+    """Async variant of generate_questions_from_skeleton on the shared AsyncOpenAI client."""
+    logger.debug(f"---TOOL: 🧠 Generating CONTEXT-AWARE questions for '{main_idea}' (async)---")
+    if (cached := _cached_skeleton_questions(main_idea, prompt_skeleton)) is not None:
+        return cached
+    meta_prompt = _build_skeleton_meta_prompt(main_idea, prompt_skeleton)
+    try:
+        content = await chat_completion_async(
+            model=MODEL,
+            messages=[{"role": "system", "content": meta_prompt}],
+            temperature=0.4,
+            response_format={"type": "json_object"}
+        )
+        result = json.loads(content)
+        logger.info("✅ Dynamically generated a SMALLER set of questions.")
+        _store_skeleton_questions(main_idea, prompt_skeleton, result)
+        return result
+    except Exception as e:
+        logger.error(f"❌ ERROR generating consolidated questions: {e}")
+        return copy.deepcopy(SKELETON_QUESTIONS_FALLBACK)
+
+def _cached_skeleton_questions(main_idea: str, prompt_skeleton: str) -> Optional[dict]:
+    cache = get_question_cache()
+    if cache is None:
+        return None
+    result = cache.get(namespace_for(prompt_skeleton), main_idea)
+    if result is not None:
+        logger.info("⚡ Reusing a cached question set (no LLM call).")
+    return result
+
+def _store_skeleton_questions(main_idea: str, prompt_skeleton: str, result: dict):
+    # Only well-formed LLM answers are cached, never the fallback set.
+    cache = get_question_cache()
+    if cache is not None and result.get("questions"):
+        cache.put(namespace_for(prompt_skeleton), main_idea, result)
+
+def _build_skeleton_meta_prompt(main_idea: str, prompt_skeleton: str) -> str:
+    return f"""
 You are an expert UI/UX designer and prompt engineer. Your goal is to take a user's core idea and generate a minimal, intuitive set of questions to build a poster.
 
 **USER'S CORE IDEA:** "{main_idea}"
@@ -146,17 +227,4 @@ You are an expert UI/UX designer and prompt engineer. Your goal is to take a use
 
 Now, generate the consolidated, context-aware questions for the user's core idea: "{main_idea}".
 """
-    try:
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=[{"role": "system", "content": meta_prompt}],
-            temperature=0.4,
-            response_format={"type": "json_object"}
-        )
-        result = json.loads(response.choices[0].message.content)
-        print("✅ Dynamically generated a SMALLER set of questions.")
-        return result
-    except Exception as e:
-        print(f"❌ ERROR generating consolidated questions: {e}")
-        return {"questions": [{"id": "fallback", "text": "Error generating questions.", "ui_element": "text", "options": []}]}
 
@@ -0,0 +1,190 @@
+import os
+import json
+import openai
+import xxhash
+from typing import Optional
+from langgraph.config import get_config, get_stream_writer
+
+from tools.clients import get_groq_client, get_async_groq_client
+from tools.single_flight import SingleFlight
+from tools.resilience import resilient_call, resilient_call_async
+from tools.rate_limiter import estimate_tokens, get_rate_limiter
+from metrics import track_call, record_tokens
+
+# --- Configuration ---
+LLM_SINGLE_FLIGHT_ENABLED = os.getenv("LLM_SINGLE_FLIGHT_ENABLED", "true").lower() in ("1", "true", "yes")
+# Completion tokens reserved against a model's TPM limit until the real usage is known.
+LLM_COMPLETION_TOKEN_ESTIMATE = int(os.getenv("LLM_COMPLETION_TOKEN_ESTIMATE", "512"))
+
+# Set by the SSE endpoints in main.py: {"configurable": {"stream_tokens": True}}.
+STREAM_TOKENS_CONFIG_KEY = "stream_tokens"
+
+# Identical chat completions in flight at the same time share one upstream call.
+_llm_flight = SingleFlight("llm")
+
+
+def get_llm_flight_stats() -> dict:
+    return _llm_flight.stats()
+
+
+def _request_key(kwargs: dict) -> str:
+    """(model, messages, temperature, response_format) as a compact hash."""
+    return xxhash.xxh3_128_hexdigest(json.dumps(kwargs, sort_keys=True, ensure_ascii=False))
+
+
+def _token_writer():
+    """
+    Returns (node_name, writer) when the current graph run asked for token
+    streaming, otherwise None. Outside a graph run there is no config at all.
+    """
+    try:
+        config = get_config()
+    except RuntimeError:
+        return None
+    if not config.get("configurable", {}).get(STREAM_TOKENS_CONFIG_KEY):
+        return None
+    return config.get("metadata", {}).get("langgraph_node"), get_stream_writer()
+
+
+def _usage_tokens(usage) -> Optional[int]:
+    """prompt + completion tokens from an OpenAI-style usage object or dict; None if unknown."""
+    if usage is None:
+        return None
+    if not isinstance(usage, dict):
+        usage = {"prompt_tokens": getattr(usage, "prompt_tokens", 0), "completion_tokens": getattr(usage, "completion_tokens", 0)}
+    return (usage.get("prompt_tokens") or 0) + (usage.get("completion_tokens") or 0)
+
+
+def _request_kwargs(model: str, messages: list[dict], temperature: float,
+                    response_format: Optional[dict]) -> dict:
+    kwargs = {"model": model, "messages": messages, "temperature": temperature}
+    if response_format is not None:
+        kwargs["response_format"] = response_format
+    return kwargs
+
+
+def chat_completion(model: str, messages: list[dict], temperature: float,
+                    response_format: Optional[dict] = None) -> str:
+    """Shared sync chat-completion call that returns the message content."""
+    kwargs = _request_kwargs(model, messages, temperature, response_format)
+
+    limiter = get_rate_limiter("groq", model)
+
+    def attempt():
+        with limiter.slot(estimate_tokens(messages, LLM_COMPLETION_TOKEN_ESTIMATE)) as ticket:
+            with track_call("groq", "chat", model):
+                response = get_groq_client().chat.completions.create(**kwargs)
+            ticket.used_tokens = _usage_tokens(response.usage)
+        return response
+
+    def create() -> str:
+        response = resilient_call("groq", "chat", attempt)
+        record_tokens(model, response.usage)
+        return response.choices[0].message.content
+
+    if not LLM_SINGLE_FLIGHT_ENABLED:
+        return create()
+    return _llm_flight.do(_request_key(kwargs), create)
+
+
+async def chat_completion_async(model: str, messages: list[dict], temperature: float,
+                                response_format: Optional[dict] = None) -> str:
+    """
+    Shared async chat-completion call that returns the message content.
+
+    When the surrounding graph run streams tokens, the request is made with
+    stream=True and every delta is forwarded to the run's custom stream as
+    {"node", "model", "delta"}; the full text is still returned to the caller.
+
+    Concurrent identical requests are coalesced: only the first caller goes
+    upstream (and streams its deltas); the others wait for its text and, if
+    their own run streams tokens, receive it as a single delta.
+    """
+    kwargs = _request_kwargs(model, messages, temperature, response_format)
+    token_writer = _token_writer()
+    if not LLM_SINGLE_FLIGHT_ENABLED:
+        return await _create_async(kwargs, token_writer)
+
+    executed = []
+
+    def create():
+        executed.append(True)
+        return _create_async(kwargs, token_writer)
+
+    content = await _llm_flight.do_async(_request_key(kwargs), create)
+    if token_writer is not None and not executed:
+        node, writer = token_writer
+        writer({"node": node, "model": model, "delta": content})
+    return content
+
+
+async def _create_async(kwargs: dict, token_writer: Optional[tuple]) -> str:
+    """
+    One upstream chat completion under the "groq" retry policy and breaker,
+    queued in the model's rate limiter (every attempt takes its own turn).
+    A streamed request is only retried while it is being opened: once deltas
+    have been forwarded, a failure is raised rather than replayed.
+    """
+    client = get_async_groq_client()
+    model = kwargs["model"]
+    limiter = get_rate_limiter("groq", model)
+    reserved = estimate_tokens(kwargs["messages"], LLM_COMPLETION_TOKEN_ESTIMATE)
+    if token_writer is None:
+        async def attempt():
+            async with limiter.slot_async(reserved) as ticket:
+                with track_call("groq", "chat", model):
+                    response = await client.chat.completions.create(**kwargs)
+                ticket.used_tokens = _usage_tokens(response.usage)
+            return response
+
+        response = await resilient_call_async("groq", "chat", attempt)
+        record_tokens(model, response.usage)
+        return response.choices[0].message.content
+
+    node, writer = token_writer
+
+    async def open_stream():
+        # The limiter slot is held until the stream has been read to the end.
+        ticket = await limiter.acquire_async(reserved)
+        try:
+            with track_call("groq", "chat", model):
+                try:
+                    return ticket, await client.chat.completions.create(stream=True, **kwargs)
+                except openai.BadRequestError:
+                    # Some model / response_format combinations cannot stream; fall back to the whole text.
+                    return ticket, await client.chat.completions.create(**kwargs)
+        except BaseException as e:
+            limiter.release(ticket, e)
+            raise
+
+    ticket, stream = await resilient_call_async("groq", "chat", open_stream)
+    if not isinstance(stream, openai.AsyncStream):
+        ticket.used_tokens = _usage_tokens(stream.usage)
+        limiter.release(ticket)
+        record_tokens(model, stream.usage)
+        content = stream.choices[0].message.content
+        writer({"node": node, "model": model, "delta": content})
+        return content
+
+    parts = []
+    error = None
+    try:
+        with track_call("groq", "chat_stream", model):
+            async for chunk in stream:
+                # Usage arrives on the final chunk (Groq also mirrors it under x_groq).
+                usage = chunk.usage or ((chunk.model_extra or {}).get("x_groq") or {}).get("usage")
+                record_tokens(model, usage)
+                if usage is not None:
+                    ticket.used_tokens = _usage_tokens(usage)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    writer({"node": node, "model": model, "delta": delta})
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        limiter.release(ticket, error)
+    return "".join(parts)
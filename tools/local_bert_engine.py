@@ -0,0 +1,122 @@
+import logging
+import os
+import threading
+import torch
+from transformers import BertTokenizerFast, BertForSequenceClassification
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+DEFAULT_MODEL_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'models', 'fine_tuned_bert'))
+LOCAL_BERT_MODEL_PATH = os.getenv("LOCAL_BERT_MODEL_PATH", DEFAULT_MODEL_PATH)
+LOCAL_BERT_PRECISION = os.getenv("LOCAL_BERT_PRECISION", "fp32")  # "fp32" | "bf16" | "int8"
+LOCAL_BERT_NUM_THREADS = int(os.getenv("LOCAL_BERT_NUM_THREADS", "0"))  # 0 = let torch decide
+LOCAL_BERT_BATCH_SIZE = int(os.getenv("LOCAL_BERT_BATCH_SIZE", "16"))
+LOCAL_BERT_MAX_LENGTH = int(os.getenv("LOCAL_BERT_MAX_LENGTH", "512"))
+
+# The repo only ships the config and tokenizer; the weights are downloaded separately (see README).
+WEIGHT_FILES = ("model.safetensors", "model.safetensors.index.json", "pytorch_model.bin", "pytorch_model.bin.index.json")
+
+
+def _check_weights(model_path: str):
+    """A local model directory must contain weights; Hub ids are left to from_pretrained."""
+    if not os.path.isdir(model_path):
+        return
+    if not any(os.path.exists(os.path.join(model_path, name)) for name in WEIGHT_FILES):
+        raise RuntimeError(
+            f"No model weights in '{model_path}' (expected one of: {', '.join(WEIGHT_FILES)}). "
+            "Download them with `huggingface-cli download Sanji8421/fine_tuned_BERT --local-dir "
+            f"{model_path}`, or set LOCAL_BERT_MODEL_PATH=Sanji8421/fine_tuned_BERT to load from the Hub."
+        )
+
+
+def model_fingerprint(model_path: str = LOCAL_BERT_MODEL_PATH, precision: str = LOCAL_BERT_PRECISION) -> str:
+    """
+    Identity of the model the engine loads: the resolved directory (or Hub
+    id), the precision and the size and mtime of its weight files, so
+    replacing the weights also changes it.
+    """
+    if not os.path.isdir(model_path):
+        return f"{model_path}:{precision}"
+    resolved = os.path.realpath(model_path)
+    weights = []
+    for name in WEIGHT_FILES:
+        path = os.path.join(resolved, name)
+        if os.path.exists(path):
+            stat = os.stat(path)
+            weights.append(f"{name}={stat.st_size}@{int(stat.st_mtime)}")
+    return f"{resolved}:{precision}:{','.join(weights)}"
+
+
+class LocalBertIntentEngine:
+    """
+    In-process inference engine for the fine-tuned BERT intent classifier.
+    The model is loaded once and reused for every prediction. Inputs are
+    sorted by length and padded per mini-batch (dynamic padding), so short
+    daily chunks never pay for the longest chunk in the conversation.
+    """
+
+    def __init__(self, model_path: str = LOCAL_BERT_MODEL_PATH, precision: str = LOCAL_BERT_PRECISION,
+                 num_threads: int = LOCAL_BERT_NUM_THREADS, batch_size: int = LOCAL_BERT_BATCH_SIZE,
+                 max_length: int = LOCAL_BERT_MAX_LENGTH):
+        if precision not in ("fp32", "bf16", "int8"):
+            raise ValueError(f"Unsupported LOCAL_BERT_PRECISION '{precision}'. Use fp32, bf16 or int8.")
+
+        logger.debug(f"---ENGINE: Loading local BERT from '{model_path}' ({precision})---")
+        _check_weights(model_path)
+        if num_threads > 0:
+            torch.set_num_threads(num_threads)
+
+        self.model_path = model_path
+        self.precision = precision
+        self.fingerprint = model_fingerprint(model_path, precision)
+        self.batch_size = max(1, batch_size)
+        self.max_length = max_length
+        self.tokenizer = BertTokenizerFast.from_pretrained(model_path)
+
+        model = BertForSequenceClassification.from_pretrained(model_path)
+        model.eval()
+        if precision == "int8":
+            # Dynamic quantization: Linear weights stored as int8, activations quantized on the fly.
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        elif precision == "bf16":
+            model = model.to(torch.bfloat16)
+        self.model = model
+        self.id2label = model.config.id2label
+        logger.info(f"✅ Local BERT ready (threads: {torch.get_num_threads()}, batch size: {self.batch_size}).")
+
+    def predict_labels(self, texts: list[str]) -> list[str]:
+        """Returns the raw model label (e.g. 'LABEL_3') for every input text, in input order."""
+        if not texts:
+            return []
+
+        # Sort by length so each mini-batch pads to a similar size.
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        labels = [None] * len(texts)
+
+        for start in range(0, len(order), self.batch_size):
+            batch_indices = order[start:start + self.batch_size]
+            inputs = self.tokenizer(
+                [texts[i] for i in batch_indices],
+                return_tensors='pt', truncation=True, padding='longest', max_length=self.max_length
+            )
+            with torch.no_grad():
+                logits = self.model(**inputs).logits
+            predicted = torch.argmax(logits.float(), dim=1).tolist()
+            for index, class_id in zip(batch_indices, predicted):
+                labels[index] = self.id2label.get(class_id, f"LABEL_{class_id}")
+
+        return labels
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_local_intent_engine() -> LocalBertIntentEngine:
+    """Returns the process-wide engine, loading the model on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = LocalBertIntentEngine()
+    return _engine
@@ -1,29 +1,24 @@
-import os
+import logging
 import json
 import re
-from openai import OpenAI
 from dotenv import load_dotenv
-from tools.sales_tools import predict_sales_intent_tool
+from tools.sales_tools import predict_sales_intent_tool, predict_sales_intent_tool_async
+from tools.llm import chat_completion, chat_completion_async
+from app_registry import get_app_registry
 
 from graph_state import AgentState
+
+logger = logging.getLogger(__name__)
 # from ..utils.prompt_validator import is_prompt_vague # You mentioned this is scrap, so we can ignore
 
 load_dotenv()
 
-client = OpenAI(
-    api_key=os.getenv("GROQ_API_KEY"),
-    base_url="https://api.groq.com/openai/v1"
-)
-
 def clean_json_response(text: str) -> str:
     cleaned = re.sub(r"^```(?:json)?|```$", "", text.strip(), flags=re.IGNORECASE | re.MULTILINE)
     return cleaned.strip()
 
-def process_user_prompt(prompt: str):
-    # This is your original, unchanged function logic
-    # that calls the LLM for intent detection.
-    try:
-        intent_extraction_prompt = f"""
+def _build_intent_extraction_prompt(prompt: str) -> str:
+    return f"""
 You are a helpful AI assistant. The user has provided this prompt: \"{prompt}\"
 Your job is to:
 1. Extract the user's **true intent** in one sentence.
@@ -34,25 +29,45 @@ Available apps:
 - Lead/Sales Intent Generator
 - Content Cluster Analyzer
 Return ONLY valid JSON: {{ "intent": "...", "recommended_app": "...", "prompt": "..."}}"""
-        response = client.chat.completions.create(
+
+def _resolve_intent_response(raw_response: str) -> dict:
+    """Parses the intent-detection LLM output and looks the app up in the registry."""
+    cleaned = clean_json_response(raw_response)
+    claude_json = json.loads(cleaned)
+    app_name = claude_json["recommended_app"]
+    app = get_app_registry().get(app_name)
+    if app is None:
+        return {"status": "error", "message": f"App '{app_name}' not found in registry."}
+    if not app.available:
+        return {"status": "error", "message": f"App '{app_name}' is not available: {'; '.join(app.problems)}"}
+    return {
+        "status": "ok", "intent": claude_json["intent"],
+        "recommended_app": app_name, "raw_prompt": claude_json["prompt"],
+        "entrypoint": app.entrypoint, "required_fields": list(app.required_fields)
+    }
+
+def process_user_prompt(prompt: str):
+    # This is your original, unchanged function logic
+    # that calls the LLM for intent detection.
+    try:
+        content = chat_completion(
             model="moonshotai/kimi-k2-instruct",
-            messages=[{"role": "user", "content": intent_extraction_prompt}],
+            messages=[{"role": "user", "content": _build_intent_extraction_prompt(prompt)}],
             temperature=0.3
         )
-        raw_response = response.choices[0].message.content
-        cleaned = clean_json_response(raw_response)
-        claude_json = json.loads(cleaned)
-        registry_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app_registry.json'))
-        with open(registry_path, 'r') as f:
-            registry = json.load(f)
-        app_name = claude_json["recommended_app"]
-        if app_name not in registry:
-            return {"status": "error", "message": f"App '{app_name}' not found in registry."}
-        return {
-            "status": "ok", "intent": claude_json["intent"],
-            "recommended_app": app_name, "raw_prompt": claude_json["prompt"],
-            "entrypoint": registry[app_name]["entrypoint"], "required_fields": registry[app_name]["required_fields"]
-        }
+        return _resolve_intent_response(content)
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+async def process_user_prompt_async(prompt: str):
+    """Async variant of process_user_prompt on the shared AsyncOpenAI client."""
+    try:
+        content = await chat_completion_async(
+            model="moonshotai/kimi-k2-instruct",
+            messages=[{"role": "user", "content": _build_intent_extraction_prompt(prompt)}],
+            temperature=0.3
+        )
+        return _resolve_intent_response(content)
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
@@ -65,10 +80,35 @@ def generate_input_payload_for_app(intent_data: dict):
     Logic is unchanged.
     """
     try:
-        raw_prompt = intent_data["raw_prompt"]
-        fields = intent_data["required_fields"]
-        field_template = json.dumps({field: False for field in fields}, indent=2)
-        prompt_to_ai = f"""
+        raw_output = chat_completion(
+            model="moonshotai/kimi-k2-instruct",
+            messages=[{"role": "user", "content": _build_poster_payload_prompt(intent_data)}],
+            temperature=0.5
+        )
+        cleaned = clean_json_response(raw_output)
+        app_payload = json.loads(cleaned)
+        return { "status": "ok", "input_payload": app_payload }
+    except Exception as e:
+        return { "status": "error", "message": str(e) }
+
+async def generate_input_payload_for_app_async(intent_data: dict):
+    """Async variant of generate_input_payload_for_app."""
+    try:
+        content = await chat_completion_async(
+            model="moonshotai/kimi-k2-instruct",
+            messages=[{"role": "user", "content": _build_poster_payload_prompt(intent_data)}],
+            temperature=0.5
+        )
+        app_payload = json.loads(clean_json_response(content))
+        return { "status": "ok", "input_payload": app_payload }
+    except Exception as e:
+        return { "status": "error", "message": str(e) }
+
+def _build_poster_payload_prompt(intent_data: dict) -> str:
+    raw_prompt = intent_data["raw_prompt"]
+    fields = intent_data["required_fields"]
+    field_template = json.dumps({field: False for field in fields}, indent=2)
+    return f"""
 You are an expert prompt enhancer and visual layout assistant.
 A user wants to generate a poster using the following raw prompt: \"{raw_prompt}\"
 Your tasks:
@@ -84,27 +124,15 @@ Respond ONLY with valid JSON:
   "include_cta": false, "include_cta_link": true, "include_testimonial": true,
   "include_success_metrics": false, "include_target_audience": false
 }}"""
-        response = client.chat.completions.create(
-            model="moonshotai/kimi-k2-instruct",
-            messages=[{"role": "user", "content": prompt_to_ai}],
-            temperature=0.5
-        )
-        raw_output = response.choices[0].message.content
-        cleaned = clean_json_response(raw_output)
-        app_payload = json.loads(cleaned)
-        return { "status": "ok", "input_payload": app_payload }
-    except Exception as e:
-        return { "status": "error", "message": str(e) }
     
 # =================================================================
 # SALES PAYLOAD  PREP  LOGIC
 # =================================================================
-def generate_sales_payload_for_app(intent_data: dict):
-    try:
-        raw_text = intent_data["raw_prompt"]
+def _build_sales_cleaning_prompt(intent_data: dict) -> str:
+    raw_text = intent_data["raw_prompt"]
 
-        # 🔁 Prompt to GPT-4o — STRICT JSON ONLY
-        input_cleaning_prompt = f"""
+    # 🔁 Prompt to GPT-4o — STRICT JSON ONLY
+    return f"""
 You are a helpful AI assistant.
 
 The user has pasted a messy multi-day sales conversation copied from emails or chat.
@@ -126,13 +154,15 @@ Text:
 \"\"\"{raw_text}\"\"\"
 """
 
-        response = client.chat.completions.create(
+def generate_sales_payload_for_app(intent_data: dict):
+    try:
+        content = chat_completion(
             model="moonshotai/kimi-k2-instruct",
-            messages=[{"role": "user", "content": input_cleaning_prompt}],
+            messages=[{"role": "user", "content": _build_sales_cleaning_prompt(intent_data)}],
             temperature=0.2
         )
 
-        cleaned_response = clean_json_response(response.choices[0].message.content)
+        cleaned_response = clean_json_response(content)
         convo_json = json.loads(cleaned_response)
         flattened_convo = convo_json["conversation"]
 
@@ -153,12 +183,35 @@ Text:
             "message": str(e)
         }
 
+async def generate_sales_payload_for_app_async(intent_data: dict):
+    """Async variant of generate_sales_payload_for_app."""
+    try:
+        content = await chat_completion_async(
+            model="moonshotai/kimi-k2-instruct",
+            messages=[{"role": "user", "content": _build_sales_cleaning_prompt(intent_data)}],
+            temperature=0.2
+        )
+        flattened_convo = json.loads(clean_json_response(content))["conversation"]
+        predicted_intent = await predict_sales_intent_tool_async(flattened_convo)
+        return {
+            "status": "ok",
+            "input_payload": {
+                "conversation": flattened_convo,
+                "predicted_intent": predicted_intent
+            }
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": str(e)
+        }
+
 # =================================================================
 # LANGGRAPH NODE WRAPPERS
 # =================================================================
 def detect_intent_node(state: AgentState):
     """Node 1: Detects user intent."""
-    print("---NODE: Running Intent Detection---")
+    logger.debug("---NODE: Running Intent Detection---")
     prompt = state['initial_request']['prompt']
     intent_result = process_user_prompt(prompt)
     return {"intent_data": intent_result}
@@ -166,13 +219,13 @@ def detect_intent_node(state: AgentState):
 # --- NEW NODE ---
 def prepare_poster_payload_node(state: AgentState):
     """Node 2 (Poster Branch): Prepares the input payload for the poster agent."""
-    print("---NODE: Preparing Poster Payload---")
+    logger.debug("---NODE: Preparing Poster Payload---")
     intent_data = state['intent_data']
     payload_result = generate_input_payload_for_app(intent_data)
     return {"input_payload": payload_result}
 
 def prepare_sales_payload_node(state: AgentState):
-    print("---NODE: Preparing Sales Payload (incl. Intent Prediction)---")
+    logger.debug("---NODE: Preparing Sales Payload (incl. Intent Prediction)---")
     intent_data = state['intent_data']
     payload_result = generate_sales_payload_for_app(intent_data)
 
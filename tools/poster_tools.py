@@ -1,19 +1,21 @@
 
 
+import logging
 import os
-import json
-import requests
-import base64
-from openai import OpenAI
+import httpx
+import asyncio
 from dotenv import load_dotenv
+from tools.clients import UPSTREAMS, get_http_client, get_async_http_client
+from tools.image_cache import image_cache_key, get_image_cache
+from tools.single_flight import SingleFlight
+from tools.resilience import CircuitOpenError, DeadlineExceeded, resilient_call, resilient_call_async
+from tools.rate_limiter import get_rate_limiter
+from metrics import track_call, record_download
+from storage.artifacts import ARTIFACT_CHUNK_SIZE, get_artifact_store
 
 load_dotenv()
 
-# --- Configuration ---
-client = OpenAI(
-    api_key=os.getenv("GROQ_API_KEY"),
-    base_url="https://api.groq.com/openai/v1"
-)
+logger = logging.getLogger(__name__)
 
 # The "Blueprint" for the final image prompt lives here.
 POSTER_PROMPT_SKELETON = """
@@ -38,7 +40,7 @@ def build_image_prompt_tool(collected_data: dict) -> str:
     Takes the user's answers collected by the interaction manager and injects
     them into the master prompt skeleton to create the final "mega-prompt".
     """
-    print("---TOOL: 🛠️ Building Final Image Generation Prompt---")
+    logger.debug("---TOOL: 🛠️ Building Final Image Generation Prompt---")
     
     effects_list = collected_data.get("effects", [])
     effects_str = ", ".join(effects_list) if effects_list else "vibrant lighting"
@@ -55,22 +57,18 @@ def build_image_prompt_tool(collected_data: dict) -> str:
         hyperlink=collected_data.get("hyperlink", "yourwebsite.com"),
         font_style=collected_data.get("font_style", "sans-serif")
     )
-    print("✅ Final prompt built and ready for image generation.")
+    logger.info("✅ Final prompt built and ready for image generation.")
     return final_prompt
 
 # --- TOOL 2: The Image Generator (Live API) ---
-def generate_image_from_prompt_tool(prompt: str) -> str:
-    """
-    Calls the a4f.co Imagen 3 API, retrieves the image URL,
-    downloads the image, and returns it as a base64 string.
-    """
-    print("---TOOL: 🎨 Calling Live Image Generation API---")
+IMAGEN_API_URL = f"{UPSTREAMS['a4f']['base_url']}/images/generations"
+
+def _build_imagen_request(prompt: str) -> tuple[dict, dict]:
+    """Returns the (headers, body) for an Imagen generation request."""
     API_KEY = os.getenv("IMAGEGEN_API_KEY")
     if not API_KEY:
         raise ValueError("IMAGEGEN_API_KEY not found in environment variables.")
 
-    IMAGEN_API_URL = "https://api.a4f.co/v1/images/generations"
-    
     headers = {
         "Authorization": f"Bearer {API_KEY}",
         "Content-Type": "application/json"
@@ -82,29 +80,124 @@ def generate_image_from_prompt_tool(prompt: str) -> str:
         "n": 1,
         "size": "1024x1024"
     }
-    
+    return headers, data
+
+# Identical prompts generated at the same time share one upstream call.
+_image_flight = SingleFlight("imagen")
+
+def get_image_flight_stats() -> dict:
+    return _image_flight.stats()
+
+def _request_key(data: dict) -> str:
+    return image_cache_key(data["model"], data["size"], data["prompt"])
+
+def generate_image_from_prompt_tool(prompt: str) -> dict:
+    """
+    Returns the artifact reference for `prompt`: from the image cache if this
+    model, size and prompt were generated before, otherwise from the Imagen API.
+    """
+    logger.debug("---TOOL: 🎨 Calling Live Image Generation API---")
+    headers, data = _build_imagen_request(prompt)
+    key = _request_key(data)
+    cache = get_image_cache()
+    if cache is not None:
+        artifact = cache.get(key)
+        if artifact is not None:
+            logger.info(f"✅ Image cache hit: artifact {artifact['id'][:12]}")
+            return artifact
+
+    artifact = _image_flight.do(key, lambda: _generate_image(headers, data))
+    if cache is not None:
+        cache.put(key, artifact)
+    return artifact
+
+def _generate_image(headers: dict, data: dict) -> dict:
+    """
+    Calls the a4f.co Imagen 3 API, retrieves the image URL,
+    downloads the image into the artifact store, and returns its reference.
+    Both steps are retried under the "a4f" retry policy and circuit breaker;
+    generation calls also queue in the image model's rate limiter.
+    """
+    client = get_http_client("a4f")
+    limiter = get_rate_limiter("a4f", data["model"])
+
+    def generate():
+        with limiter.slot(), track_call("a4f", "image_generate", data["model"]):
+            response = client.post(IMAGEN_API_URL, headers=headers, json=data)
+            response.raise_for_status()
+        return response.json()['data'][0]['url']
+
+    def download(image_url: str) -> dict:
+        with track_call("a4f", "image_download"), client.stream("GET", image_url) as image_response:
+            image_response.raise_for_status()
+            return get_artifact_store().put_stream(image_response.iter_bytes(ARTIFACT_CHUNK_SIZE))
+
     try:
-        print("🎨 Calling Imagen API...")
+        logger.info("🎨 Calling Imagen API...")
         # Step 1: Call the Imagen API
-        response = requests.post(IMAGEN_API_URL, headers=headers, json=data, timeout=60)
-        response.raise_for_status()
+        image_url = resilient_call("a4f", "image_generate", generate)
+        logger.info(f"✅ Image URL received: {image_url}")
         
-        image_url = response.json()['data'][0]['url']
-        print("✅ Image URL received:", image_url)
+        # Step 2: Stream the image straight into the artifact store;
+        # graph state only keeps the reference
+        logger.info("📥 Downloading image...")
+        artifact = resilient_call("a4f", "image_download", lambda: download(image_url))
+        record_download("a4f", "image_download", artifact["size"])
         
-        # Step 2: Download the image
-        print("📥 Downloading image...")
-        image_response = requests.get(image_url, timeout=60)
-        image_response.raise_for_status()
+        logger.info(f"✅ Image stored as artifact {artifact['id'][:12]} ({artifact['size']} bytes)")
+        return artifact
         
-        # Step 3: Convert to base64
-        image_bytes = image_response.content
-        base64_string = base64.b64encode(image_bytes).decode('utf-8')
-        
-        print(f"✅ Image converted to base64 (length: {len(base64_string)})")
-        return base64_string
-        
-    except requests.RequestException as e:
-        print(f"❌ Error during image generation or download: {str(e)}")
+    except (httpx.HTTPError, CircuitOpenError, DeadlineExceeded) as e:
+        logger.error(f"❌ Error during image generation or download: {str(e)}")
         raise RuntimeError("Poster image generation failed.") from e
 
+async def generate_image_from_prompt_tool_async(prompt: str) -> dict:
+    """Async variant of generate_image_from_prompt_tool on the shared httpx.AsyncClient."""
+    logger.debug("---TOOL: 🎨 Calling Live Image Generation API (async)---")
+    headers, data = _build_imagen_request(prompt)
+    key = _request_key(data)
+    cache = get_image_cache()
+    if cache is not None:
+        artifact = await asyncio.to_thread(cache.get, key)
+        if artifact is not None:
+            logger.info(f"✅ Image cache hit: artifact {artifact['id'][:12]}")
+            return artifact
+
+    artifact = await _image_flight.do_async(key, lambda: _generate_image_async(headers, data))
+    if cache is not None:
+        await asyncio.to_thread(cache.put, key, artifact)
+    return artifact
+
+async def _generate_image_async(headers: dict, data: dict) -> dict:
+    """Async variant of _generate_image on the shared httpx.AsyncClient."""
+    client = get_async_http_client("a4f")
+    limiter = get_rate_limiter("a4f", data["model"])
+
+    async def generate():
+        async with limiter.slot_async():
+            with track_call("a4f", "image_generate", data["model"]):
+                response = await client.post(IMAGEN_API_URL, headers=headers, json=data)
+                response.raise_for_status()
+        return response.json()['data'][0]['url']
+
+    async def download(image_url: str) -> dict:
+        with track_call("a4f", "image_download"):
+            async with client.stream("GET", image_url) as image_response:
+                image_response.raise_for_status()
+                return await get_artifact_store().put_stream_async(image_response.aiter_bytes(ARTIFACT_CHUNK_SIZE))
+
+    try:
+        logger.info("🎨 Calling Imagen API...")
+        image_url = await resilient_call_async("a4f", "image_generate", generate)
+        logger.info(f"✅ Image URL received: {image_url}")
+
+        logger.info("📥 Downloading image...")
+        artifact = await resilient_call_async("a4f", "image_download", lambda: download(image_url))
+        record_download("a4f", "image_download", artifact["size"])
+
+        logger.info(f"✅ Image stored as artifact {artifact['id'][:12]} ({artifact['size']} bytes)")
+        return artifact
+
+    except (httpx.HTTPError, CircuitOpenError, DeadlineExceeded) as e:
+        logger.error(f"❌ Error during image generation or download: {str(e)}")
+        raise RuntimeError("Poster image generation failed.") from e
@@ -0,0 +1,202 @@
+import logging
+import os
+import re
+import copy
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+import xxhash
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+QUESTION_CACHE_ENABLED = os.getenv("QUESTION_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+QUESTION_CACHE_TTL_SECONDS = float(os.getenv("QUESTION_CACHE_TTL_SECONDS", str(24 * 3600)))
+QUESTION_CACHE_MAX_ENTRIES = int(os.getenv("QUESTION_CACHE_MAX_ENTRIES", "1024"))
+QUESTION_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("QUESTION_CACHE_SIMILARITY_THRESHOLD", "0.7"))  # > 1 disables tier two
+QUESTION_CACHE_EMBEDDING_DIM = int(os.getenv("QUESTION_CACHE_EMBEDDING_DIM", "1024"))
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+_STOPWORDS = frozenset("""
+a an the and or but of for to in on at by with from into about as is are was were be been being this that
+these those it its our your my their his her we you i they he she us them me any some so
+""".split())
+
+
+def normalize_idea(text: str) -> str:
+    """Lowercases, drops punctuation and collapses whitespace so trivial variations share a key."""
+    return _SPACES.sub(" ", _NON_WORD.sub(" ", text.lower())).strip()
+
+
+def content_words(normalized: str) -> frozenset:
+    """
+    The idea's non-stopword words, with a trailing plural "s" dropped. Two
+    ideas only share a question set when these match: the lexical embedding
+    alone rates "bakery opening" and "gym opening" as near-duplicates.
+    """
+    return frozenset(
+        word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+        for word in normalized.split() if word not in _STOPWORDS
+    )
+
+
+def embed_idea(normalized: str, dim: int = QUESTION_CACHE_EMBEDDING_DIM) -> np.ndarray:
+    """
+    Local embedding: character trigrams and whole words hashed into a
+    fixed-size vector (the hashing trick), L2-normalised so a dot product is
+    the cosine similarity. Needs no model and takes microseconds per idea.
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    padded = f" {normalized} "
+    for i in range(len(padded) - 2):
+        vector[xxhash.xxh32_intdigest(padded[i:i + 3]) % dim] += 1.0
+    for word in normalized.split():
+        vector[xxhash.xxh32_intdigest(word, seed=1) % dim] += 2.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class QuestionCache:
+    """
+    Two-tier cache of generated question sets.
+
+    Tier one is an exact match on the xxhash of the normalised idea. Tier two
+    compares the idea's embedding against every cached idea (one matrix-vector
+    product) and returns the closest set if its cosine similarity is at least
+    `similarity_threshold` and both ideas have the same content words, so it
+    absorbs stopwords, word order and plurals but never swaps the subject.
+    Entries are scoped to a namespace (the hash of the
+    prompt skeleton), expire after `ttl_seconds` and are evicted LRU beyond
+    `max_entries`.
+    """
+
+    def __init__(self, max_entries: int = QUESTION_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = QUESTION_CACHE_TTL_SECONDS,
+                 similarity_threshold: float = QUESTION_CACHE_SIMILARITY_THRESHOLD,
+                 dim: int = QUESTION_CACHE_EMBEDDING_DIM):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> {"namespace", "idea", "words", "value", "created", "slot"}
+        # Row i holds the embedding of the entry in slot i; free rows are zero.
+        self._vectors = np.zeros((self.max_entries, dim), dtype=np.float32)
+        self._slot_keys = [None] * self.max_entries
+        self._free_slots = list(range(self.max_entries - 1, -1, -1))
+        self._stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    @staticmethod
+    def _key(namespace: str, normalized: str) -> str:
+        return xxhash.xxh3_64_hexdigest(f"{namespace}\x00{normalized}")
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._vectors[entry["slot"]] = 0.0
+        self._slot_keys[entry["slot"]] = None
+        self._free_slots.append(entry["slot"])
+
+    def _expired(self, entry: dict, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - entry["created"] > self.ttl_seconds
+
+    def get(self, namespace: str, idea: str) -> Optional[dict]:
+        """Returns a copy of the cached question set for `idea`, or None on a miss."""
+        normalized = normalize_idea(idea)
+        key = self._key(namespace, normalized)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, now):
+                self._remove(key)
+                self._stats["expirations"] += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats["exact_hits"] += 1
+                return copy.deepcopy(entry["value"])
+
+            match = self._nearest(namespace, embed_idea(normalized, self.dim), content_words(normalized), now)
+            if match is None:
+                self._stats["misses"] += 1
+                return None
+            match_key, similarity = match
+            self._entries.move_to_end(match_key)
+            self._stats["semantic_hits"] += 1
+            logger.info(f"🧠 Question cache: '{idea}' matched '{self._entries[match_key]['idea']}' (cosine {similarity:.3f}).")
+            return copy.deepcopy(self._entries[match_key]["value"])
+
+    def _nearest(self, namespace: str, vector: np.ndarray, words: frozenset, now: float) -> Optional[tuple]:
+        if not self._entries or self.similarity_threshold > 1.0:
+            return None
+        similarities = self._vectors @ vector
+        for slot in np.argsort(similarities)[::-1]:
+            if similarities[slot] < self.similarity_threshold:
+                return None
+            key = self._slot_keys[slot]
+            if key is None:
+                continue
+            entry = self._entries[key]
+            if self._expired(entry, now):
+                self._remove(key)
+                self._stats["expirations"] += 1
+                continue
+            if entry["namespace"] == namespace and entry["words"] == words:
+                return key, float(similarities[slot])
+        return None
+
+    def put(self, namespace: str, idea: str, value: dict):
+        normalized = normalize_idea(idea)
+        key = self._key(namespace, normalized)
+        vector = embed_idea(normalized, self.dim)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            while not self._free_slots:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+            slot = self._free_slots.pop()
+            self._vectors[slot] = vector
+            self._slot_keys[slot] = key
+            self._entries[key] = {
+                "namespace": namespace,
+                "idea": idea,
+                "words": content_words(normalized),
+                "value": copy.deepcopy(value),
+                "created": time.time(),
+                "slot": slot,
+            }
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["exact_hits"] + stats["semantic_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["exact_hits"] + stats["semantic_hits"]) / lookups, 4) if lookups else 0.0
+        stats["max_entries"] = self.max_entries
+        stats["ttl_seconds"] = self.ttl_seconds
+        stats["similarity_threshold"] = self.similarity_threshold
+        return stats
+
+
+def namespace_for(prompt_skeleton: str) -> str:
+    """Question sets are only reused for the skeleton they were generated from."""
+    return xxhash.xxh3_64_hexdigest(prompt_skeleton)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_question_cache() -> Optional[QuestionCache]:
+    """Returns the process-wide question cache, or None when QUESTION_CACHE_ENABLED is off."""
+    global _cache
+    if not QUESTION_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = QuestionCache()
+    return _cache
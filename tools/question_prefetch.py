@@ -0,0 +1,145 @@
+import logging
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Optional
+
+from tools.interaction_tools import generate_questions_from_skeleton_async, get_poster_prompt_skeleton
+from tools.question_cache import normalize_idea, embed_idea, content_words
+from tools.rate_limiter import speculative
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+QUESTION_PREFETCH_ENABLED = os.getenv("QUESTION_PREFETCH_ENABLED", "true").lower() in ("1", "true", "yes")
+QUESTION_PREFETCH_DEBOUNCE_MS = float(os.getenv("QUESTION_PREFETCH_DEBOUNCE_MS", "400"))
+QUESTION_PREFETCH_MIN_CHARS = int(os.getenv("QUESTION_PREFETCH_MIN_CHARS", "12"))
+QUESTION_PREFETCH_SIMILARITY = float(os.getenv("QUESTION_PREFETCH_SIMILARITY", "0.85"))
+QUESTION_PREFETCH_TTL_SECONDS = float(os.getenv("QUESTION_PREFETCH_TTL_SECONDS", "600"))
+QUESTION_PREFETCH_MAX_THREADS = int(os.getenv("QUESTION_PREFETCH_MAX_THREADS", "1000"))
+
+
+class _Speculation:
+    def __init__(self, idea: str):
+        self.idea = idea
+        normalized = normalize_idea(idea)
+        self.vector = embed_idea(normalized)
+        self.words = content_words(normalized)
+        self.created = time.time()
+        self.generating = False  # False while still inside the debounce window
+        self.task: Optional[asyncio.Task] = None
+
+    def matches(self, other: "_Speculation", threshold: float) -> tuple[bool, float]:
+        """Same idea: close embeddings and the same content words (the embedding alone confuses subjects)."""
+        similarity = float(self.vector @ other.vector)
+        return similarity >= threshold and self.words == other.words, similarity
+
+
+class QuestionPrefetcher:
+    """
+    Speculative generation of the poster question set while the user is still
+    typing `main_idea`. The client reports the partial idea to POST /prefetch;
+    each report restarts a debounce timer for that thread, and generation only
+    starts once the text has been stable for `debounce_ms`. When the idea is
+    submitted, interaction_manager `take`s the speculation and reuses its
+    questions (waiting for them if still in flight) if the final idea is at
+    least `similarity` close to the one they were generated for and has the
+    same content words.
+    """
+
+    def __init__(self, debounce_ms: float = QUESTION_PREFETCH_DEBOUNCE_MS,
+                 min_chars: int = QUESTION_PREFETCH_MIN_CHARS, similarity: float = QUESTION_PREFETCH_SIMILARITY,
+                 ttl_seconds: float = QUESTION_PREFETCH_TTL_SECONDS, max_threads: int = QUESTION_PREFETCH_MAX_THREADS):
+        self.debounce_seconds = debounce_ms / 1000.0
+        self.min_chars = min_chars
+        self.similarity = similarity
+        self.ttl_seconds = ttl_seconds
+        self.max_threads = max(1, max_threads)
+        self._speculations = OrderedDict()  # thread_id -> _Speculation
+        self._stats = {"reports": 0, "generations": 0, "used": 0, "mismatched": 0, "not_ready": 0, "expired": 0}
+
+    def report(self, thread_id: str, partial_idea: str) -> str:
+        """Records what the user has typed so far. Returns what happened, for the endpoint's response."""
+        self._stats["reports"] += 1
+        partial_idea = partial_idea.strip()
+        if len(partial_idea) < self.min_chars:
+            return "too_short"
+
+        current = self._speculations.get(thread_id)
+        speculation = _Speculation(partial_idea)
+        if current is not None and current.generating and current.matches(speculation, self.similarity)[0]:
+            # The questions already being generated would still be reused for this text.
+            return "unchanged"
+
+        self.discard(thread_id)
+        speculation.task = asyncio.create_task(speculative(self._generate(speculation)))
+        self._speculations[thread_id] = speculation
+        while len(self._speculations) > self.max_threads:
+            _, oldest = self._speculations.popitem(last=False)
+            oldest.task.cancel()
+        return "scheduled"
+
+    async def _generate(self, speculation: _Speculation) -> dict:
+        await asyncio.sleep(self.debounce_seconds)
+        speculation.generating = True
+        self._stats["generations"] += 1
+        logger.info(f"🔮 Speculatively generating poster questions for '{speculation.idea}'.")
+        return await generate_questions_from_skeleton_async(speculation.idea, get_poster_prompt_skeleton())
+
+    async def take(self, thread_id: Optional[str], main_idea: str) -> Optional[dict]:
+        """The speculative question set for this thread if it matches `main_idea`, else None."""
+        speculation = self._speculations.pop(thread_id, None) if thread_id else None
+        if speculation is None:
+            return None
+        if (self.ttl_seconds > 0 and time.time() - speculation.created > self.ttl_seconds) \
+                or speculation.task.get_loop() is not asyncio.get_running_loop():
+            speculation.task.cancel()
+            self._stats["expired"] += 1
+            return None
+        if not speculation.generating:
+            # Still debouncing: generating for the final idea right away is just as fast.
+            speculation.task.cancel()
+            self._stats["not_ready"] += 1
+            return None
+        matched, similarity = speculation.matches(_Speculation(main_idea), self.similarity)
+        if not matched:
+            speculation.task.cancel()
+            self._stats["mismatched"] += 1
+            return None
+
+        try:
+            result = await speculation.task
+        except Exception as e:
+            logger.error(f"❌ ERROR in speculative question generation: {e}")
+            return None
+        if not result.get("questions"):
+            return None
+        self._stats["used"] += 1
+        logger.info(f"🔮 Reusing questions generated for '{speculation.idea}' (cosine {similarity:.3f}).")
+        return result
+
+    def discard(self, thread_id: str):
+        speculation = self._speculations.pop(thread_id, None)
+        if speculation is not None:
+            speculation.task.cancel()
+
+    def stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["held"] = len(self._speculations)
+        stats["debounce_ms"] = self.debounce_seconds * 1000.0
+        stats["similarity"] = self.similarity
+        return stats
+
+
+_prefetcher = None
+
+def get_question_prefetcher() -> Optional[QuestionPrefetcher]:
+    """Returns the process-wide prefetcher, or None when QUESTION_PREFETCH_ENABLED is off."""
+    global _prefetcher
+    if not QUESTION_PREFETCH_ENABLED:
+        return None
+    if _prefetcher is None:
+        # Only ever used from the event loop, so no lock is needed.
+        _prefetcher = QuestionPrefetcher()
+    return _prefetcher
@@ -0,0 +1,343 @@
+"""
+Client-side rate limiting per (provider, model): token buckets for requests
+and tokens per minute plus a concurrency cap, so bursts queue here instead of
+coming back from the upstream as 429s.
+
+Waiting callers are admitted strictly in priority order (interactive before
+autonomous before speculative work), FIFO within a priority. A 429 that does
+get through pauses that model's queue for the Retry-After the upstream asked
+for. Queue waits count against the request's deadline (tools/resilience.py).
+
+    # "<provider>:<model>=<rpm>:<tpm>:<concurrency>", comma-separated; "*" is the
+    # provider default and 0 means unlimited.
+    RATE_LIMITS="groq:*=0:0:32,groq:openai/gpt-oss-120b=30:8000:8"
+"""
+import os
+import math
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager, asynccontextmanager
+from typing import Callable, Optional
+
+from tools.resilience import DeadlineExceeded, remaining_budget, retry_hint
+from metrics import record_queue_wait, record_rate_limit_pause, record_deadline_exceeded
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+RATE_LIMITER_ENABLED = os.getenv("RATE_LIMITER_ENABLED", "true").lower() in ("1", "true", "yes")
+RATE_LIMITS = os.getenv("RATE_LIMITS", "groq:*=0:0:32,hf:*=0:0:16,a4f:*=0:0:8")
+# How long a model's queue is paused after a 429 that carried no Retry-After.
+RATE_LIMIT_DEFAULT_PAUSE_SECONDS = float(os.getenv("RATE_LIMIT_DEFAULT_PAUSE_SECONDS", "1"))
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_AUTONOMOUS = 1
+PRIORITY_SPECULATIVE = 2
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_AUTONOMOUS: "autonomous",
+                  PRIORITY_SPECULATIVE: "speculative"}
+
+
+def _parse_limits(spec: str) -> dict:
+    """{(provider, model): (rpm, tpm, concurrency)} from RATE_LIMITS."""
+    limits = {}
+    for entry in spec.split(","):
+        if not entry.strip():
+            continue
+        target, _, values = entry.strip().partition("=")
+        provider, _, model = target.partition(":")
+        rpm, tpm, concurrency = (values.split(":") + ["0", "0", "0"])[:3]
+        limits[(provider.strip(), model.strip() or "*")] = (float(rpm or 0), float(tpm or 0), int(concurrency or 0))
+    return limits
+
+
+_LIMITS = _parse_limits(RATE_LIMITS)
+
+
+# --- Request priority ---
+_priority = contextvars.ContextVar("request_priority", default=PRIORITY_AUTONOMOUS)
+
+
+@contextmanager
+def request_priority(priority: int):
+    """Queues every rate-limited call made by the enclosed work (and its tasks) at `priority`."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+async def speculative(coro):
+    """Awaits `coro` at the lowest priority, for prefetch and speculation that no one is waiting on yet."""
+    _priority.set(PRIORITY_SPECULATIVE)
+    return await coro
+
+
+class _Ticket:
+    """One queued or admitted call; ordered by (priority, arrival)."""
+    __slots__ = ("priority", "seq", "tokens", "wake", "granted", "cancelled", "used_tokens", "queued_at")
+
+    def __init__(self, priority: int, seq: int, tokens: int, wake: Callable):
+        self.priority = priority
+        self.seq = seq
+        self.tokens = tokens
+        self.wake = wake
+        self.granted = False
+        self.cancelled = False
+        self.used_tokens = None  # set by the caller from the upstream's usage, to settle the TPM bucket
+        self.queued_at = time.monotonic()
+
+    def __lt__(self, other: "_Ticket") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class RateLimiter:
+    """
+    RPM and TPM token buckets (both start full and refill continuously) and
+    a concurrency cap for one (provider, model). Only the head of the queue
+    is admitted, once a slot is free and both buckets hold enough; TPM is
+    reserved from an estimate and settled against the reported usage on
+    release. Shared by the event loop and worker threads, hence the lock.
+    """
+
+    def __init__(self, provider: str, model: str, rpm: float = 0, tpm: float = 0, concurrency: int = 0):
+        self.provider = provider
+        self.model = model
+        self.rpm = rpm
+        self.tpm = tpm
+        self.concurrency = concurrency
+        self._lock = threading.Lock()
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._queue = []
+        self._seq = itertools.count()
+        self._stats = {"admitted": 0, "queued": 0, "pauses": 0, "abandoned": 0, "wait_seconds_total": 0.0,
+                       "wait_seconds_max": 0.0}
+
+    # --- Core (call with self._lock held) ---
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._updated = now
+        if self.rpm:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60.0)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60.0)
+
+    def _wait_for(self, ticket: _Ticket, now: float) -> float:
+        """0 if `ticket` may go now, else seconds until it might (inf while waiting for a slot)."""
+        if self._paused_until > now:
+            return self._paused_until - now
+        if self.concurrency and self._in_flight >= self.concurrency:
+            return math.inf
+        wait = 0.0
+        if self.rpm and self._requests < 1:
+            wait = (1 - self._requests) * 60.0 / self.rpm
+        # A request larger than the whole bucket only waits for a full one.
+        needed = min(ticket.tokens, self.tpm)
+        if self.tpm and self._tokens < needed:
+            wait = max(wait, (needed - self._tokens) * 60.0 / self.tpm)
+        return wait
+
+    def _dispatch(self) -> float:
+        """Admits queued tickets in order while they fit; returns how long the head still has to wait."""
+        now = time.monotonic()
+        self._refill(now)
+        while self._queue:
+            head = self._queue[0]
+            if head.cancelled:
+                heapq.heappop(self._queue)
+                continue
+            wait = self._wait_for(head, now)
+            if wait > 0:
+                return wait
+            heapq.heappop(self._queue)
+            if self.rpm:
+                self._requests -= 1
+            if self.tpm:
+                self._tokens -= head.tokens
+            self._in_flight += 1
+            head.granted = True
+            head.wake()
+        return math.inf
+
+    def _free(self, ticket: _Ticket):
+        """Gives back an admitted ticket's slot and the unused part of its TPM reservation."""
+        self._in_flight -= 1
+        if self.tpm and ticket.used_tokens is not None:
+            self._tokens += ticket.tokens - ticket.used_tokens
+
+    def _enqueue(self, tokens: int, wake: Callable) -> _Ticket:
+        ticket = _Ticket(_priority.get(), next(self._seq), max(0, int(tokens)), wake)
+        with self._lock:
+            heapq.heappush(self._queue, ticket)
+            self._dispatch()
+        return ticket
+
+    def _next_wait(self, ticket: _Ticket) -> Optional[float]:
+        """None once `ticket` is admitted, else how long to sleep before looking again."""
+        with self._lock:
+            wait = 0.0 if ticket.granted else self._dispatch()
+        if ticket.granted:
+            return None
+        remaining = remaining_budget()
+        if remaining is not None:
+            if remaining <= 0:
+                record_deadline_exceeded(self.provider, "rate_limit_queue")
+                raise DeadlineExceeded(f"Request deadline exceeded while queued for {self.provider} {self.model}.")
+            wait = min(wait, remaining)
+        return wait
+
+    def _admitted(self, ticket: _Ticket):
+        waited = time.monotonic() - ticket.queued_at
+        with self._lock:
+            self._stats["admitted"] += 1
+            if waited > 0.001:
+                self._stats["queued"] += 1
+            self._stats["wait_seconds_total"] += waited
+            self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], waited)
+        record_queue_wait(self.provider, self.model, PRIORITY_NAMES.get(ticket.priority, str(ticket.priority)), waited)
+
+    def _abandon(self, ticket: _Ticket):
+        """Drops a ticket whose caller gave up (cancelled or out of deadline) while queued."""
+        # One critical section: _dispatch may grant the ticket on another thread at any point outside it.
+        with self._lock:
+            self._stats["abandoned"] += 1
+            if ticket.granted:
+                self._free(ticket)
+            else:
+                ticket.cancelled = True
+            self._dispatch()
+
+    # --- Public API ---
+    def acquire(self, tokens: int = 0) -> _Ticket:
+        """Blocks until the call may go; pair with release()."""
+        event = threading.Event()
+        ticket = self._enqueue(tokens, event.set)
+        try:
+            while True:
+                event.clear()
+                wait = self._next_wait(ticket)
+                if wait is None:
+                    break
+                event.wait(None if wait == math.inf else wait)
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        self._admitted(ticket)
+        return ticket
+
+    async def acquire_async(self, tokens: int = 0) -> _Ticket:
+        """Async variant of acquire(); waits without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        ticket = self._enqueue(tokens, lambda: loop.call_soon_threadsafe(event.set))
+        try:
+            while True:
+                event.clear()
+                wait = self._next_wait(ticket)
+                if wait is None:
+                    break
+                try:
+                    await asyncio.wait_for(event.wait(), None if wait == math.inf else wait)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        self._admitted(ticket)
+        return ticket
+
+    def release(self, ticket: _Ticket, error: Optional[BaseException] = None):
+        """Frees the ticket's slot, settles its TPM reservation and, after a 429, pauses the queue."""
+        pause = None
+        if error is not None and getattr(getattr(error, "response", None), "status_code", None) == 429:
+            pause = retry_hint(error) or RATE_LIMIT_DEFAULT_PAUSE_SECONDS
+        with self._lock:
+            self._free(ticket)
+            if pause is not None:
+                self._paused_until = max(self._paused_until, time.monotonic() + pause)
+                self._stats["pauses"] += 1
+            self._dispatch()
+        if pause is not None:
+            record_rate_limit_pause(self.provider, self.model)
+            logger.warning(f"⚠️ {self.provider} {self.model} rate limited; queue paused for {pause:.1f}s.")
+
+    @contextmanager
+    def slot(self, tokens: int = 0):
+        """acquire() / release() around the enclosed call; yields the ticket."""
+        ticket = self.acquire(tokens)
+        try:
+            yield ticket
+        except BaseException as e:
+            self.release(ticket, e)
+            raise
+        self.release(ticket)
+
+    @asynccontextmanager
+    async def slot_async(self, tokens: int = 0):
+        """Async variant of slot()."""
+        ticket = await self.acquire_async(tokens)
+        try:
+            yield ticket
+        except BaseException as e:
+            self.release(ticket, e)
+            raise
+        self.release(ticket)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._refill(time.monotonic())
+            admitted = self._stats["admitted"]
+            return {
+                "rpm": self.rpm, "tpm": self.tpm, "concurrency": self.concurrency,
+                "in_flight": self._in_flight,
+                "waiting": sum(1 for ticket in self._queue if not ticket.cancelled),
+                "requests_available": round(self._requests, 2) if self.rpm else None,
+                "tokens_available": round(self._tokens) if self.tpm else None,
+                "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 2),
+                **self._stats,
+                "wait_seconds_total": round(self._stats["wait_seconds_total"], 3),
+                "wait_seconds_max": round(self._stats["wait_seconds_max"], 3),
+                "avg_wait_seconds": round(self._stats["wait_seconds_total"] / admitted, 4) if admitted else 0.0,
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str, model: str = "") -> RateLimiter:
+    """
+    Returns the process-wide limiter for (provider, model), configured from
+    RATE_LIMITS (the model's own entry, else the provider's "*" entry).
+    With RATE_LIMITER_ENABLED off every limiter is unlimited.
+    """
+    key = (provider, model)
+    limiter = _limiters.get(key)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(key)
+            if limiter is None:
+                limits = _LIMITS.get(key) or _LIMITS.get((provider, "*")) or (0, 0, 0)
+                limiter = RateLimiter(provider, model, *(limits if RATE_LIMITER_ENABLED else (0, 0, 0)))
+                _limiters[key] = limiter
+    return limiter
+
+
+def get_rate_limiter_stats() -> dict:
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {f"{limiter.provider}:{limiter.model}": limiter.stats() for limiter in limiters}
+
+
+def estimate_tokens(messages: list[dict], completion_tokens: int) -> int:
+    """Rough TPM reservation for a chat call: ~4 characters per prompt token plus the expected completion."""
+    return sum(len(str(message.get("content", ""))) for message in messages) // 4 + completion_tokens
@@ -0,0 +1,340 @@
+"""
+Shared resilience layer for the Groq, HF and a4f calls: retries with
+exponential backoff and full jitter (honouring Retry-After and HF's
+`estimated_time` while a model loads), a circuit breaker per upstream that
+fails fast while it is down, and a per-request deadline budget that caps
+both the attempts and the waits between them.
+
+Attempts, delays and breaker thresholds are per upstream, in UPSTREAMS
+(tools/clients.py), e.g. HF_RETRY_ATTEMPTS or GROQ_CIRCUIT_FAILURES.
+"""
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+
+import httpx
+import openai
+
+from tools.clients import UPSTREAMS
+from metrics import record_retry, record_circuit_rejection, record_deadline_exceeded
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# Total time a /generate or /continue request may spend; 0 disables the budget.
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "90"))
+# A Retry-After / estimated_time longer than this is not waited out; the call fails instead.
+RETRY_MAX_HINT_SECONDS = float(os.getenv("RETRY_MAX_HINT_SECONDS", "60"))
+
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's deadline budget ran out before the upstream call finished."""
+
+
+# --- Deadline budgets ---
+_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: Optional[float] = REQUEST_DEADLINE_SECONDS):
+    """
+    Gives the enclosed work, and the tasks it spawns, `seconds` in total.
+    A nested budget can only shorten the outer one; None or <= 0 adds none.
+    """
+    expires = _deadline.get()
+    if seconds and seconds > 0:
+        ours = time.monotonic() + seconds
+        expires = ours if expires is None else min(expires, ours)
+    token = _deadline.set(expires)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def deadline_at(expires: Optional[float]):
+    """
+    Runs the enclosed work under an absolute time.monotonic() deadline (None
+    for none), e.g. one captured with current_deadline() in the thread that
+    handed the work over. Threads do not inherit context variables.
+    """
+    token = _deadline.set(expires)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def current_deadline() -> Optional[float]:
+    """The current request's absolute time.monotonic() deadline, or None without one."""
+    return _deadline.get()
+
+
+def remaining_budget() -> Optional[float]:
+    """Seconds left in the current request's budget, or None without one."""
+    expires = _deadline.get()
+    return None if expires is None else expires - time.monotonic()
+
+
+async def without_deadline(coro):
+    """Awaits `coro` with no budget, for background tasks that outlive the request that started them."""
+    _deadline.set(None)
+    return await coro
+
+
+def _check_deadline(upstream: str, operation: str) -> Optional[float]:
+    remaining = remaining_budget()
+    if remaining is not None and remaining <= 0:
+        record_deadline_exceeded(upstream, operation)
+        raise DeadlineExceeded(f"Request deadline exceeded before {upstream} {operation}.")
+    return remaining
+
+
+# --- Circuit breakers ---
+class CircuitBreaker:
+    """
+    Closed until `failure_threshold` consecutive failures, then open: calls
+    are rejected for `reset_seconds`, after which a single probe is let
+    through (half-open). A successful probe closes the circuit again, a
+    failed one re-opens it, and one that proves neither (a 429 or a 4xx)
+    frees the slot for the next probe. A threshold of 0 disables the breaker.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started = None
+        self.times_opened = 0
+        self.rejected = 0
+
+    def before_call(self):
+        """Raises CircuitOpenError unless a call may go through now."""
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            if self._state == "closed":
+                return
+            now = time.monotonic()
+            if self._state == "open" and now - self._opened_at >= self.reset_seconds:
+                self._state = "half_open"
+                self._probe_started = None
+            # A probe that never reported back (e.g. cancelled) is replaced after reset_seconds.
+            if self._state == "half_open" and (
+                    self._probe_started is None or now - self._probe_started >= self.reset_seconds):
+                self._probe_started = now
+                return
+            self.rejected += 1
+            retry_in = max(0.0, self._opened_at + self.reset_seconds - now)
+        record_circuit_rejection(self.name)
+        raise CircuitOpenError(f"Circuit for '{self.name}' is open; retry in {retry_in:.1f}s.")
+
+    @property
+    def is_open(self) -> bool:
+        return self._state == "open"
+
+    def record_success(self):
+        with self._lock:
+            if self._state != "closed":
+                logger.info(f"✅ Circuit for '{self.name}' closed again.")
+            self._state = "closed"
+            self._failures = 0
+            self._probe_started = None
+
+    def release_probe(self):
+        """For calls that prove nothing either way (429, 400, ...): keeps the state and frees the half-open probe."""
+        with self._lock:
+            self._probe_started = None
+
+    def record_failure(self):
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            self._failures += 1
+            if self._state == "half_open" or (self._state == "closed" and self._failures >= self.failure_threshold):
+                self._state = "open"
+                self._opened_at = time.monotonic()
+                self._probe_started = None
+                self.times_opened += 1
+                logger.warning(f"⚠️ Circuit for '{self.name}' opened after {self._failures} consecutive failures.")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_seconds": self.reset_seconds,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(upstream: str) -> CircuitBreaker:
+    """Returns the process-wide circuit breaker for an upstream ("groq", "hf" or "a4f")."""
+    breaker = _breakers.get(upstream)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(upstream)
+            if breaker is None:
+                config = UPSTREAMS[upstream]
+                breaker = CircuitBreaker(upstream, config["circuit_failures"], config["circuit_reset_seconds"])
+                _breakers[upstream] = breaker
+    return breaker
+
+
+def get_circuit_stats() -> dict:
+    return {name: get_circuit_breaker(name).stats() for name in UPSTREAMS}
+
+
+# --- Retry policy ---
+def _retry_after(headers) -> Optional[float]:
+    """Retry-After-Ms / Retry-After (seconds or an HTTP date) in seconds."""
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000.0)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return None
+
+
+def _estimated_time(response: httpx.Response) -> Optional[float]:
+    """HF answers 503 {"error": "... is currently loading", "estimated_time": 20.0} while a model loads."""
+    if response.status_code != 503:
+        return None
+    try:
+        body = response.json()
+    except Exception:  # not JSON, or a streamed body that was never read
+        return None
+    if isinstance(body, dict) and isinstance(body.get("estimated_time"), (int, float)):
+        return float(body["estimated_time"])
+    return None
+
+
+def _classify(exc: Exception) -> tuple[bool, bool, Optional[float]]:
+    """(retryable, counts against the circuit, upstream's wait hint in seconds) for a failed attempt."""
+    if isinstance(exc, (httpx.TransportError, openai.APIConnectionError)):
+        return True, True, None
+    if isinstance(exc, (httpx.HTTPStatusError, openai.APIStatusError)):
+        response = exc.response
+        if response.status_code not in RETRYABLE_STATUSES:
+            return False, False, None
+        loading = _estimated_time(response)
+        hint = _retry_after(response.headers)
+        # 429s and a model that is still loading mean "slow down", not "down".
+        return True, response.status_code >= 500 and loading is None, hint if hint is not None else loading
+    return False, False, None
+
+
+def retry_hint(exc: Exception) -> Optional[float]:
+    """Seconds the upstream asked the caller to wait before trying again, if it said."""
+    return _classify(exc)[2]
+
+
+def _after_failure(upstream: str, operation: str, exc: Exception, attempt: int) -> Optional[float]:
+    """Reports the failed attempt to the breaker and returns the wait before the next one, or None to give up."""
+    config = UPSTREAMS[upstream]
+    retryable, is_failure, hint = _classify(exc)
+    breaker = get_circuit_breaker(upstream)
+    if is_failure:
+        breaker.record_failure()
+    else:
+        # A 429 or a 400 says nothing about whether the upstream has recovered;
+        # only a successful call closes the circuit.
+        breaker.release_probe()
+    if not retryable or attempt >= config["retry_attempts"] or breaker.is_open:
+        return None
+    if hint is not None:
+        if hint > RETRY_MAX_HINT_SECONDS:
+            return None
+        delay = hint + random.uniform(0, config["retry_base_delay"])
+    else:
+        delay = random.uniform(0, min(config["retry_max_delay"], config["retry_base_delay"] * 2 ** (attempt - 1)))
+    remaining = remaining_budget()
+    if remaining is not None and delay >= remaining:
+        # Waiting would use up the budget anyway; fail now instead.
+        record_deadline_exceeded(upstream, operation)
+        return None
+    reason = str(exc).splitlines()[0] if str(exc) else type(exc).__name__
+    logger.warning(f"⚠️ {upstream} {operation} failed ({reason}); "
+                   f"retry {attempt}/{config['retry_attempts'] - 1} in {delay:.2f}s")
+    record_retry(upstream, operation)
+    return delay
+
+
+def resilient_call(upstream: str, operation: str, fn: Callable):
+    """Calls fn() under the upstream's retry policy, circuit breaker and the current deadline."""
+    breaker = get_circuit_breaker(upstream)
+    attempt = 1
+    while True:
+        _check_deadline(upstream, operation)
+        breaker.before_call()
+        try:
+            result = fn()
+        except Exception as exc:
+            delay = _after_failure(upstream, operation, exc, attempt)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            attempt += 1
+        else:
+            breaker.record_success()
+            return result
+
+
+async def resilient_call_async(upstream: str, operation: str, fn: Callable):
+    """
+    Async variant of resilient_call; `fn` returns a fresh awaitable per
+    attempt. Each attempt is also cut off when the deadline runs out.
+    """
+    breaker = get_circuit_breaker(upstream)
+    attempt = 1
+    while True:
+        remaining = _check_deadline(upstream, operation)
+        breaker.before_call()
+        try:
+            result = await asyncio.wait_for(fn(), remaining)
+        except Exception as exc:
+            if isinstance(exc, asyncio.TimeoutError) and remaining is not None and remaining_budget() <= 0:
+                record_deadline_exceeded(upstream, operation)
+                raise DeadlineExceeded(f"Request deadline exceeded during {upstream} {operation}.") from exc
+            delay = _after_failure(upstream, operation, exc, attempt)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            attempt += 1
+        else:
+            breaker.record_success()
+            return result
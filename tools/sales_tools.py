@@ -115,23 +115,34 @@
 #         }
 
 
+import logging
 import os
 import re
 import json
-from openai import OpenAI
+import asyncio
+from typing import Optional
+import xxhash
 from dotenv import load_dotenv
-import requests
-from tenacity import retry, stop_after_attempt, wait_fixed # <-- Import tenacity for retries
+from tools.intent_batcher import INTENT_MICROBATCH_ENABLED, get_intent_batcher
+from tools.intent_memo import chunk_key, get_intent_memo
+from tools.transcript_compactor import get_transcript_compactor
+from tools.clients import UPSTREAMS, get_http_client, get_async_http_client
+from tools.llm import chat_completion, chat_completion_async
+from tools.resilience import resilient_call, resilient_call_async
+from tools.rate_limiter import get_rate_limiter
+from metrics import track_call
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # --- Tool 1: Split Conversation by Day (UNCHANGED) ---
 def split_conversation_by_day(conversation_text: str) -> list[dict]:
     """
     Takes a raw conversation string and splits it into a list of dictionaries,
     each representing a day's interaction.
     """
-    print("---TOOL: Splitting Conversation by Day---")
+    logger.debug("---TOOL: Splitting Conversation by Day---")
     days = re.split(r'(?=\bDay \d+:)', conversation_text)
     
     daily_interactions = []
@@ -145,70 +156,338 @@ def split_conversation_by_day(conversation_text: str) -> list[dict]:
             content = match.group(2).strip()
             daily_interactions.append({"day_marker": day_marker, "content": content})
             
-    print(f"✅ Split into {len(daily_interactions)} daily interactions.")
+    logger.info(f"✅ Split into {len(daily_interactions)} daily interactions.")
     return daily_interactions
 
+def day_content_hash(content: str) -> str:
+    """Hash of a day's text, kept in daily_breakdown so a resubmitted day with new text is noticed."""
+    return xxhash.xxh3_64_hexdigest(content)
+
+def analysed_days(daily_chunks: list[dict], daily_breakdown: list[dict]) -> frozenset:
+    """
+    Markers of the submitted days whose current text is already analysed in
+    `daily_breakdown`. Breakdown entries without a content hash (older reports)
+    match on the marker alone.
+    """
+    analysed = {item["day"]: item.get("content_hash") for item in daily_breakdown}
+    return frozenset(
+        chunk["day_marker"] for chunk in daily_chunks
+        if chunk["day_marker"] in analysed
+        and analysed[chunk["day_marker"]] in (None, day_content_hash(chunk["content"]))
+    )
+
 
 # --- Tool 2: Predict Sales Intent using HUGGING FACE API (NOW WITH RETRIES) ---
-HF_API_URL = "https://api-inference.huggingface.co/models/Sanji8421/fine_tuned_BERT"
+# "hf" calls the hosted Inference API; "local" runs the bundled fine-tuned BERT in-process.
+SALES_INTENT_BACKEND = os.getenv("SALES_INTENT_BACKEND", "hf").lower()
+HF_API_URL = f"{UPSTREAMS['hf']['base_url']}/models/Sanji8421/fine_tuned_BERT"
+HF_MODEL_ID = HF_API_URL.rsplit("/models/", 1)[-1]
 HF_TOKEN = os.getenv("HUGGINGFACE_TOKEN")
 label_map = {
     'LABEL_0': 'Enrolled', 'LABEL_1': 'Ghosted', 'LABEL_2': 'Information Gathering', 
     'LABEL_3': 'Interested', 'LABEL_4': 'Meeting Scheduled', 'LABEL_5': 'Not Interested', 
     'LABEL_6': 'Price Concern', 'LABEL_7': 'Wants Demo'
 }
+# Memoised predictions are only valid for the model that produced them.
+if SALES_INTENT_BACKEND == "local":
+    # Same path resolution as the engine itself, plus the weights' size and mtime.
+    from tools.local_bert_engine import model_fingerprint
+    INTENT_MEMO_NAMESPACE = f"local:{model_fingerprint()}"
+else:
+    INTENT_MEMO_NAMESPACE = f"hf:{HF_API_URL}"
+# Error strings and "Unknown Intent" are never memoised, so a failed call is retried next time.
+_KNOWN_INTENTS = frozenset(label_map.values())
 
-@retry(stop=stop_after_attempt(3), wait=wait_fixed(10)) # <-- THE FIX: Retry 3 times, waiting 10 seconds between attempts
 def call_hf_api(payload):
-    """Helper function to call the HF API with retry logic."""
+    """
+    Helper function to call the HF API. Retries with jittered backoff (waiting
+    out a loading model's estimated_time) under the "hf" circuit breaker, and
+    queues each attempt in the model's rate limiter.
+    """
+    headers = {"Authorization": f"Bearer {HF_TOKEN}"}
+    limiter = get_rate_limiter("hf", HF_MODEL_ID)
+
+    def post():
+        with limiter.slot(), track_call("hf", "classify", HF_MODEL_ID):
+            response = get_http_client("hf").post(HF_API_URL, headers=headers, json=payload)
+            response.raise_for_status()
+        return response.json()
+
+    return resilient_call("hf", "classify", post)
+
+async def call_hf_api_async(payload):
+    """Async twin of call_hf_api on the shared httpx.AsyncClient."""
     headers = {"Authorization": f"Bearer {HF_TOKEN}"}
-    response = requests.post(HF_API_URL, headers=headers, json=payload, timeout=20)
-    response.raise_for_status()
-    return response.json()
+    limiter = get_rate_limiter("hf", HF_MODEL_ID)
+
+    async def post():
+        async with limiter.slot_async():
+            with track_call("hf", "classify", HF_MODEL_ID):
+                response = await get_async_http_client("hf").post(HF_API_URL, headers=headers, json=payload)
+                response.raise_for_status()
+        return response.json()
+
+    return await resilient_call_async("hf", "classify", post)
+
+def predict_intents_locally(texts: list[str]) -> list[str]:
+    """Runs the in-process BERT engine over a list of texts and returns the mapped intents."""
+    # Imported lazily so the HF backend never pays for loading torch.
+    from tools.local_bert_engine import get_local_intent_engine
+    with track_call("local_bert", "classify"):
+        labels = get_local_intent_engine().predict_labels(texts)
+    return [label_map.get(label, "Unknown Intent") for label in labels]
 
 def predict_sales_intent_tool(text: str) -> str:
     """Given a conversation chunk, calls the Hugging Face Inference API to get the predicted sales intent."""
-    print(f"---TOOL: Predicting intent via Hugging Face for: '{text[:50]}...'---")
-    
+    return _memoized_predictions([text], _predict_uncached)[0]
+
+async def predict_sales_intent_tool_async(text: str) -> str:
+    """Async variant of predict_sales_intent_tool."""
+    return (await _memoized_predictions_async([text], _predict_uncached_async))[0]
+
+def _predict_one_uncached(text: str) -> str:
+    if INTENT_MICROBATCH_ENABLED:
+        # Share a forward pass with every other in-flight request.
+        intent = get_intent_batcher(predict_intents_with_backend).predict_many([text])[0]
+        if intent is not None:
+            return intent
+    return _predict_sales_intent_direct(text)
+
+async def _predict_one_uncached_async(text: str) -> str:
+    if INTENT_MICROBATCH_ENABLED:
+        intent = (await get_intent_batcher(predict_intents_with_backend).predict_many_async([text]))[0]
+        if intent is not None:
+            return intent
+    return await _predict_sales_intent_direct_async(text)
+
+def _parse_hf_single_result(result) -> str:
+    """Maps the HF response for a single input to an intent."""
+    if result and result[0]:
+        predicted_label = result[0][0]['label']
+        logger.info(f"✅ HF Prediction Successful: {label_map.get(predicted_label)}")
+        return label_map.get(predicted_label, "Unknown Intent")
+    return "Unknown Intent"
+
+def _predict_sales_intent_direct(text: str) -> str:
+    """Single-text prediction against the configured backend, bypassing the micro-batcher."""
+    if SALES_INTENT_BACKEND == "local":
+        logger.debug(f"---TOOL: Predicting intent via local BERT for: '{text[:50]}...'---")
+        try:
+            return predict_intents_locally([text])[0]
+        except Exception as e:
+            logger.error(f"❌ ERROR running local BERT engine: {e}")
+            return "Error in Intent Prediction"
+
+    logger.debug(f"---TOOL: Predicting intent via Hugging Face for: '{text[:50]}...'---")
+
     if not HF_TOKEN:
         return "Error: HUGGINGFACE_TOKEN not found."
 
     payload = {"inputs": text}
-    
+
     try:
-        result = call_hf_api(payload)
-        if result and result[0]:
-            predicted_label = result[0][0]['label']
-            print(f"✅ HF Prediction Successful: {label_map.get(predicted_label)}")
-            return label_map.get(predicted_label, "Unknown Intent")
-        else:
-            return "Unknown Intent"
-            
+        return _parse_hf_single_result(call_hf_api(payload))
     except Exception as e:
-        print(f"❌ ERROR calling Hugging Face API after retries: {e}")
+        logger.error(f"❌ ERROR calling Hugging Face API after retries: {e}")
         return "Error in Intent Prediction"
 
+async def _predict_sales_intent_direct_async(text: str) -> str:
+    """Async variant of _predict_sales_intent_direct; the local engine runs in a worker thread."""
+    if SALES_INTENT_BACKEND == "local":
+        logger.debug(f"---TOOL: Predicting intent via local BERT for: '{text[:50]}...'---")
+        try:
+            return (await asyncio.to_thread(predict_intents_locally, [text]))[0]
+        except Exception as e:
+            logger.error(f"❌ ERROR running local BERT engine: {e}")
+            return "Error in Intent Prediction"
 
-# --- Tool 3: Generate Full Sales Analysis using LLM (UPDATED MODEL) ---
-def generate_sales_analysis_tool(full_conversation: str, daily_analysis: list[dict]) -> dict:
+    logger.debug(f"---TOOL: Predicting intent via Hugging Face for: '{text[:50]}...'---")
+
+    if not HF_TOKEN:
+        return "Error: HUGGINGFACE_TOKEN not found."
+
+    try:
+        return _parse_hf_single_result(await call_hf_api_async({"inputs": text}))
+    except Exception as e:
+        logger.error(f"❌ ERROR calling Hugging Face API after retries: {e}")
+        return "Error in Intent Prediction"
+
+
+def _top_label(prediction) -> Optional[str]:
     """
-    Given the full conversation and a day-by-day intent analysis,
-    generate a comprehensive summary and next best action.
+    Extracts the highest-scoring label from one item of an HF text-classification
+    response. The endpoint returns either a single {label, score} dict per input
+    or the full list of label scores, depending on the pipeline settings.
     """
-    print("---TOOL: Generating Full Sales Analysis with LLM---")
-    client = OpenAI(
-        api_key=os.getenv("GROQ_API_KEY"),
-        base_url="https://api.groq.com/openai/v1"
-    )
+    if isinstance(prediction, dict):
+        return prediction.get("label")
+    if isinstance(prediction, list) and prediction:
+        best = max(prediction, key=lambda item: item.get("score", 0.0))
+        return best.get("label")
+    return None
+
+def _parse_hf_batch_result(result, expected: int) -> list[Optional[str]]:
+    """Maps a batched HF response to one intent (or None) per input."""
+    if not isinstance(result, list) or len(result) != expected:
+        raise ValueError(f"HF batch response did not match the {expected} inputs.")
+    labels = [_top_label(item) for item in result]
+    return [label_map.get(label, "Unknown Intent") if label is not None else None for label in labels]
+
+def predict_intents_with_backend(texts: list[str]) -> list[Optional[str]]:
+    """
+    Predicts every text with ONE call to the configured backend (one HF Inference
+    API request, or one local batched forward pass). Items without a usable
+    prediction come back as None; a failed call raises.
+    """
+    if SALES_INTENT_BACKEND == "local":
+        return predict_intents_locally(texts)
+
+    if not HF_TOKEN:
+        raise RuntimeError("HUGGINGFACE_TOKEN not found.")
+    return _parse_hf_batch_result(call_hf_api({"inputs": texts}), len(texts))
+
+async def predict_intents_with_backend_async(texts: list[str]) -> list[Optional[str]]:
+    """Async variant of predict_intents_with_backend."""
+    if SALES_INTENT_BACKEND == "local":
+        return await asyncio.to_thread(predict_intents_locally, texts)
+
+    if not HF_TOKEN:
+        raise RuntimeError("HUGGINGFACE_TOKEN not found.")
+    return _parse_hf_batch_result(await call_hf_api_async({"inputs": texts}), len(texts))
+
+def predict_sales_intent_batch_tool(daily_chunks: list[dict]) -> list[dict]:
+    """
+    Predicts the intent of every daily chunk in a single backend call (or, with
+    micro-batching enabled, in the shared batches of the micro-batcher) and maps
+    the results back to their day markers.
+    Chunks already in the intent memo are not sent to the backend at all.
+    Any chunk whose prediction is missing or malformed (or every chunk, if the batch
+    request itself fails) falls back to a single-text prediction.
+    """
+    logger.debug(f"---TOOL: Predicting intent via '{SALES_INTENT_BACKEND}' backend for {len(daily_chunks)} chunks (batched)---")
+    if not daily_chunks:
+        return []
+
+    predictions = _memoized_predictions([chunk["content"] for chunk in daily_chunks], _predict_uncached)
+    daily_intents = [
+        {"day_marker": chunk["day_marker"], "intent": intent}
+        for chunk, intent in zip(daily_chunks, predictions)
+    ]
+    logger.info(f"✅ Batch Prediction Complete: {[item['intent'] for item in daily_intents]}")
+    return daily_intents
+
+async def predict_sales_intent_batch_tool_async(daily_chunks: list[dict]) -> list[dict]:
+    """Async variant of predict_sales_intent_batch_tool. Per-chunk fallbacks run concurrently."""
+    logger.debug(f"---TOOL: Predicting intent via '{SALES_INTENT_BACKEND}' backend for {len(daily_chunks)} chunks (batched, async)---")
+    if not daily_chunks:
+        return []
+
+    predictions = await _memoized_predictions_async([chunk["content"] for chunk in daily_chunks], _predict_uncached_async)
+    daily_intents = [
+        {"day_marker": chunk["day_marker"], "intent": intent}
+        for chunk, intent in zip(daily_chunks, predictions)
+    ]
+    logger.info(f"✅ Batch Prediction Complete: {[item['intent'] for item in daily_intents]}")
+    return daily_intents
+
+def _predict_uncached(texts: list[str]) -> list[str]:
+    """Predicts every text against the backend, falling back per text for missing predictions."""
+    if len(texts) == 1:
+        return [_predict_one_uncached(texts[0])]
+    try:
+        if INTENT_MICROBATCH_ENABLED:
+            predictions = get_intent_batcher(predict_intents_with_backend).predict_many(texts)
+        else:
+            predictions = predict_intents_with_backend(texts)
+    except Exception as e:
+        logger.error(f"❌ ERROR predicting intents in batch mode: {e}. Falling back per chunk.")
+        predictions = [None] * len(texts)
+
+    return [
+        intent if intent is not None else _predict_sales_intent_direct(text)
+        for text, intent in zip(texts, predictions)
+    ]
+
+async def _predict_uncached_async(texts: list[str]) -> list[str]:
+    """Async variant of _predict_uncached."""
+    if len(texts) == 1:
+        return [await _predict_one_uncached_async(texts[0])]
+    try:
+        if INTENT_MICROBATCH_ENABLED:
+            predictions = await get_intent_batcher(predict_intents_with_backend).predict_many_async(texts)
+        else:
+            predictions = await predict_intents_with_backend_async(texts)
+    except Exception as e:
+        logger.error(f"❌ ERROR predicting intents in batch mode: {e}. Falling back per chunk.")
+        predictions = [None] * len(texts)
+
+    predictions = list(predictions)
+    missing = [i for i, intent in enumerate(predictions) if intent is None]
+    if missing:
+        fallbacks = await asyncio.gather(*(_predict_sales_intent_direct_async(texts[i]) for i in missing))
+        for i, intent in zip(missing, fallbacks):
+            predictions[i] = intent
+    return predictions
+
+def _memo_lookup(memo, texts: list[str]):
+    """Returns (keys, memoised predictions or None, {key: text} still to predict)."""
+    keys = [chunk_key(text, INTENT_MEMO_NAMESPACE) for text in texts]
+    predictions = memo.get_many(keys)
+    todo = {}
+    for key, text, intent in zip(keys, texts, predictions):
+        if intent is None:
+            todo.setdefault(key, text)  # identical chunks are predicted once
+    return keys, predictions, todo
+
+def _memo_merge(memo, keys: list[str], predictions: list, todo: dict, fresh: list[str]) -> list[str]:
+    """Stores the fresh predictions and fills them into the memoised ones."""
+    fresh_by_key = dict(zip(todo, fresh))
+    memo.put_many({key: intent for key, intent in fresh_by_key.items() if intent in _KNOWN_INTENTS})
+    if len(keys) > 1:
+        logger.info(f"♻️ Intent memo: {len(keys) - len(todo)} of {len(keys)} chunks reused, {len(todo)} predicted.")
+    return [intent if intent is not None else fresh_by_key[key] for key, intent in zip(keys, predictions)]
+
+def _memoized_predictions(texts: list[str], predict_fn) -> list[str]:
+    """Serves what it can from the intent memo and sends only new or changed texts to `predict_fn`."""
+    memo = get_intent_memo()
+    if memo is None:
+        return predict_fn(texts)
+    keys, predictions, todo = _memo_lookup(memo, texts)
+    fresh = predict_fn(list(todo.values())) if todo else []
+    return _memo_merge(memo, keys, predictions, todo, fresh)
+
+async def _memoized_predictions_async(texts: list[str], predict_fn) -> list[str]:
+    """Async variant of _memoized_predictions; SQLite access runs in a worker thread."""
+    memo = get_intent_memo()
+    if memo is None:
+        return await predict_fn(texts)
+    if memo.persistent:
+        keys, predictions, todo = await asyncio.to_thread(_memo_lookup, memo, texts)
+    else:
+        keys, predictions, todo = _memo_lookup(memo, texts)
+    fresh = await predict_fn(list(todo.values())) if todo else []
+    if memo.persistent:
+        return await asyncio.to_thread(_memo_merge, memo, keys, predictions, todo, fresh)
+    return _memo_merge(memo, keys, predictions, todo, fresh)
 
-    formatted_daily_analysis = json.dumps(daily_analysis, indent=2)
 
-    system_prompt = f"""
+# --- Tool 3: Generate Full Sales Analysis using LLM (UPDATED MODEL) ---
+SALES_ANALYSIS_MODEL = "meta-llama/llama-4-scout-17b-16e-instruct" # <-- THE FIX: Using a current, powerful model
+SALES_ANALYSIS_FALLBACK = {
+    "summary": "Failed to generate LLM analysis due to an API error.",
+    "overall_intent": "Error",
+    "next_best_action": "Review the conversation manually and check API keys."
+}
+
+def _build_sales_analysis_prompt(full_conversation: str, daily_analysis: list[dict]) -> str:
+    # The breakdown is sent as minified {"day", "intent"} JSON; the text previews repeat the conversation.
+    def render(conversation: str, formatted_daily_analysis: str) -> str:
+        return f"""
 You are a world-class senior sales analyst. Your task is to analyze a sales conversation by synthesizing the raw text with a pre-computed, day-by-day intent analysis. Your output MUST be a valid JSON object with three keys: `summary`, `overall_intent`, and `next_best_action`.
 
 **FULL CONVERSATION:**
 ---
-{full_conversation}
+{conversation}
 ---
 
 **DAILY INTENT ANALYSIS:**
@@ -218,21 +497,113 @@ You are a world-class senior sales analyst. Your task is to analyze a sales conv
 
 Provide your final analysis as a JSON object only.
 """
+
+    # Long transcripts are compacted to SALES_PROMPT_TOKEN_BUDGET (older days summarised at intent changes).
+    return get_transcript_compactor().fit_prompt(full_conversation, daily_analysis, render, split_conversation_by_day)
+
+def generate_sales_analysis_tool(full_conversation: str, daily_analysis: list[dict]) -> dict:
+    """
+    Given the full conversation and a day-by-day intent analysis,
+    generate a comprehensive summary and next best action.
+    """
+    logger.debug("---TOOL: Generating Full Sales Analysis with LLM---")
+    system_prompt = _build_sales_analysis_prompt(full_conversation, daily_analysis)
     try:
-        response = client.chat.completions.create(
-            model="meta-llama/llama-4-scout-17b-16e-instruct", # <-- THE FIX: Using a current, powerful model
+        content = chat_completion(
+            model=SALES_ANALYSIS_MODEL,
             messages=[{"role": "system", "content": system_prompt}],
             temperature=0.3,
             response_format={"type": "json_object"}
         )
-        result = json.loads(response.choices[0].message.content)
-        print(f"✅ LLM analysis generated successfully.")
+        result = json.loads(content)
+        logger.info("✅ LLM analysis generated successfully.")
         return result
     except Exception as e:
-        print(f"❌ ERROR in LLM analysis tool: {e}")
-        return {
-            "summary": "Failed to generate LLM analysis due to an API error.",
-            "overall_intent": "Error",
-            "next_best_action": "Review the conversation manually and check API keys."
-        }
+        logger.error(f"❌ ERROR in LLM analysis tool: {e}")
+        return dict(SALES_ANALYSIS_FALLBACK)
+
+async def generate_sales_analysis_tool_async(full_conversation: str, daily_analysis: list[dict]) -> dict:
+    """Async variant of generate_sales_analysis_tool on the shared AsyncOpenAI client."""
+    logger.debug("---TOOL: Generating Full Sales Analysis with LLM (async)---")
+    # Tokenising and compacting a long transcript is CPU work; keep it off the event loop.
+    system_prompt = await asyncio.to_thread(_build_sales_analysis_prompt, full_conversation, daily_analysis)
+    try:
+        content = await chat_completion_async(
+            model=SALES_ANALYSIS_MODEL,
+            messages=[{"role": "system", "content": system_prompt}],
+            temperature=0.3,
+            response_format={"type": "json_object"}
+        )
+        result = json.loads(content)
+        logger.info("✅ LLM analysis generated successfully.")
+        return result
+    except Exception as e:
+        logger.error(f"❌ ERROR in LLM analysis tool: {e}")
+        return dict(SALES_ANALYSIS_FALLBACK)
 
+
+# --- Tool 4: Incremental Sales Analysis (new days on top of an existing report) ---
+SALES_INCREMENTAL_RECENT_DAYS = int(os.getenv("SALES_INCREMENTAL_RECENT_DAYS", "5"))  # prior daily intents shown to the LLM
+
+def _build_incremental_sales_analysis_prompt(previous_analysis: dict, recent_daily_analysis: list[dict],
+                                             new_conversation: str, new_daily_analysis: list[dict]) -> str:
+    # Same minified JSON and token budget as the full prompt; a large batch of new days is compacted.
+    previous = json.dumps(previous_analysis, separators=(",", ":"), ensure_ascii=False)
+    recent = json.dumps(recent_daily_analysis, separators=(",", ":"), ensure_ascii=False)
+
+    def render(conversation: str, formatted_daily_analysis: str) -> str:
+        return f"""
+You are a world-class senior sales analyst. You previously analyzed the earlier part of a sales conversation; new days have since been added, and some earlier days may have been revised (a revised day replaces the version you saw before). Update your analysis by combining your previous analysis with the new days and their pre-computed intent analysis. Your output MUST be a valid JSON object with three keys: `summary` (covering the whole conversation so far), `overall_intent`, and `next_best_action`.
+
+**PREVIOUS ANALYSIS:**
+---
+{previous}
+---
+
+**MOST RECENT PREVIOUS DAYS (INTENTS ONLY):**
+---
+{recent}
+---
+
+**NEW DAYS OF THE CONVERSATION:**
+---
+{conversation}
+---
+
+**DAILY INTENT ANALYSIS OF THE NEW DAYS:**
+---
+{formatted_daily_analysis}
+---
+
+Provide your updated analysis as a JSON object only.
+"""
+
+    return get_transcript_compactor().fit_prompt(new_conversation, new_daily_analysis, render,
+                                                 split_conversation_by_day, kind="incremental")
+
+async def generate_incremental_sales_analysis_tool_async(previous_analysis: dict, recent_daily_analysis: list[dict],
+                                                         new_conversation: str, new_daily_analysis: list[dict]) -> Optional[dict]:
+    """
+    Updates an earlier analysis with newly appended days. Only the previous
+    summary and the new days are sent, so the prompt does not grow with the
+    length of the deal. Returns None if the LLM call fails, so the caller can
+    keep the previous report instead of overwriting it with a fallback.
+    """
+    logger.debug("---TOOL: Updating Sales Analysis with LLM (incremental, async)---")
+    system_prompt = await asyncio.to_thread(
+        _build_incremental_sales_analysis_prompt,
+        previous_analysis, recent_daily_analysis, new_conversation, new_daily_analysis
+    )
+    try:
+        content = await chat_completion_async(
+            model=SALES_ANALYSIS_MODEL,
+            messages=[{"role": "system", "content": system_prompt}],
+            temperature=0.3,
+            response_format={"type": "json_object"}
+        )
+        result = json.loads(content)
+        logger.info("✅ Incremental LLM analysis generated successfully.")
+        return result
+    except Exception as e:
+        logger.error(f"❌ ERROR in incremental LLM analysis tool: {e}")
+        return None
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution: the
+    first caller runs the function, every caller that arrives while it is
+    still running waits for and shares its result (or exception). Nothing is
+    remembered once the call finishes; caching is up to the caller.
+
+    `do` is for threads, `do_async` for the event loop. An async call is
+    cancelled only when every caller waiting on it has been cancelled, so one
+    client disconnecting does not fail the others.
+    """
+
+    def __init__(self, name: str = "single-flight"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> (threading.Event, result holder)
+        self._tasks = {}  # key -> [asyncio.Task, waiter count]
+        self._stats = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            self._stats["calls"] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = (threading.Event(), {})
+                self._calls[key] = call
+                self._stats["executions"] += 1
+            else:
+                self._stats["coalesced"] += 1
+        done, holder = call
+
+        if leader:
+            try:
+                holder["result"] = fn()
+            except BaseException as e:
+                holder["error"] = e
+                raise
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                done.set()
+            return holder["result"]
+
+        done.wait()
+        if "error" in holder:
+            raise holder["error"]
+        return holder["result"]
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self._stats["calls"] += 1
+        entry = self._tasks.get(key)
+        if entry is None:
+            task = asyncio.create_task(fn())
+            entry = [task, 0]
+            self._tasks[key] = entry
+            task.add_done_callback(lambda _: self._tasks.pop(key, None) if self._tasks.get(key) is entry else None)
+            self._stats["executions"] += 1
+        else:
+            self._stats["coalesced"] += 1
+
+        entry[1] += 1
+        try:
+            return await asyncio.shield(entry[0])
+        except asyncio.CancelledError:
+            if entry[1] == 1 and not entry[0].done():
+                entry[0].cancel()
+            raise
+        finally:
+            entry[1] -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls) + len(self._tasks)
+        return stats
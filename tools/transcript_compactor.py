@@ -0,0 +1,295 @@
+import logging
+import os
+import re
+import json
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+SALES_PROMPT_TOKEN_BUDGET = int(os.getenv("SALES_PROMPT_TOKEN_BUDGET", "8000"))  # 0 = measure only, never compact
+SALES_PROMPT_RECENT_DAYS = int(os.getenv("SALES_PROMPT_RECENT_DAYS", "3"))  # newest days always kept verbatim
+SALES_PROMPT_SUMMARY_TOKENS = int(os.getenv("SALES_PROMPT_SUMMARY_TOKENS", "48"))  # per summarised run of older days
+SALES_PROMPT_TOKENIZER_PATH = os.getenv(
+    "SALES_PROMPT_TOKENIZER_PATH",
+    os.path.join(
+        os.getenv("LOCAL_BERT_MODEL_PATH",
+                  os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'models', 'fine_tuned_bert'))),
+        "tokenizer.json"
+    )
+)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_SUMMARY_HEADER = "[Earlier days, summarised at each change of intent]"
+_RECENT_HEADER = "[Most recent days, verbatim]"
+_COUNT_PIECE_CHARS = 8192
+
+
+class TranscriptCompactor:
+    """
+    Keeps LLM prompts that embed a sales transcript within a token budget.
+
+    Tokens are counted with the local BERT tokenizer (the Rust `tokenizers`
+    library, no model load), which is close enough to the LLM's own count to
+    budget with. When a prompt is over budget, the newest days stay verbatim
+    and older days are grouped into runs of the same predicted intent; each run
+    is replaced by a short extract of the day where the intent changed. More
+    days are kept verbatim while they fit, and the oldest runs are dropped
+    first if the summaries themselves do not. The per-day intent breakdown is
+    collapsed into runs as well and, if it would still take more than half of
+    the budget, its oldest runs are folded into one "omitted" item.
+    """
+
+    def __init__(self, token_budget: int = SALES_PROMPT_TOKEN_BUDGET, recent_days: int = SALES_PROMPT_RECENT_DAYS,
+                 summary_tokens: int = SALES_PROMPT_SUMMARY_TOKENS, tokenizer_path: str = SALES_PROMPT_TOKENIZER_PATH):
+        self.token_budget = token_budget
+        self.recent_days = max(1, recent_days)
+        self.summary_tokens = max(8, summary_tokens)
+        self._tokenizer = self._load_tokenizer(tokenizer_path)
+        self._lock = threading.Lock()
+        self._stats = {
+            "prompts": 0, "compacted": 0, "over_budget": 0,
+            "prompt_tokens_total": 0, "prompt_tokens_max": 0, "last_prompt_tokens": 0,
+            "original_tokens_total": 0, "breakdown_trimmed": 0, "by_kind": {},
+        }
+
+    @staticmethod
+    def _load_tokenizer(path: str):
+        try:
+            from tokenizers import Tokenizer
+            tokenizer = Tokenizer.from_file(path)
+        except Exception as e:
+            logger.warning(f"⚠️ Transcript compactor: could not load tokenizer from '{path}' ({e}). Estimating 4 characters per token.")
+            return None
+        tokenizer.no_truncation()
+        tokenizer.no_padding()
+        return tokenizer
+
+    def count_tokens(self, text: str) -> int:
+        if self._tokenizer is None:
+            return (len(text) + 3) // 4
+        # BERT pre-tokenizes on whitespace, so whitespace-aligned pieces add up to the
+        # exact count and are encoded in parallel.
+        pieces = []
+        start = 0
+        while start < len(text):
+            end = text.find(" ", start + _COUNT_PIECE_CHARS)
+            end = len(text) if end == -1 else end
+            pieces.append(text[start:end])
+            start = end
+        return sum(self._count_many(pieces))
+
+    def _count_many(self, texts: list[str]) -> list[int]:
+        if self._tokenizer is None:
+            return [self.count_tokens(text) for text in texts]
+        # encode_batch_fast skips offset tracking, which we do not need for counting.
+        encode = getattr(self._tokenizer, "encode_batch_fast", self._tokenizer.encode_batch)
+        return [len(encoding.ids) for encoding in encode(texts, add_special_tokens=False)]
+
+    def _head(self, text: str, max_tokens: int) -> str:
+        """The leading part of `text` that fits in `max_tokens`."""
+        if self._tokenizer is None:
+            return text[:max_tokens * 4]
+        offsets = self._tokenizer.encode(text, add_special_tokens=False).offsets
+        return text if len(offsets) <= max_tokens else text[:offsets[max_tokens - 1][1]]
+
+    def _tail(self, text: str, max_tokens: int) -> str:
+        """The trailing part of `text` that fits in `max_tokens`."""
+        if max_tokens <= 0:
+            return ""
+        if self._tokenizer is None:
+            return text[-max_tokens * 4:]
+        offsets = self._tokenizer.encode(text, add_special_tokens=False).offsets
+        return text if len(offsets) <= max_tokens else text[offsets[-max_tokens][0]:]
+
+    def _extract(self, content: str) -> str:
+        """Leading sentences of a day, up to summary_tokens."""
+        extract = ""
+        for sentence in _SENTENCE_END.split(content.strip()):
+            candidate = f"{extract} {sentence}".strip()
+            if self.count_tokens(candidate) > self.summary_tokens:
+                break
+            extract = candidate
+        return extract or self._head(content.strip(), self.summary_tokens) + "…"
+
+    def _summary_lines(self, older: list[dict], intents: list[str], extracts: dict) -> list[str]:
+        """One line per run of consecutive older days with the same intent."""
+        lines = []
+        start = 0
+        for i in range(1, len(older) + 1):
+            if i < len(older) and intents[i] == intents[start]:
+                continue
+            first, last = older[start]["day_marker"].rstrip(":"), older[i - 1]["day_marker"].rstrip(":")
+            days = first if i - 1 == start else f"{first} – {last}"
+            if start not in extracts:
+                extracts[start] = self._extract(older[start]["content"])
+            lines.append(f"{days} [{intents[start]}]: {extracts[start]}")
+            start = i
+        return lines
+
+    def compact(self, daily_chunks: list[dict], daily_intents: list[str], available_tokens: int) -> tuple[str, dict]:
+        """Renders the days within `available_tokens`; returns the text and what was kept."""
+        verbatim = [f"{chunk['day_marker']} {chunk['content']}" for chunk in daily_chunks]
+        verbatim_tokens = self._count_many(verbatim)
+        n = len(daily_chunks)
+        extracts = {}  # day index -> extract, reused while the verbatim window grows
+        # Reserve room for the longest header, the one that reports omitted runs.
+        available_tokens -= self.count_tokens(f"{_SUMMARY_HEADER[:-1]}; {n} oldest runs omitted]\n{_RECENT_HEADER}")
+
+        def summaries_for(keep: int) -> tuple[list[str], list[int]]:
+            lines = self._summary_lines(daily_chunks[:n - keep], daily_intents[:n - keep], extracts)
+            return lines, self._count_many(lines) if lines else []
+
+        keep = min(self.recent_days, n)
+        summary_lines, summary_tokens = summaries_for(keep)
+        # Keep more days verbatim while the whole rendering still fits.
+        while keep < n:
+            lines, tokens = summaries_for(keep + 1)
+            if sum(verbatim_tokens[n - keep - 1:]) + sum(tokens) > available_tokens:
+                break
+            keep, summary_lines, summary_tokens = keep + 1, lines, tokens
+
+        recent_tokens = sum(verbatim_tokens[n - keep:])
+        # Drop the oldest summaries that do not fit.
+        omitted = 0
+        while summary_lines and recent_tokens + sum(summary_tokens) > available_tokens:
+            summary_lines, summary_tokens = summary_lines[1:], summary_tokens[1:]
+            omitted += 1
+        # Still too long: fewer verbatim days, and finally only the end of the newest one.
+        recent = verbatim[n - keep:]
+        while len(recent) > 1 and recent_tokens > available_tokens:
+            recent_tokens -= verbatim_tokens[n - len(recent)]
+            recent = recent[1:]
+        if recent_tokens > available_tokens:
+            recent = [self._tail(recent[0], available_tokens)]
+
+        parts = []
+        if summary_lines or omitted:
+            header = _SUMMARY_HEADER if not omitted else f"{_SUMMARY_HEADER[:-1]}; {omitted} oldest runs omitted]"
+            parts += [header, *summary_lines, _RECENT_HEADER]
+        parts += recent
+        info = {"days": n, "verbatim_days": len(recent), "summarised_runs": len(summary_lines), "omitted_runs": omitted}
+        return "\n".join(parts), info
+
+    @staticmethod
+    def _runs(daily_analysis: list[dict]) -> list[dict]:
+        runs = []
+        for item in daily_analysis:
+            day = (item.get("day") or "").rstrip(":")
+            if runs and runs[-1]["intent"] == item.get("intent"):
+                runs[-1]["days"] = f"{runs[-1]['days'].split(' – ')[0]} – {day}"
+            else:
+                runs.append({"days": day, "intent": item.get("intent")})
+        return runs
+
+    @staticmethod
+    def breakdown_json(daily_analysis: list[dict], as_runs: bool = False) -> str:
+        """
+        Minified {"day", "intent"} list. With `as_runs`, consecutive days with
+        the same intent become one {"days": "Day 1 – Day 4", "intent"} item,
+        which still gives every day's intent in far fewer tokens.
+        """
+        if as_runs:
+            items = TranscriptCompactor._runs(daily_analysis)
+        else:
+            items = [{"day": item.get("day"), "intent": item.get("intent")} for item in daily_analysis]
+        return json.dumps(items, separators=(",", ":"), ensure_ascii=False)
+
+    def fit_breakdown(self, daily_analysis: list[dict], max_tokens: int) -> tuple[str, int]:
+        """
+        The run-collapsed breakdown within `max_tokens`: when the runs alone do
+        not fit (e.g. an intent that flips every day), the newest runs are kept
+        and the older ones become a single {"days", "omitted_runs"} item.
+        Returns the JSON and how many runs were omitted.
+        """
+        runs = self._runs(daily_analysis)
+
+        def render(kept: int) -> str:
+            items = runs[len(runs) - kept:] if kept else []
+            omitted = runs[:len(runs) - kept]
+            if omitted:
+                first, last = omitted[0]["days"].split(" – ")[0], omitted[-1]["days"].split(" – ")[-1]
+                items = [{"days": f"{first} – {last}", "omitted_runs": len(omitted)}, *items]
+            return json.dumps(items, separators=(",", ":"), ensure_ascii=False)
+
+        breakdown = render(len(runs))
+        if self.count_tokens(breakdown) <= max_tokens:
+            return breakdown, 0
+        # The rendering grows with the number of kept runs, so binary search for the most that fit.
+        low, high = 0, len(runs) - 1
+        while low < high:
+            mid = (low + high + 1) // 2
+            if self.count_tokens(render(mid)) <= max_tokens:
+                low = mid
+            else:
+                high = mid - 1
+        return render(low), len(runs) - low
+
+    def fit_prompt(self, full_conversation: str, daily_analysis: list[dict], render: Callable[[str, str], str],
+                   split_days: Callable[[str], list[dict]], kind: str = "full") -> str:
+        """
+        Returns render(conversation, breakdown) for the full conversation if it
+        fits the budget. Otherwise the breakdown is switched to runs (trimmed
+        to half the budget) and the conversation is compacted into the rest.
+        `daily_analysis` supplies the BERT intent of each day ({"day",
+        "intent"}); `split_days` is only called when compaction is needed.
+        Every prompt's size is recorded under `kind`.
+        """
+        prompt = render(full_conversation, self.breakdown_json(daily_analysis))
+        original_tokens = prompt_tokens = self.count_tokens(prompt)
+        info = None
+        if 0 < self.token_budget < original_tokens:
+            frame_tokens = self.count_tokens(render("", ""))
+            breakdown, omitted_runs = self.fit_breakdown(daily_analysis, (self.token_budget - frame_tokens) // 2)
+            daily_chunks = split_days(full_conversation)
+            intents_by_day = {item.get("day"): item.get("intent", "Unknown Intent") for item in daily_analysis}
+            daily_intents = [intents_by_day.get(chunk["day_marker"], "Unknown Intent") for chunk in daily_chunks]
+            available = self.token_budget - self.count_tokens(render("", breakdown))
+            if daily_chunks:
+                conversation, info = self.compact(daily_chunks, daily_intents, available)
+            else:
+                conversation, info = self._tail(full_conversation, available), {"days": 0}
+            info["omitted_breakdown_runs"] = omitted_runs
+            prompt = render(conversation, breakdown)
+            prompt_tokens = self.count_tokens(prompt)
+            logger.info(f"🗜️ Sales prompt ({kind}) compacted from {original_tokens} to {prompt_tokens} tokens "
+                  f"(budget {self.token_budget}): {info}")
+        else:
+            logger.info(f"📏 Sales prompt ({kind}): {prompt_tokens} tokens (budget {self.token_budget or 'off'}).")
+
+        with self._lock:
+            self._stats["prompts"] += 1
+            self._stats["by_kind"][kind] = self._stats["by_kind"].get(kind, 0) + 1
+            self._stats["breakdown_trimmed"] += int(bool(info and info["omitted_breakdown_runs"]))
+            self._stats["compacted"] += int(info is not None)
+            self._stats["over_budget"] += int(0 < self.token_budget < prompt_tokens)
+            self._stats["prompt_tokens_total"] += prompt_tokens
+            self._stats["prompt_tokens_max"] = max(self._stats["prompt_tokens_max"], prompt_tokens)
+            self._stats["last_prompt_tokens"] = prompt_tokens
+            self._stats["original_tokens_total"] += original_tokens
+        return prompt
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats, by_kind=dict(self._stats["by_kind"]))
+        prompts = stats["prompts"]
+        stats["avg_prompt_tokens"] = round(stats["prompt_tokens_total"] / prompts, 1) if prompts else 0.0
+        stats["tokens_saved_total"] = stats["original_tokens_total"] - stats["prompt_tokens_total"]
+        stats["token_budget"] = self.token_budget
+        stats["recent_days"] = self.recent_days
+        stats["exact_token_counts"] = self._tokenizer is not None
+        return stats
+
+
+_compactor = None
+_compactor_lock = threading.Lock()
+
+def get_transcript_compactor() -> TranscriptCompactor:
+    """Returns the process-wide compactor, loading the tokenizer on first use."""
+    global _compactor
+    if _compactor is None:
+        with _compactor_lock:
+            if _compactor is None:
+                _compactor = TranscriptCompactor()
+    return _compactor